@@ -0,0 +1,107 @@
+"""
+Align sparse metric series on step.
+
+Metrics in loss.jsonl are logged at different cadences (train/loss every
+`log_every_n_steps`, curvature every probe, val/fid every milestone), so
+pairing them for a scatter plot needs an explicit join:
+
+    exact    keep steps present in every series
+    nearest  for each step of the first (anchor) series, take the value at
+             the closest step of every other series
+    asof     for each anchor step, take the last value logged at or before it
+
+All joins are sorted merges (argsort + searchsorted), O(n log n) with no
+per-element Python work. An optional `tolerance` (in steps) drops anchor
+steps whose match is too far away instead of silently pairing them.
+
+Example:
+    aligned = align_series([series["val/fid"], series["curvature/hutch_trace_mean"]],
+                           how="nearest", tolerance=100)
+    fid, curv = aligned.values
+"""
+
+from functools import reduce
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from min_snr.logs import MetricSeries
+
+JOINS = ("exact", "nearest", "asof")
+
+
+class Aligned(NamedTuple):
+    steps: np.ndarray               # anchor steps kept, shape (n,)
+    values: List[np.ndarray]        # one (n,) array per input series
+    src_steps: List[np.ndarray]     # step each value was taken from
+
+
+def sort_unique(steps: np.ndarray, values: np.ndarray) -> MetricSeries:
+    """Sort a series by step; on duplicate steps the last logged value wins."""
+    steps = np.asarray(steps)
+    values = np.asarray(values)
+    if steps.size == 0:
+        return steps, values
+    order = np.argsort(steps, kind="stable")
+    s = steps[order]
+    keep = np.ones(s.size, dtype=bool)
+    keep[:-1] = s[1:] != s[:-1]
+    return s[keep], values[order][keep]
+
+
+def _match(anchor: np.ndarray, steps: np.ndarray, how: str) -> np.ndarray:
+    """Index into `steps` matched to each anchor step (-1 = no match)."""
+    if steps.size == 0:
+        return np.full(anchor.shape, -1, dtype=np.int64)
+
+    if how == "exact":
+        idx = np.searchsorted(steps, anchor).clip(0, steps.size - 1)
+        return np.where(steps[idx] == anchor, idx, -1)
+
+    if how == "asof":
+        return np.searchsorted(steps, anchor, side="right") - 1
+
+    # nearest: compare left/right neighbours, ties go to the earlier step.
+    right = np.searchsorted(steps, anchor).clip(0, steps.size - 1)
+    left = (right - 1).clip(0, steps.size - 1)
+    take_left = np.abs(anchor - steps[left]) <= np.abs(steps[right] - anchor)
+    return np.where(take_left, left, right)
+
+
+def align_series(
+    series: Sequence[MetricSeries],
+    how: str = "exact",
+    tolerance: Optional[float] = None,
+) -> Aligned:
+    """
+    Join N (steps, values) series onto a common step axis.
+
+    For "nearest"/"asof" the first series is the anchor; for "exact" the
+    result is the intersection of all step sets. Steps whose match is missing
+    or farther than `tolerance` are dropped from every output array.
+    """
+    if how not in JOINS:
+        raise ValueError(f"Unknown join '{how}' (expected one of {JOINS})")
+    if not series:
+        raise ValueError("align_series needs at least one series")
+
+    clean = [sort_unique(s, v) for s, v in series]
+
+    if how == "exact":
+        anchor = reduce(np.intersect1d, [s for s, _ in clean])
+    else:
+        anchor = clean[0][0]
+
+    keep = np.ones(anchor.shape, dtype=bool)
+    matches = []
+    for steps, _ in clean:
+        idx = _match(anchor, steps, how)
+        ok = idx >= 0
+        if tolerance is not None and steps.size:
+            ok &= np.abs(anchor - steps[idx.clip(0)]) <= tolerance
+        keep &= ok
+        matches.append(idx)
+
+    values = [v[idx[keep]] for (_, v), idx in zip(clean, matches)]
+    src_steps = [s[idx[keep]] for (s, _), idx in zip(clean, matches)]
+    return Aligned(anchor[keep], values, src_steps)
@@ -0,0 +1,149 @@
+"""
+Compress finished run directories in place.
+
+Every ``*.jsonl`` in a finished run directory (one that has a results.jsonl)
+is rewritten as ``<name>.jsonl.zst`` (or ``.gz`` when zstandard is not
+installed), verified by decoding it back and comparing checksums, and only
+then is the original removed. The readers in ``min_snr.logs`` resolve the old
+paths to the compressed files, so plotting commands don't change.
+
+Usage:
+    python -m min_snr.cli archive docs/assets/e7 --codec zst
+    python -m min_snr.cli archive runs/min_snr --dry-run
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
+from min_snr.logs import PathLike, _import_zstandard, open_log_binary
+
+CODECS = ("zst", "gz")
+_CHUNK = 1 << 20
+
+
+class ArchivedFile(NamedTuple):
+    src: Path
+    dst: Path
+    raw_bytes: int
+    packed_bytes: int
+
+
+def default_codec() -> str:
+    """zstd when available, gzip (stdlib) otherwise."""
+    try:
+        _import_zstandard()
+    except ImportError:
+        return "gz"
+    return "zst"
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _sha256_decoded(path: Path) -> str:
+    h = hashlib.sha256()
+    with open_log_binary(path) as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def compress_file(src: Path, codec: str, level: Optional[int] = None) -> ArchivedFile:
+    """Compress one file next to itself, verify it, then delete the original."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec} (expected one of {CODECS})")
+
+    dst = src.with_name(f"{src.name}.{codec}")
+    tmp = dst.with_name(dst.name + ".tmp")
+
+    with src.open("rb") as fin, tmp.open("wb") as fout:
+        if codec == "zst":
+            zstandard = _import_zstandard()
+            cctx = zstandard.ZstdCompressor(level=19 if level is None else level)
+            cctx.copy_stream(fin, fout)
+        else:
+            with gzip.GzipFile(
+                filename="", mode="wb", fileobj=fout, mtime=0,
+                compresslevel=9 if level is None else level,
+            ) as gz:
+                shutil.copyfileobj(fin, gz, _CHUNK)
+
+    os.replace(tmp, dst)
+    if _sha256_decoded(dst) != _sha256_file(src):
+        dst.unlink()
+        raise RuntimeError(f"Round-trip check failed for {src}; original kept.")
+
+    st = src.stat()
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    raw_bytes = st.st_size
+    src.unlink()
+    return ArchivedFile(src, dst, raw_bytes, dst.stat().st_size)
+
+
+def is_finished_run(run_dir: Path) -> bool:
+    """A run is finished once results.jsonl (plain or compressed) exists."""
+    return any(run_dir.glob("results.jsonl*"))
+
+
+def iter_run_dirs(root: Path) -> Iterator[Path]:
+    """Directories under `root` (inclusive) that hold a loss or results log."""
+    seen = set()
+    for log in sorted(root.rglob("*.jsonl*")):
+        if log.name.startswith(("loss.jsonl", "results.jsonl")) and log.parent not in seen:
+            seen.add(log.parent)
+            yield log.parent
+
+
+def archive_run_dir(
+    run_dir: PathLike,
+    codec: Optional[str] = None,
+    level: Optional[int] = None,
+    force: bool = False,
+    dry_run: bool = False,
+) -> List[ArchivedFile]:
+    """Compress every plain ``*.jsonl`` directly inside `run_dir`."""
+    run_dir = Path(run_dir)
+    codec = codec or default_codec()
+
+    if not force and not is_finished_run(run_dir):
+        print(f"[archive] {run_dir} has no results.jsonl (still running?), skipping.")
+        return []
+
+    done: List[ArchivedFile] = []
+    for src in sorted(run_dir.glob("*.jsonl")):
+        if dry_run:
+            print(f"[archive] would compress {src}")
+            continue
+        done.append(compress_file(src, codec, level))
+    return done
+
+
+def archive(
+    root: PathLike,
+    codec: Optional[str] = None,
+    level: Optional[int] = None,
+    force: bool = False,
+    dry_run: bool = False,
+) -> List[ArchivedFile]:
+    """Archive all run directories found under `root`."""
+    done: List[ArchivedFile] = []
+    for run_dir in iter_run_dirs(Path(root)):
+        done.extend(archive_run_dir(run_dir, codec, level, force, dry_run))
+
+    raw = sum(a.raw_bytes for a in done)
+    packed = sum(a.packed_bytes for a in done)
+    if done:
+        print(
+            f"[archive] {len(done)} files: {raw / 1024:.1f} KiB -> "
+            f"{packed / 1024:.1f} KiB ({raw / max(packed, 1):.1f}x)"
+        )
+    return done
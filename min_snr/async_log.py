@@ -0,0 +1,249 @@
+"""
+Metrics logging off the training thread.
+
+Every `log_every_n_steps` the trainer fans a record with dozens of keys
+(loss, per-t MSE, curvature, ...) out to loss.jsonl, TensorBoard and wandb.
+`AsyncLogger.log` only copies the dict and pushes it onto a queue; one
+background writer thread does the rest:
+
+  - drains whatever has queued up since its last wake-up into one batch
+  - writes the batch to the jsonl file as a single write + flush, in the
+    ``{"_i": step, "out": {...}}`` layout of min_snr.logs.append_record
+  - merges records that share a step (train + val metrics logged at the
+    same step) and hands each backend the whole batch in one call, with one
+    flush per batch instead of one per record
+
+Records come out in the order they were logged. `close()` (also registered
+with atexit, so it runs after an uncaught exception too) drains the queue,
+fsyncs the file and closes the backends. Because each batch is flushed to
+the OS as soon as it is written, a hard kill loses at most the records
+still in the queue, not a buffered file tail.
+
+Values should already be plain Python; `detach_metrics` converts a dict of
+tensors with one host transfer per device instead of one `.item()` per key.
+Anything the writer still finds (tensors, numpy scalars) is converted
+there, off the step path.
+
+Usage:
+    logger = AsyncLogger(out_dir / "loss.jsonl",
+                         [TensorBoardBackend(out_dir / "tb"), WandbBackend()])
+    if step % log_every_n_steps == 0:
+        logger.log(step, detach_metrics({"loss": loss, **per_t_mse}))
+    ...
+    logger.close()
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from min_snr.logs import PathLike
+
+Record = Tuple[int, Dict[str, Any]]
+_STOP = object()
+
+
+def _plain(value: Any) -> Any:
+    """json.dumps fallback for values that were not detached by the caller."""
+    if hasattr(value, "tolist"):  # torch tensors, numpy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"Cannot log a {type(value).__name__}")
+
+
+def detach_metrics(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Same dict with every tensor value turned into a float / list. Scalars on
+    one device are stacked and moved in a single transfer (one sync).
+    """
+    import torch
+
+    out = dict(metrics)
+    scalars: Dict[Any, List[str]] = {}
+    for k, v in metrics.items():
+        if torch.is_tensor(v):
+            if v.numel() == 1:
+                scalars.setdefault(v.device, []).append(k)
+            else:
+                out[k] = v.detach().cpu().tolist()
+    for keys in scalars.values():
+        vals = torch.stack([metrics[k].detach().reshape(()).float() for k in keys]).cpu().tolist()
+        out.update(zip(keys, vals))
+    return out
+
+
+def coalesce(records: Sequence[Record]) -> List[Record]:
+    """Merge consecutive records with the same step (later keys win)."""
+    merged: List[Record] = []
+    for step, metrics in records:
+        if merged and merged[-1][0] == step:
+            merged[-1][1].update(metrics)
+        else:
+            merged.append((step, dict(metrics)))
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Backends: log_batch(records) once per batch, close() at shutdown
+# ---------------------------------------------------------------------------
+
+class TensorBoardBackend:
+    """Scalars (and lists, as one scalar per index) to a SummaryWriter."""
+
+    def __init__(self, log_dir: PathLike, writer: Any = None) -> None:
+        if writer is None:
+            from torch.utils.tensorboard import SummaryWriter
+
+            # Flushed by us once per batch; no timer thread of its own.
+            writer = SummaryWriter(str(log_dir), flush_secs=10 ** 6)
+        self.writer = writer
+
+    def log_batch(self, records: Sequence[Record]) -> None:
+        for step, metrics in records:
+            for k, v in metrics.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    self.writer.add_scalar(k, v, step)
+                elif isinstance(v, list) and all(isinstance(x, (int, float)) for x in v):
+                    for i, x in enumerate(v):
+                        self.writer.add_scalar(f"{k}/{i}", x, step)
+        self.writer.flush()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class WandbBackend:
+    """One wandb.log call per step (records sharing a step are merged first)."""
+
+    def __init__(self, run: Any = None) -> None:
+        if run is None:
+            import wandb
+
+            run = wandb.run
+        self.run = run
+
+    def log_batch(self, records: Sequence[Record]) -> None:
+        for step, metrics in records:
+            self.run.log(metrics, step=step)
+
+    def close(self) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Logger
+# ---------------------------------------------------------------------------
+
+class AsyncLogger:
+    """Queue push on the step path; a writer thread does the I/O."""
+
+    def __init__(
+        self,
+        path: Optional[PathLike],
+        backends: Sequence[Any] = (),
+        max_batch: int = 1024,
+    ) -> None:
+        self.path = Path(path) if path is not None else None
+        self.backends = list(backends)
+        self.max_batch = max_batch
+        self.errors: List[BaseException] = []
+        self._q: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._logged = 0
+        self._written = 0
+        self._done = threading.Condition()
+        self._closed = False
+        self._file = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._writer, name="async-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, step: int, metrics: Dict[str, Any]) -> None:
+        """Queue one record. The dict is copied, so the caller may reuse it."""
+        if self._closed:
+            raise RuntimeError("log() after close()")
+        self._logged += 1
+        self._q.put((int(step), dict(metrics)))
+
+    # -- writer thread --------------------------------------------------------
+
+    def _writer(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[Record] = []
+            item = self._q.get()
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._q.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Record]) -> None:
+        if self._file is not None:
+            lines = []
+            for step, out in batch:  # one bad value costs its own record, not the batch
+                try:
+                    lines.append(json.dumps({"_i": step, "out": out}, default=_plain) + "\n")
+                except (TypeError, ValueError) as e:
+                    self._error(f"jsonl step {step}", e)
+            try:
+                self._file.write("".join(lines))
+                self._file.flush()
+            except OSError as e:
+                self._error("jsonl", e)
+        if self.backends:
+            merged = coalesce(batch)
+            for b in self.backends:
+                try:
+                    b.log_batch(merged)
+                except Exception as e:  # one broken backend must not stop the others
+                    self._error(type(b).__name__, e)
+        with self._done:
+            self._written += len(batch)
+            self._done.notify_all()
+
+    def _error(self, where: str, e: BaseException) -> None:
+        if not self.errors:
+            print(f"[async-log] {where} write failed (further errors are only counted): {e!r}")
+        self.errors.append(e)
+
+    # -- shutdown -------------------------------------------------------------
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything logged so far has been written."""
+        target = self._logged
+        with self._done:
+            return self._done.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self) -> None:
+        """Drain the queue, fsync the file, close the backends."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._q.put(_STOP)
+        self._thread.join()
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        for b in self.backends:
+            close = getattr(b, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    self._error(type(b).__name__, e)
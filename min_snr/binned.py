@@ -0,0 +1,119 @@
+"""
+Binned statistics over log-spaced bins (e.g. metric vs SNR).
+
+SNR spans several orders of magnitude within one run, so per-step scatters
+on a linear axis bunch everything near zero. `binned_stats` reduces
+millions of (x, y) points into per-bin count / mean / std / quantiles in a
+few vectorized passes (searchsorted + bincount + one sort), optionally
+split by run so several runs come out of a single call.
+
+Example:
+    edges = log_bins(snr, n_bins=24)
+    stats = binned_stats(snr, grad, edges, groups=run_ids, n_groups=3)
+    stats.mean[run], stats.quantile(0.5)[run]
+"""
+
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+class BinnedStats(NamedTuple):
+    edges: np.ndarray       # (B + 1,)
+    count: np.ndarray       # (G, B) int
+    mean: np.ndarray        # (G, B), NaN where empty
+    std: np.ndarray         # (G, B), population std, NaN where empty
+    quantiles: np.ndarray   # (Q, G, B), NaN where empty
+    qs: tuple               # the Q quantile levels
+
+    @property
+    def centers(self) -> np.ndarray:
+        """Geometric bin centers (matches log-spaced edges)."""
+        return np.sqrt(self.edges[:-1] * self.edges[1:])
+
+    def quantile(self, q: float) -> np.ndarray:
+        """(G, B) values for one of the computed quantile levels."""
+        return self.quantiles[self.qs.index(q)]
+
+
+def log_bins(
+    x: np.ndarray,
+    n_bins: int = 24,
+    lo: Optional[float] = None,
+    hi: Optional[float] = None,
+) -> np.ndarray:
+    """`n_bins` log-spaced edges spanning the positive, finite values of `x`."""
+    x = np.asarray(x, dtype=float)
+    pos = x[np.isfinite(x) & (x > 0)]
+    if lo is None or hi is None:
+        if pos.size == 0:
+            raise ValueError("log_bins needs at least one positive value")
+        lo = pos.min() if lo is None else lo
+        hi = pos.max() if hi is None else hi
+    if hi <= lo:
+        hi = lo * 10.0
+    return np.geomspace(lo, hi * (1.0 + 1e-9), n_bins + 1)
+
+
+def binned_stats(
+    x: np.ndarray,
+    y: np.ndarray,
+    edges: np.ndarray,
+    groups: Optional[np.ndarray] = None,
+    n_groups: Optional[int] = None,
+    qs: Sequence[float] = (0.1, 0.25, 0.5, 0.75, 0.9),
+) -> BinnedStats:
+    """
+    Per-(group, bin) statistics of `y`, binned by `x` against `edges`.
+
+    Points outside the edges or with non-finite x/y are dropped. `groups`
+    holds a small non-negative int per point (e.g. run index); without it
+    everything is one group. Quantiles use linear interpolation like
+    np.quantile.
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if groups is None:
+        groups = np.zeros(x.shape, dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64).ravel()
+    n_groups = int(groups.max()) + 1 if n_groups is None and groups.size else (n_groups or 1)
+    n_bins = edges.size - 1
+
+    b = np.searchsorted(edges, x, side="right") - 1
+    ok = np.isfinite(x) & np.isfinite(y) & (b >= 0) & (b < n_bins)
+    cell = groups[ok] * n_bins + b[ok]
+    yv = y[ok]
+    n_cells = n_groups * n_bins
+
+    count = np.bincount(cell, minlength=n_cells)
+    s1 = np.bincount(cell, weights=yv, minlength=n_cells)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1 / count
+        var = np.bincount(cell, weights=(yv - mean[cell]) ** 2, minlength=n_cells) / count
+    std = np.sqrt(var)
+
+    # Quantiles: sort by (cell, y) once, then index into each cell's run.
+    # Sort by y, then a stable (radix, for <= 2**16 cells) sort by cell.
+    order = np.argsort(yv)
+    cell_key = cell[order].astype(np.uint16 if n_cells <= 0xFFFF else np.int64)
+    order = order[np.argsort(cell_key, kind="stable")]
+    ys = yv[order]
+    start = np.concatenate(([0], np.cumsum(count)[:-1]))
+    quant = np.full((len(qs), n_cells), np.nan)
+    has = count > 0
+    for qi, q in enumerate(qs):
+        pos = start[has] + q * (count[has] - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, start[has] + count[has] - 1)
+        frac = pos - lo
+        quant[qi, has] = ys[lo] * (1.0 - frac) + ys[hi] * frac
+
+    shape = (n_groups, n_bins)
+    return BinnedStats(
+        edges=edges,
+        count=count.reshape(shape),
+        mean=mean.reshape(shape),
+        std=std.reshape(shape),
+        quantiles=quant.reshape((len(qs),) + shape),
+        qs=tuple(qs),
+    )
@@ -0,0 +1,357 @@
+"""
+Flat, memory-mappable checkpoints with named sections.
+
+A checkpoint is a single ``*.ckpt`` file:
+
+    b"MSNRCKP1" | uint64 header length | JSON header | pad to 4096 | tensor data
+
+The header lists each section (``model``, ``ema``, ``optimizer``, ...) as a
+table of tensors (dtype, shape, byte offset into the data area, 64-byte
+aligned) plus, for nested state like an optimizer's, a JSON skeleton that
+puts the tensors and plain values back together. Free-form ``meta`` (step,
+config, metrics) rides along.
+
+Reading maps the file copy-on-write and wraps each tensor around the mapped
+pages (`load_state`), so taking the EMA weights out of a checkpoint that
+also holds model and optimizer state reads only the EMA pages, and nothing
+is unpickled. bfloat16 is stored as its raw 16 bits and viewed back.
+
+`AsyncCheckpointer` keeps saving off the training thread: `save` copies the
+sections into reusable host buffers (one device->host copy per tensor) and
+a background thread writes the file (tmp + rename). The trainer only waits
+if the previous save is still being written.
+
+Usage:
+    ckptr = AsyncCheckpointer()
+    ckptr.save("runs/e6/ckpts/last.ckpt",
+               {"model": model.state_dict(), "ema": ema.state_dict(),
+                "optimizer": opt.state_dict()}, meta={"step": step})
+    ...
+    ckptr.close()
+
+    ema = load_state("runs/e6/ckpts/last.ckpt", "ema")   # zero-copy tensors
+"""
+
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from min_snr.logs import PathLike
+
+CKPT_SUFFIX = ".ckpt"
+MAGIC = b"MSNRCKP1"
+FORMAT_VERSION = 1
+ALIGN = 4096          # data area starts on a page boundary
+TENSOR_ALIGN = 64     # every tensor starts on a cache line
+
+_PREFIX = struct.Struct("<8sQ")
+# torch dtype name -> numpy dtype the raw bytes are viewed as
+_NP_DTYPES = {
+    "float64": np.float64,
+    "float32": np.float32,
+    "float16": np.float16,
+    "bfloat16": np.int16,
+    "int64": np.int64,
+    "int32": np.int32,
+    "int16": np.int16,
+    "int8": np.int8,
+    "uint8": np.uint8,
+    "bool": np.bool_,
+}
+
+
+def _round_up(n: int, a: int) -> int:
+    return -(-n // a) * a
+
+
+def _dtype_name(t) -> str:
+    name = str(t.dtype).replace("torch.", "")
+    if name not in _NP_DTYPES:
+        raise TypeError(f"Unsupported tensor dtype {t.dtype} for a checkpoint")
+    return name
+
+
+# ---------------------------------------------------------------------------
+# Nested state <-> flat tensor table
+# ---------------------------------------------------------------------------
+
+def _flatten(obj: Any, prefix: str, tensors: Dict[str, Any]) -> Any:
+    """JSON skeleton of `obj`, moving every tensor into `tensors`."""
+    import torch
+
+    if isinstance(obj, torch.Tensor):
+        tensors[prefix] = obj
+        return {"__tensor__": prefix}
+    if isinstance(obj, dict):
+        return {"__dict__": [[k, _flatten(v, f"{prefix}.{k}" if prefix else str(k), tensors)]
+                             for k, v in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        kind = "__list__" if isinstance(obj, list) else "__tuple__"
+        return {kind: [_flatten(v, f"{prefix}.{i}", tensors) for i, v in enumerate(obj)]}
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    raise TypeError(f"Cannot store {type(obj).__name__} at {prefix!r} in a checkpoint")
+
+
+def _unflatten(node: Any, tensors: Dict[str, Any]) -> Any:
+    if isinstance(node, dict):
+        if "__tensor__" in node:
+            return tensors[node["__tensor__"]]
+        if "__dict__" in node:
+            return {k: _unflatten(v, tensors) for k, v in node["__dict__"]}
+        if "__list__" in node:
+            return [_unflatten(v, tensors) for v in node["__list__"]]
+        if "__tuple__" in node:
+            return tuple(_unflatten(v, tensors) for v in node["__tuple__"])
+    return node
+
+
+def _is_flat(state: Any) -> bool:
+    import torch
+
+    return isinstance(state, dict) and all(
+        isinstance(k, str) and isinstance(v, torch.Tensor) for k, v in state.items()
+    )
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _layout(sections: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Tuple[int, Any]], int]:
+    """Header section tables, (offset, tensor) pairs in file order, data size."""
+    header_sections: Dict[str, Any] = {}
+    order: List[Tuple[int, Any]] = []
+    offset = 0
+    for name, state in sections.items():
+        tensors: Dict[str, Any] = {}
+        tree = None if _is_flat(state) else _flatten(state, "", tensors)
+        if tree is None:
+            tensors = dict(state)
+        table = {}
+        for key, t in tensors.items():
+            nbytes = t.numel() * t.element_size()
+            table[key] = {"dtype": _dtype_name(t), "shape": list(t.shape), "offset": offset, "nbytes": nbytes}
+            order.append((offset, t))
+            offset = _round_up(offset + nbytes, TENSOR_ALIGN)
+        header_sections[name] = {"tensors": table}
+        if tree is not None:
+            header_sections[name]["tree"] = tree
+    return header_sections, order, offset
+
+
+def _as_bytes(t) -> memoryview:
+    import torch
+
+    t = t.detach()
+    if t.device.type != "cpu":
+        t = t.cpu()
+    if t.dtype == torch.bfloat16:
+        t = t.view(torch.int16)
+    return memoryview(np.ascontiguousarray(t.numpy()).reshape(-1).view(np.uint8))
+
+
+def save_checkpoint(
+    path: PathLike,
+    sections: Dict[str, Any],
+    meta: Optional[Dict[str, Any]] = None,
+) -> Path:
+    """Write `sections` ({name: state dict}) to `path` (tmp file + rename)."""
+    path = Path(path)
+    table, order, size = _layout(sections)
+    header = json.dumps(
+        {"version": FORMAT_VERSION, "sections": table, "meta": meta or {}},
+        sort_keys=True,
+        default=str,
+    ).encode("utf-8")
+    data_start = _round_up(_PREFIX.size + len(header), ALIGN)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)) + header)
+        for offset, t in order:
+            f.seek(data_start + offset)
+            f.write(_as_bytes(t))
+        f.truncate(data_start + size)
+    os.replace(tmp, path)
+    return path
+
+
+def _pinned(t) -> bool:
+    import torch
+
+    return t.device.type == "cuda" and torch.cuda.is_available()
+
+
+class AsyncCheckpointer:
+    """Snapshot on the caller's thread, write on a background thread."""
+
+    def __init__(self) -> None:
+        self._buffers: Dict[Tuple[str, str], Any] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self.saves = 0
+
+    def snapshot(self, sections: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Host copy of every tensor in `sections`, in buffers reused across
+        saves (pinned for CUDA tensors). Non-tensor values are kept as is.
+        """
+        import torch
+
+        any_cuda = False
+        out: Dict[str, Any] = {}
+        for name, state in sections.items():
+            tensors: Dict[str, Any] = {}
+            tree = _flatten(state, "", tensors)
+            copies = {}
+            for key, t in tensors.items():
+                buf = self._buffers.get((name, key))
+                if buf is None or buf.shape != t.shape or buf.dtype != t.dtype:
+                    buf = torch.empty(t.shape, dtype=t.dtype, pin_memory=_pinned(t))
+                    self._buffers[(name, key)] = buf
+                buf.copy_(t.detach(), non_blocking=True)
+                any_cuda |= t.device.type == "cuda"
+                copies[key] = buf
+            out[name] = _unflatten(tree, copies)
+        if any_cuda:
+            torch.cuda.synchronize()
+        return out
+
+    def save(self, path: PathLike, sections: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> None:
+        """Snapshot now, write in the background."""
+        self.wait()  # the snapshot buffers belong to the previous write until it finishes
+        snap = self.snapshot(sections)
+
+        def write() -> None:
+            try:
+                save_checkpoint(path, snap, meta)
+            except BaseException as e:  # surfaced on the next save / wait
+                self._error = e
+
+        self._thread = threading.Thread(target=write, name="ckpt-writer", daemon=True)
+        self._thread.start()
+        self.saves += 1
+
+    def wait(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise RuntimeError("background checkpoint write failed") from err
+
+    def close(self) -> None:
+        self.wait()
+        self._buffers.clear()
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def read_header(path: PathLike) -> Dict[str, Any]:
+    with Path(path).open("rb") as f:
+        magic, n = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a min_snr checkpoint: {path}")
+        header = json.loads(f.read(n).decode("utf-8"))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {header.get('version')} in {path}")
+    header["data_start"] = _round_up(_PREFIX.size + n, ALIGN)
+    return header
+
+
+def is_checkpoint(path: PathLike) -> bool:
+    p = Path(path)
+    if p.suffix == CKPT_SUFFIX:
+        return True
+    try:
+        with p.open("rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def load_state(
+    path: PathLike,
+    section: str = "ema",
+    device: Any = "cpu",
+    header: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """
+    One section as tensors backed by the mapped file (device="cpu"), or
+    copied to `device`. Mapped pages are copy-on-write: writing to the
+    tensors never touches the file.
+    """
+    import torch
+
+    header = header or read_header(path)
+    if section not in header["sections"]:
+        raise KeyError(f"No section {section!r} in {path} (has {sorted(header['sections'])})")
+    sec = header["sections"][section]
+    mm = np.memmap(path, dtype=np.uint8, mode="c", offset=header["data_start"]) \
+        if any(e["nbytes"] for e in sec["tensors"].values()) else None
+
+    tensors = {}
+    for key, e in sec["tensors"].items():
+        if e["nbytes"]:
+            arr = mm[e["offset"]:e["offset"] + e["nbytes"]].view(_NP_DTYPES[e["dtype"]]).reshape(e["shape"])
+        else:
+            arr = np.zeros(e["shape"], dtype=_NP_DTYPES[e["dtype"]])
+        t = torch.from_numpy(arr)
+        if e["dtype"] == "bfloat16":
+            t = t.view(torch.bfloat16)
+        if torch.device(device).type != "cpu":
+            t = t.to(device)
+        tensors[key] = t
+    if "tree" in sec:
+        return _unflatten(sec["tree"], tensors)
+    return tensors
+
+
+def load_checkpoint(path: PathLike, device: Any = "cpu") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """All sections and the meta dict: (sections, meta)."""
+    header = read_header(path)
+    sections = {name: load_state(path, name, device, header) for name in header["sections"]}
+    return sections, header["meta"]
+
+
+def torch_checkpoint_sections(src: PathLike) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split a torch.save'd checkpoint dict (e.g. ckpts/last.pt) into
+    (sections, meta): top-level entries holding tensors become sections,
+    plain values go to meta, anything else is dropped with a note.
+    """
+    import torch
+
+    obj = torch.load(Path(src), map_location="cpu")
+    if not isinstance(obj, dict):
+        raise ValueError(f"Expected a dict checkpoint in {src}, got {type(obj).__name__}")
+    if _is_flat(obj):
+        obj = {"model": obj}
+    sections: Dict[str, Any] = {}
+    meta: Dict[str, Any] = {"converted_from": str(src)}
+    for key, value in obj.items():
+        tensors: Dict[str, Any] = {}
+        try:
+            _flatten(value, "", tensors)
+        except TypeError as e:
+            print(f"[ckpt] {src}: dropping {key!r} ({e})")
+            continue
+        if tensors:
+            sections[str(key)] = value
+        else:
+            meta[str(key)] = value
+    return sections, meta
+
+
+def convert_torch_checkpoint(src: PathLike, dst: PathLike) -> Path:
+    """Rewrite a torch.save'd checkpoint in this format (see torch_checkpoint_sections)."""
+    return save_checkpoint(dst, *torch_checkpoint_sections(src))
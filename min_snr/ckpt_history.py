@@ -0,0 +1,293 @@
+"""
+Milestone checkpoint history: keyframes + lossless XOR deltas, chunk-deduplicated.
+
+Keeping every 2k-step checkpoint of a 50k run costs 25 full copies. Between
+milestones most weights move by a few ulps, so this store keeps:
+
+    keyframe   every `keyframe_every`-th milestone (and the first), each
+               tensor stored whole
+    delta      every other milestone, each tensor stored as the bitwise XOR
+               with the same tensor at the previous milestone
+
+Before compression each tensor's bytes are split into byte planes (all
+first bytes, then all second bytes, ...), so the XOR's mostly-zero sign /
+exponent / high-mantissa bytes form long zero runs. The planes are cut into
+fixed-size chunks named by their blake2b hash; a chunk is written once and
+shared by every tensor / milestone that produces it (frozen buffers and
+unchanged tensors cost nothing after the first time). Everything is
+lossless: `load(step)` returns bit-identical tensors.
+
+Layout of a history directory:
+
+    index.json        milestones in order: step, kind, meta, per-section
+                      tensor tables (dtype, shape, delta?, chunk hashes)
+                      and nested-state skeletons
+    chunks/ab/<hash>  compressed chunks (zlib, or zstd with the zstd extra)
+
+Reading milestone i decodes the nearest keyframe at or before it and applies
+at most `keyframe_every - 1` deltas.
+
+Usage:
+    hist = CheckpointHistory("runs/e7b/history")
+    hist.add(step, {"model": model.state_dict(), "ema": ema.state_dict()})
+    ema = hist.load(24000, "ema")
+    hist.export(24000, "runs/e7b/ckpt_24000.ckpt")       # for the eval tools
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from min_snr.ckpt import _NP_DTYPES, _dtype_name, _flatten, _is_flat, _unflatten, save_checkpoint
+from min_snr.logs import PathLike
+
+INDEX_FILE = "index.json"
+CODECS = ("zlib", "zstd")
+DEFAULT_KEYFRAME_EVERY = 8
+DEFAULT_CHUNK_BYTES = 1 << 20
+_UINT = {1: np.uint8, 2: np.uint16, 4: np.uint32, 8: np.uint64}
+
+
+class HistoryStats(NamedTuple):
+    milestones: int
+    keyframes: int
+    raw_bytes: int        # what full checkpoints of every milestone would take
+    stored_bytes: int     # chunk files on disk
+    chunks: int
+
+    @property
+    def ratio(self) -> float:
+        return self.stored_bytes / max(self.raw_bytes, 1)
+
+    def summary(self) -> str:
+        return (
+            f"{self.milestones} milestones ({self.keyframes} keyframes): "
+            f"{self.stored_bytes / 2**20:.1f} MiB stored for {self.raw_bytes / 2**20:.1f} MiB raw "
+            f"({self.ratio:.1%}), {self.chunks} chunks"
+        )
+
+
+def _codec(name: str):
+    if name == "zlib":
+        return (lambda b: zlib.compress(b, 6)), zlib.decompress
+    if name == "zstd":
+        from min_snr.logs import _import_zstandard
+
+        zstandard = _import_zstandard()
+        return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+    raise ValueError(f"Unknown codec {name!r} (expected one of {CODECS})")
+
+
+def _bits(t) -> np.ndarray:
+    """
+    A tensor's raw bits as a flat unsigned-int array (itemsize preserved).
+    The array owns its memory: it is kept as the base of the next delta, so
+    it must not follow in-place updates of a live CPU parameter.
+    """
+    import torch
+
+    src = t.detach()
+    t = src.cpu().contiguous()
+    if t.dtype == torch.bfloat16:
+        t = t.view(torch.int16)
+    a = t.numpy().reshape(-1)
+    if t.data_ptr() == src.data_ptr():
+        a = a.copy()
+    return a.view(_UINT[a.itemsize])
+
+
+def _planes(bits: np.ndarray) -> bytes:
+    return np.ascontiguousarray(bits.view(np.uint8).reshape(-1, bits.itemsize).T).tobytes()
+
+
+def _unplanes(raw: bytes, itemsize: int) -> np.ndarray:
+    planes = np.frombuffer(raw, dtype=np.uint8).reshape(itemsize, -1)
+    return planes.T.copy().reshape(-1).view(_UINT[itemsize])
+
+
+class CheckpointHistory:
+    """Append-only milestone store; see the module docstring."""
+
+    def __init__(
+        self,
+        root: PathLike,
+        keyframe_every: int = DEFAULT_KEYFRAME_EVERY,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        codec: str = "zlib",
+    ) -> None:
+        self.root = Path(root)
+        self.chunk_dir = self.root / "chunks"
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        index = self.root / INDEX_FILE
+        if index.exists():
+            data = json.loads(index.read_text())
+            self.keyframe_every = data["keyframe_every"]
+            self.chunk_bytes = data["chunk_bytes"]
+            self.codec = data["codec"]
+            self.milestones: List[Dict[str, Any]] = data["milestones"]
+        else:
+            self.keyframe_every = max(1, keyframe_every)
+            self.chunk_bytes = chunk_bytes
+            self.codec = codec
+            self.milestones = []
+        self._compress, self._decompress = _codec(self.codec)
+        self._last: Optional[Dict[str, Dict[str, np.ndarray]]] = None  # bits of the newest milestone
+
+    # -- chunks ---------------------------------------------------------------
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunk_dir / digest[:2] / digest
+
+    def _put(self, raw: bytes) -> List[str]:
+        names = []
+        for a in range(0, max(len(raw), 1), self.chunk_bytes):
+            piece = raw[a:a + self.chunk_bytes]
+            digest = hashlib.blake2b(piece, digest_size=20).hexdigest()
+            path = self._chunk_path(digest)
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp = path.with_name(path.name + ".tmp")
+                tmp.write_bytes(self._compress(piece))
+                os.replace(tmp, path)
+            names.append(digest)
+        return names
+
+    def _get(self, names: List[str]) -> bytes:
+        return b"".join(self._decompress(self._chunk_path(n).read_bytes()) for n in names)
+
+    # -- writing --------------------------------------------------------------
+
+    def steps(self) -> List[int]:
+        return [m["step"] for m in self.milestones]
+
+    def add(self, step: int, sections: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> str:
+        """Append milestone `step` (after all existing ones); returns its kind."""
+        if self.milestones and step <= self.milestones[-1]["step"]:
+            raise ValueError(f"Step {step} is not after the last milestone {self.milestones[-1]['step']}")
+        kind = "key" if len(self.milestones) % self.keyframe_every == 0 else "delta"
+        prev = None if kind == "key" else self._newest_bits()
+
+        record: Dict[str, Any] = {"step": int(step), "kind": kind, "meta": meta or {}, "sections": {}}
+        bits_by_section: Dict[str, Dict[str, np.ndarray]] = {}
+        for name, state in sections.items():
+            tensors: Dict[str, Any] = {}
+            tree = None if _is_flat(state) else _flatten(state, "", tensors)
+            if tree is None:
+                tensors = dict(state)
+            table = {}
+            bits_by_section[name] = {}
+            for key, t in tensors.items():
+                bits = _bits(t)
+                bits_by_section[name][key] = bits
+                base = (prev or {}).get(name, {}).get(key)
+                delta = base is not None and base.dtype == bits.dtype and base.size == bits.size
+                table[key] = {
+                    "dtype": _dtype_name(t),
+                    "shape": list(t.shape),
+                    "delta": delta,
+                    "chunks": self._put(_planes(bits ^ base if delta else bits)),
+                }
+            record["sections"][name] = {"tensors": table}
+            if tree is not None:
+                record["sections"][name]["tree"] = tree
+
+        self.milestones.append(record)
+        self._write_index()
+        self._last = bits_by_section
+        return kind
+
+    def _write_index(self) -> None:
+        data = {
+            "keyframe_every": self.keyframe_every,
+            "chunk_bytes": self.chunk_bytes,
+            "codec": self.codec,
+            "milestones": self.milestones,
+        }
+        tmp = self.root / (INDEX_FILE + ".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self.root / INDEX_FILE)
+
+    def _newest_bits(self) -> Dict[str, Dict[str, np.ndarray]]:
+        if self._last is None:  # reopened store: rebuild from disk once
+            self._last = self._decode(len(self.milestones) - 1)
+        return self._last
+
+    # -- reading --------------------------------------------------------------
+
+    def _decode(self, i: int, only: Optional[str] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """Raw bits of milestone i (optionally one section)."""
+        k = i
+        while self.milestones[k]["kind"] != "key":
+            k -= 1
+        state: Dict[str, Dict[str, np.ndarray]] = {}
+        for j in range(k, i + 1):
+            for name, sec in self.milestones[j]["sections"].items():
+                if only is not None and name != only:
+                    continue
+                cur = {}
+                for key, e in sec["tensors"].items():
+                    itemsize = np.dtype(_NP_DTYPES[e["dtype"]]).itemsize
+                    bits = _unplanes(self._get(e["chunks"]), itemsize)
+                    if e["delta"]:
+                        bits = bits ^ state[name][key]
+                    cur[key] = bits
+                state[name] = cur
+        return state
+
+    def _index_of(self, step: int) -> int:
+        for i, m in enumerate(self.milestones):
+            if m["step"] == step:
+                return i
+        raise KeyError(f"No milestone at step {step} (have {self.steps()})")
+
+    def load(self, step: int, section: Optional[str] = None) -> Any:
+        """
+        Tensors of milestone `step`: one section's state, or
+        {section: state} for all of them.
+        """
+        import torch
+
+        i = self._index_of(step)
+        bits = self._decode(i, section)
+        out = {}
+        for name, sec in self.milestones[i]["sections"].items():
+            if section is not None and name != section:
+                continue
+            tensors = {}
+            for key, e in sec["tensors"].items():
+                arr = bits[name][key].view(_NP_DTYPES[e["dtype"]]).reshape(e["shape"])
+                t = torch.from_numpy(arr)
+                tensors[key] = t.view(torch.bfloat16) if e["dtype"] == "bfloat16" else t
+            out[name] = _unflatten(sec["tree"], tensors) if "tree" in sec else tensors
+        if section is not None:
+            if section not in out:
+                raise KeyError(f"No section {section!r} at step {step}")
+            return out[section]
+        return out
+
+    def meta(self, step: int) -> Dict[str, Any]:
+        return self.milestones[self._index_of(step)]["meta"]
+
+    def export(self, step: int, out: PathLike) -> Path:
+        """Write milestone `step` as a regular min_snr.ckpt file."""
+        return save_checkpoint(out, self.load(step), dict(self.meta(step), step=step))
+
+    def stats(self) -> HistoryStats:
+        raw = 0
+        for m in self.milestones:
+            for sec in m["sections"].values():
+                for e in sec["tensors"].values():
+                    raw += int(np.prod(e["shape"])) * np.dtype(_NP_DTYPES[e["dtype"]]).itemsize
+        files = [p for p in self.chunk_dir.rglob("*") if p.is_file() and not p.name.endswith(".tmp")]
+        return HistoryStats(
+            len(self.milestones),
+            sum(m["kind"] == "key" for m in self.milestones),
+            raw,
+            sum(p.stat().st_size for p in files),
+            len(files),
+        )
@@ -0,0 +1,600 @@
+"""
+Command line entry point for the min_snr helpers.
+
+python -m min_snr.cli <command> [...]
+"""
+
+import argparse
+from typing import List, Optional
+
+
+def _add_archive(sub) -> None:
+    from min_snr.archive import CODECS
+
+    p = sub.add_parser(
+        "archive",
+        help="Compress the *.jsonl logs of finished run directories in place.",
+    )
+    p.add_argument("roots", nargs="+", help="Run directories (searched recursively).")
+    p.add_argument(
+        "--codec",
+        choices=CODECS,
+        default=None,
+        help="Compression codec (default: zst if zstandard is installed, else gz).",
+    )
+    p.add_argument("--level", type=int, default=None, help="Compression level.")
+    p.add_argument(
+        "--force",
+        action="store_true",
+        help="Also archive directories without a results.jsonl.",
+    )
+    p.add_argument("--dry-run", action="store_true", help="Only list what would change.")
+
+
+def _run_archive(args: argparse.Namespace) -> None:
+    from min_snr.archive import archive
+
+    for root in args.roots:
+        archive(root, args.codec, args.level, args.force, args.dry_run)
+
+
+def _add_samples(sub) -> None:
+    p = sub.add_parser(
+        "samples",
+        help="Show the header of sample shards (*.samples), optionally dump a grid PNG.",
+    )
+    p.add_argument("shards", nargs="+", help="Sample shard files.")
+    p.add_argument("--grid", type=str, default="", help="Write a grid PNG of the first shard.")
+    p.add_argument("--grid-n", type=int, default=36, help="Samples in the grid.")
+
+
+def _run_samples(args: argparse.Namespace) -> None:
+    from min_snr.samples import open_shard
+
+    for path in args.shards:
+        shard = open_shard(path)
+        meta = " ".join(f"{k}={v}" for k, v in sorted(shard.meta.items()))
+        print(f"[samples] {path}: {tuple(shard.images.shape)} {meta}")
+
+    if args.grid:
+        from min_snr.compose import save_png
+
+        grid = open_shard(args.shards[0]).grid(args.grid_n)
+        save_png(grid[..., 0] if grid.shape[2] == 1 else grid, args.grid)
+        print(f"[samples] Wrote {args.grid}")
+
+
+def _add_ckpt(sub) -> None:
+    p = sub.add_parser(
+        "ckpt",
+        help="Show the sections of *.ckpt files, or convert a torch.save checkpoint.",
+    )
+    p.add_argument("paths", nargs="+", help="Checkpoint files.")
+    p.add_argument(
+        "--convert",
+        default="",
+        help="Write the (single) torch.save checkpoint given as a *.ckpt here.",
+    )
+
+
+def _run_ckpt(args: argparse.Namespace) -> None:
+    from min_snr.ckpt import convert_torch_checkpoint, read_header
+
+    if args.convert:
+        if len(args.paths) != 1:
+            raise SystemExit("--convert takes exactly one input checkpoint")
+        convert_torch_checkpoint(args.paths[0], args.convert)
+        print(f"[ckpt] Wrote {args.convert}")
+        args.paths = [args.convert]
+
+    for path in args.paths:
+        header = read_header(path)
+        print(f"[ckpt] {path}: meta {header['meta']}")
+        for name, sec in header["sections"].items():
+            nbytes = sum(e["nbytes"] for e in sec["tensors"].values())
+            print(f"[ckpt]   {name:12s} {len(sec['tensors']):5d} tensors  {nbytes / 2**20:9.2f} MiB")
+
+
+def _add_ckpt_history(sub) -> None:
+    from min_snr.ckpt_history import CODECS, DEFAULT_KEYFRAME_EVERY
+
+    p = sub.add_parser(
+        "ckpt-history",
+        help="Keep milestone checkpoints as keyframes + compressed deltas; list / add / export.",
+    )
+    p.add_argument("root", help="History directory.")
+    p.add_argument(
+        "--add",
+        nargs="+",
+        default=[],
+        help="Checkpoints (*.ckpt or torch.save) to append, in step order. Step from their meta.",
+    )
+    p.add_argument("--step", type=int, default=None, help="Step for a single --add without one in meta.")
+    p.add_argument("--export", type=int, default=None, help="Milestone step to write out as a *.ckpt.")
+    p.add_argument("--out", default="", help="Output path for --export.")
+    p.add_argument(
+        "--keyframe-every",
+        type=int,
+        default=DEFAULT_KEYFRAME_EVERY,
+        help="Full snapshot every N milestones (new histories only).",
+    )
+    p.add_argument("--codec", choices=CODECS, default="zlib", help="Chunk compression (new histories only).")
+
+
+def _run_ckpt_history(args: argparse.Namespace) -> None:
+    from min_snr.ckpt import is_checkpoint, load_checkpoint, torch_checkpoint_sections
+    from min_snr.ckpt_history import CheckpointHistory
+
+    hist = CheckpointHistory(args.root, args.keyframe_every, codec=args.codec)
+    for path in args.add:
+        sections, meta = load_checkpoint(path) if is_checkpoint(path) else torch_checkpoint_sections(path)
+        step = meta.get("step", args.step if len(args.add) == 1 else None)
+        if step is None:
+            raise SystemExit(f"{path}: no 'step' in its meta; pass --step")
+        kind = hist.add(int(step), sections, {k: v for k, v in meta.items() if k != "step"})
+        print(f"[ckpt-history] step {step}: added {path} as {kind}")
+
+    if args.export is not None:
+        if not args.out:
+            raise SystemExit("--export needs --out")
+        hist.export(args.export, args.out)
+        print(f"[ckpt-history] Wrote step {args.export} to {args.out}")
+
+    print(f"[ckpt-history] {args.root}: {hist.stats().summary()}")
+    print(f"[ckpt-history] steps: {hist.steps()}")
+
+
+def _add_stage_sync(sub) -> None:
+    p = sub.add_parser(
+        "stage-sync",
+        help="Finish mirroring a staged run directory (e.g. after a crash) and check checksums.",
+    )
+    p.add_argument("dest", help="The run's destination directory (e.g. on Drive).")
+    p.add_argument("--local", default=None, help="Local staging directory (default: derived from dest).")
+
+
+def _run_stage_sync(args: argparse.Namespace) -> None:
+    from min_snr.staging import StagedDir
+
+    bad = StagedDir(args.dest, args.local, start=False).close()
+    if bad:
+        raise SystemExit(f"{len(bad)} file(s) still differ at {args.dest}")
+
+
+def _add_feature_metric_args(p, metric: str) -> None:
+    p.add_argument("gen", help="Generated samples (*.samples) or features (.npy).")
+    p.add_argument("--ref", required=True, help="Reference features (.npy) or shard.")
+    p.add_argument("--batch-size", type=int, default=250, help="Feature extraction batch.")
+    p.add_argument("--device", default="cuda")
+    p.add_argument("--log", default="", help=f"loss.jsonl to append val/{metric} metrics to.")
+    p.add_argument("--step", type=int, default=None, help="Step for the --log record.")
+
+
+def _check_log_args(args: argparse.Namespace) -> None:
+    if args.log and args.step is None:
+        raise SystemExit("--log needs --step")
+
+
+def _add_kid(sub) -> None:
+    from min_snr.kid import DEFAULT_REPEATS, DEFAULT_SUBSET_SIZE
+
+    p = sub.add_parser(
+        "kid",
+        help="KID of a sample shard (or .npy features) against reference features.",
+    )
+    _add_feature_metric_args(p, "kid_*")
+    p.add_argument("--subset-size", type=int, default=DEFAULT_SUBSET_SIZE)
+    p.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    p.add_argument("--seed", type=int, default=0, help="Subset sampling seed.")
+    p.add_argument(
+        "--improved-pct",
+        type=float,
+        default=None,
+        help="Also report the FID milestone gate (run_if_kid_improved_pct) vs --log history.",
+    )
+
+
+def _run_kid(args: argparse.Namespace) -> None:
+    from min_snr.features import resolve_features
+    from min_snr.kid import kid, should_run_fid
+    from min_snr.logs import append_record, load_metric_series
+
+    _check_log_args(args)
+    gen = resolve_features(args.gen, args.batch_size, args.device)
+    ref = resolve_features(args.ref, args.batch_size, args.device)
+    res = kid(gen, ref, args.subset_size, args.repeats, args.seed)
+    print(
+        f"[kid] {args.gen}: KID={res.mean:.5f} ± {res.std:.5f} "
+        f"(subset={res.subset_size}, repeats={args.repeats})"
+    )
+
+    if args.log:
+        try:
+            history = list(load_metric_series(args.log).get("val/kid_mean", ((), ()))[1])
+        except FileNotFoundError:
+            history = []
+        append_record(args.log, args.step, {"val/kid_mean": res.mean, "val/kid_std": res.std})
+        if args.improved_pct is not None:
+            run = should_run_fid(history + [res.mean], args.improved_pct)
+            print(f"[kid] FID milestone gate ({args.improved_pct}%): {'run' if run else 'skip'}")
+
+
+def _add_prdc(sub) -> None:
+    from min_snr.prdc import DEFAULT_K, DEFAULT_N_PROBE
+
+    p = sub.add_parser(
+        "prdc",
+        help="Precision/recall/density/coverage of samples against reference features.",
+    )
+    _add_feature_metric_args(p, "precision/recall/density/coverage")
+    p.add_argument("--k", type=int, default=DEFAULT_K, help="Nearest neighbour for the radii.")
+    p.add_argument(
+        "--n-real",
+        type=int,
+        default=None,
+        help="Subsample the reference set to this size (default: as many as generated).",
+    )
+    p.add_argument("--seed", type=int, default=0, help="Reference subsampling seed.")
+    p.add_argument(
+        "--approx",
+        choices=["auto", "on", "off"],
+        default="auto",
+        help="IVF partitioning (auto: on for >= 50k samples).",
+    )
+    p.add_argument("--n-probe", type=int, default=DEFAULT_N_PROBE)
+
+
+def _run_prdc(args: argparse.Namespace) -> None:
+    import numpy as np
+
+    from min_snr.features import resolve_features
+    from min_snr.logs import append_record
+    from min_snr.prdc import prdc
+
+    _check_log_args(args)
+    gen = resolve_features(args.gen, args.batch_size, args.device)
+    ref = resolve_features(args.ref, args.batch_size, args.device)
+    n_real = min(args.n_real or gen.shape[0], ref.shape[0])
+    if n_real < ref.shape[0]:
+        rng = np.random.default_rng(args.seed)
+        ref = ref[np.sort(rng.choice(ref.shape[0], n_real, replace=False))]
+
+    approx = {"auto": None, "on": True, "off": False}[args.approx]
+    res = prdc(ref, gen, k=args.k, approx=approx, n_probe=args.n_probe)
+    print(
+        f"[prdc] {args.gen}: precision={res.precision:.4f} recall={res.recall:.4f} "
+        f"density={res.density:.4f} coverage={res.coverage:.4f} "
+        f"(k={args.k}, n_real={n_real}, n_gen={gen.shape[0]})"
+    )
+    if args.log:
+        append_record(args.log, args.step, res.as_log())
+
+
+def _add_fid(sub) -> None:
+    from min_snr.fid import DEFAULT_LEVELS
+
+    p = sub.add_parser(
+        "fid",
+        help="FID of a sample shard (or .npy features), optionally extrapolated to N -> inf.",
+    )
+    p.add_argument("gen", help="Generated samples (*.samples) or features (.npy).")
+    p.add_argument("--ref-stats", required=True, help="Reference .npz with mu/sigma.")
+    p.add_argument("--batch-size", type=int, default=250, help="Feature extraction batch.")
+    p.add_argument("--device", default="cuda")
+    p.add_argument(
+        "--extrapolate",
+        action="store_true",
+        help="Fit FID_N = FID_inf + k/N over N/8..N subsets and report FID_inf.",
+    )
+    p.add_argument("--levels", type=int, default=DEFAULT_LEVELS, help="Subset levels (N/2**(L-1)..N).")
+    p.add_argument("--seed", type=int, default=0, help="Subset split seed.")
+    p.add_argument("--log", default="", help="loss.jsonl to append val/fid (or val/fid_inf*) to.")
+    p.add_argument("--step", type=int, default=None, help="Step for the --log record.")
+
+
+def _run_fid(args: argparse.Namespace) -> None:
+    from min_snr.features import resolve_features
+    from min_snr.fid import fid_extrapolate, fid_from_stats, gaussian_stats, load_ref_stats
+    from min_snr.logs import append_record
+
+    _check_log_args(args)
+    feats = resolve_features(args.gen, args.batch_size, args.device)
+    ref = load_ref_stats(args.ref_stats)
+
+    if not args.extrapolate:
+        fid = fid_from_stats(*gaussian_stats(feats), ref)
+        print(f"[fid] {args.gen}: n={feats.shape[0]} FID={fid:.3f}")
+        out = {"val/fid": fid}
+    else:
+        res = fid_extrapolate(feats, ref, args.levels, args.seed)
+        for n in sorted(set(res.sizes.tolist())):
+            sel = res.fids[res.sizes == n]
+            print(f"[fid]   n={n:6d}  FID={sel.mean():.3f} (x{sel.size})")
+        print(
+            f"[fid] {args.gen}: FID_N={res.fid_n:.3f}  "
+            f"FID_inf={res.fid_inf:.3f} ± {res.fid_inf_se:.3f}  (k={res.slope:.1f})"
+        )
+        out = res.as_log()
+
+    if args.log:
+        append_record(args.log, args.step, out)
+
+
+def _add_refstats(sub) -> None:
+    from min_snr.refstats import DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE
+
+    p = sub.add_parser(
+        "refstats",
+        help="Build reference FID stats (mu/sigma npz) from a dataset, resumably.",
+    )
+    p.add_argument(
+        "source",
+        help="cifar-10-batches-py dir, image folder, uint8 .npy array or *.samples shard.",
+    )
+    p.add_argument("--out", required=True, help="Output .npz (e.g. stats/cifar10_inception_train.npz).")
+    p.add_argument("--split", choices=["train", "test"], default=None, help="CIFAR-10 split.")
+    p.add_argument("--workers", type=int, default=1, help="Worker processes.")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Images per part file.")
+    p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Extractor batch.")
+    p.add_argument("--device", default="cpu")
+    p.add_argument(
+        "--extractor",
+        default=None,
+        help="Feature extractor 'module:callable' (default: the harness' Inception).",
+    )
+    p.add_argument("--limit", type=int, default=None, help="Use only the first N images.")
+    p.add_argument("--keep-parts", action="store_true", help="Keep per-chunk part files.")
+
+
+def _run_refstats(args: argparse.Namespace) -> None:
+    from min_snr.refstats import build_refstats
+
+    build_refstats(
+        args.source,
+        args.out,
+        split=args.split,
+        extractor=args.extractor,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        device=args.device,
+        limit=args.limit,
+        keep_parts=args.keep_parts,
+    )
+
+
+def _add_cifar_cache(sub) -> None:
+    p = sub.add_parser(
+        "cifar-cache",
+        help="Decode CIFAR-10 once into a uint8 memmap cache for MemmapLoader.",
+    )
+    p.add_argument("root", help="cifar-10-batches-py directory (or its parent).")
+    p.add_argument("--out", required=True, help="Cache .npy (e.g. data/cifar10_train_u8.npy).")
+    p.add_argument("--split", choices=["train", "test"], default="train")
+    p.add_argument("--force", action="store_true", help="Rebuild an existing cache.")
+
+
+def _run_cifar_cache(args: argparse.Namespace) -> None:
+    from min_snr.datasets import build_cifar10_cache
+
+    build_cifar10_cache(args.root, args.out, args.split, args.force)
+
+
+def _add_sample(sub) -> None:
+    from min_snr.sampling import add_sampler_args
+
+    p = sub.add_parser(
+        "sample",
+        help="Sample a checkpoint into a shard, streaming features (and FID) as it goes.",
+    )
+    add_sampler_args(p)
+    p.add_argument("--n", type=int, required=True, help="Number of samples.")
+    p.add_argument("--seed", type=int, default=0, help="Noise seed (Philox key).")
+    p.add_argument(
+        "--start",
+        type=int,
+        default=0,
+        help="First sample index; shards over disjoint ranges combine into one run.",
+    )
+    p.add_argument("--out", required=True, help="Output shard (*.samples).")
+    p.add_argument(
+        "--ref-stats",
+        default=None,
+        help="Reference .npz; when given, features are extracted while sampling and FID is reported.",
+    )
+    p.add_argument(
+        "--extractor",
+        default=None,
+        help="Feature extractor 'module:callable' (default: the harness' Inception).",
+    )
+    p.add_argument("--log", default="", help="loss.jsonl to append val/fid to.")
+    p.add_argument("--step", type=int, default=None, help="Step for the --log record.")
+
+
+def _run_sample(args: argparse.Namespace) -> None:
+    import numpy as np
+
+    from min_snr.features import features_path, get_extractor, input_size
+    from min_snr.sampling import engine_from_args, sample_features
+    from min_snr.samples import ShardWriter
+
+    _check_log_args(args)
+    engine = engine_from_args(args)
+    bs = engine.resolve_batch_size(args.n)
+    meta = {
+        "ckpt": args.ckpt,
+        "state_key": args.state_key,
+        "schedule": args.schedule,
+        "sampler": args.sampler,
+        "nfe": args.nfe,
+        "eta": args.eta,
+        "seed": args.seed,
+        "seed_start": args.start,
+    }
+    print(
+        f"[sample] samples {args.start}..{args.start + args.n - 1} (seed {args.seed}), "
+        f"{args.sampler} nfe={args.nfe}, batch {bs}"
+    )
+
+    with ShardWriter(args.out, meta, capacity=args.n) as writer:
+        if args.ref_stats is None:
+            for x in engine.sample(args.n, args.seed, args.start):
+                writer.append(x)
+            feats = None
+        else:
+            feats, stats = sample_features(
+                engine, args.n, get_extractor(args.extractor), args.seed, writer, args.start,
+                resize=input_size(args.extractor),
+            )
+            print(f"[sample] {stats.summary()}")
+    print(f"[sample] Wrote {args.out}")
+    if feats is None:
+        return
+
+    from min_snr.fid import fid_from_stats, gaussian_stats, load_ref_stats
+    from min_snr.logs import append_record
+
+    if args.extractor is None:
+        # Same cache `fid` / `kid` would build from the shard.
+        np.save(features_path(args.out), feats)
+    fid = fid_from_stats(*gaussian_stats(feats), load_ref_stats(args.ref_stats))
+    print(f"[sample] FID={fid:.3f}")
+    if args.log:
+        append_record(args.log, args.step, {"val/fid": fid})
+
+
+def _add_shard_eval(sub) -> None:
+    from min_snr.sampling import add_sampler_args
+    from min_snr.shard_eval import DEFAULT_PART_SIZE
+
+    p = sub.add_parser(
+        "shard-eval",
+        help="FID of a checkpoint with sampling + features split across worker processes.",
+    )
+    add_sampler_args(p)
+    p.add_argument("--n", type=int, required=True, help="Number of samples.")
+    p.add_argument("--seed", type=int, default=0, help="Noise seed (Philox key).")
+    p.add_argument("--ref-stats", required=True, help="Reference .npz with mu/sigma.")
+    p.add_argument("--out", required=True, help="Result JSON; parts go to <out>.parts/.")
+    p.add_argument("--workers", type=int, default=1, help="Worker processes (cores are split evenly).")
+    p.add_argument("--part-size", type=int, default=DEFAULT_PART_SIZE, help="Samples per part file.")
+    p.add_argument(
+        "--extractor",
+        default=None,
+        help="Feature extractor 'module:callable' (default: the harness' Inception).",
+    )
+    p.add_argument("--keep-parts", action="store_true", help="Keep per-part state files.")
+    p.add_argument("--log", default="", help="loss.jsonl to append val/fid to.")
+    p.add_argument("--step", type=int, default=None, help="Step for the --log record.")
+
+
+def _run_shard_eval(args: argparse.Namespace) -> None:
+    from min_snr.logs import append_record
+    from min_snr.shard_eval import SamplerSpec, sharded_fid
+
+    _check_log_args(args)
+    spec = SamplerSpec(
+        factory=args.model_factory,
+        ckpt=args.ckpt,
+        state_key=args.state_key,
+        schedule=args.schedule,
+        T=args.T,
+        sampler=args.sampler,
+        nfe=args.nfe,
+        eta=args.eta,
+        shape=(args.channels, args.image_size, args.image_size),
+        batch_size=args.sample_batch,
+        memory_budget=args.memory_budget_mb << 20,
+    )
+    res = sharded_fid(
+        spec,
+        args.n,
+        args.ref_stats,
+        args.out,
+        seed=args.seed,
+        workers=args.workers,
+        part_size=args.part_size,
+        extractor=args.extractor,
+        device=args.device,
+        keep_parts=args.keep_parts,
+    )
+    if args.log:
+        append_record(args.log, args.step, res.as_log())
+
+
+def _add_eval_worker(sub) -> None:
+    from min_snr.eval_service import DEFAULT_POLL_S, POLICIES
+    from min_snr.sampling import add_sampler_args
+
+    p = sub.add_parser(
+        "eval-worker",
+        help="Evaluate EMA snapshots a training run drops into a queue directory.",
+    )
+    p.add_argument("queue", help="Queue directory the trainer's SnapshotQueue writes to.")
+    p.add_argument("--log", required=True, help="loss.jsonl to append val/fid records to.")
+    p.add_argument("--policy", choices=POLICIES, default="latest", help="Backlog policy.")
+    add_sampler_args(p, checkpoint=False)
+    p.add_argument("--n", type=int, default=5000, help="Samples per evaluation.")
+    p.add_argument("--seed", type=int, default=0, help="Noise seed (same images every milestone).")
+    p.add_argument("--ref-stats", required=True, help="Reference .npz with mu/sigma.")
+    p.add_argument(
+        "--extractor",
+        default=None,
+        help="Feature extractor 'module:callable' (default: the harness' Inception).",
+    )
+    p.add_argument("--poll", type=float, default=DEFAULT_POLL_S, help="Seconds between queue scans.")
+    p.add_argument("--keep", action="store_true", help="Keep evaluated snapshots (as *.done).")
+
+
+def _run_eval_worker(args: argparse.Namespace) -> None:
+    from min_snr.eval_service import Evaluator, fid_evaluate
+
+    evaluate = fid_evaluate(
+        args.model_factory,
+        args.ref_stats,
+        args.n,
+        device=args.device,
+        seed=args.seed,
+        extractor=args.extractor,
+        schedule=args.schedule,
+        sampler=args.sampler,
+        nfe=args.nfe,
+        T=args.T,
+        shape=(args.channels, args.image_size, args.image_size),
+        batch_size=args.sample_batch,
+        memory_budget=args.memory_budget_mb << 20,
+        eta=args.eta,
+    )
+    done = Evaluator(args.queue, evaluate, args.log, args.policy, args.poll, args.keep).run()
+    print(f"[eval-worker] Queue closed after {len(done)} evaluation(s)")
+
+
+COMMANDS = {
+    "archive": (_add_archive, _run_archive),
+    "samples": (_add_samples, _run_samples),
+    "ckpt": (_add_ckpt, _run_ckpt),
+    "ckpt-history": (_add_ckpt_history, _run_ckpt_history),
+    "kid": (_add_kid, _run_kid),
+    "prdc": (_add_prdc, _run_prdc),
+    "fid": (_add_fid, _run_fid),
+    "refstats": (_add_refstats, _run_refstats),
+    "cifar-cache": (_add_cifar_cache, _run_cifar_cache),
+    "sample": (_add_sample, _run_sample),
+    "shard-eval": (_add_shard_eval, _run_shard_eval),
+    "eval-worker": (_add_eval_worker, _run_eval_worker),
+    "stage-sync": (_add_stage_sync, _run_stage_sync),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="min_snr", description="Min-SNR study helpers.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for add, _ in COMMANDS.values():
+        add(sub)
+
+    args = parser.parse_args(argv)
+    COMMANDS[args.command][1](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Pixel-exact tiling of sample grids into one comparison PNG.
+
+Images are decoded once, upscaled by an integer factor with
+nearest-neighbour (np.repeat, so every source pixel becomes an exact
+s x s block), pasted into a preallocated uint8 canvas and encoded as a
+single PNG. No matplotlib figure, no resampling blur on 32x32 samples.
+
+Example:
+    compose_grid(
+        ["docs/assets/e1/e1_samples/step_10000.png", "docs/assets/e3/e3_samples/step_10000.png"],
+        ["E1 @ 10k", "E3 @ 10k"],
+        "docs/assets/e3/e3_plots/e1_e3_samples_comparison.png",
+    )
+"""
+
+import math
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from min_snr.logs import PathLike
+from min_snr.samples import is_shard, open_shard
+
+# Auto scale aims for tiles about this wide (px).
+TARGET_TILE_PX = 512
+# Samples shown when a shard stands in for a grid PNG (6x6, like the run grids).
+SHARD_GRID_N = 36
+
+
+def load_rgb(path: PathLike) -> np.ndarray:
+    """
+    Decode an image to an (H, W, 3) uint8 array. Sample shards
+    (``*.samples``, see min_snr.samples) are read as a grid of their first
+    SHARD_GRID_N samples.
+    """
+    if is_shard(path):
+        grid = open_shard(path).grid(SHARD_GRID_N)
+        return np.repeat(grid, 3, axis=2) if grid.shape[2] == 1 else grid
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB"), dtype=np.uint8)
+
+
+def upscale_nearest(img: np.ndarray, scale: int) -> np.ndarray:
+    """Integer nearest-neighbour upscale of an (H, W, C) array."""
+    if scale == 1:
+        return img
+    return img.repeat(scale, axis=0).repeat(scale, axis=1)
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 only has the fixed bitmap font
+        return ImageFont.load_default()
+
+
+def tile_images(
+    images: Sequence[np.ndarray],
+    titles: Optional[Sequence[str]] = None,
+    cols: Optional[int] = None,
+    scale: Optional[int] = None,
+    pad: int = 8,
+    font_size: int = 16,
+    background: int = 255,
+) -> np.ndarray:
+    """
+    Tile (H, W, 3) uint8 images into one canvas, row-major.
+
+    `cols` defaults to ceil(sqrt(n)) like the old matplotlib grid; `scale`
+    defaults to the largest integer keeping tiles under TARGET_TILE_PX.
+    Images of different sizes are centred in a max-size cell.
+    """
+    n = len(images)
+    if n == 0:
+        raise ValueError("tile_images needs at least one image")
+    titles = list(titles) if titles else [""] * n
+    if len(titles) != n:
+        raise ValueError("Number of titles must be 0 or equal to number of images.")
+
+    cell_h = max(im.shape[0] for im in images)
+    cell_w = max(im.shape[1] for im in images)
+    if scale is None:
+        scale = max(1, TARGET_TILE_PX // cell_w)
+    cell_h, cell_w = cell_h * scale, cell_w * scale
+
+    cols = cols or math.ceil(math.sqrt(n))
+    rows = math.ceil(n / cols)
+
+    font = _font(font_size)
+    title_h = 0
+    if any(titles):
+        box = font.getbbox("Ag")
+        title_h = (box[3] - box[1]) + pad
+
+    canvas = np.full(
+        (pad + rows * (title_h + cell_h + pad), pad + cols * (cell_w + pad), 3),
+        background,
+        dtype=np.uint8,
+    )
+
+    origins = []
+    for i, im in enumerate(images):
+        r, c = divmod(i, cols)
+        y0 = pad + r * (title_h + cell_h + pad)
+        x0 = pad + c * (cell_w + pad)
+        origins.append((x0, y0))
+
+        big = upscale_nearest(im, scale)
+        oy = y0 + title_h + (cell_h - big.shape[0]) // 2
+        ox = x0 + (cell_w - big.shape[1]) // 2
+        canvas[oy:oy + big.shape[0], ox:ox + big.shape[1]] = big
+
+    if title_h:
+        pil = Image.fromarray(canvas)
+        draw = ImageDraw.Draw(pil)
+        for (x0, y0), title in zip(origins, titles):
+            if title:
+                w = draw.textlength(title, font=font)
+                draw.text((x0 + (cell_w - w) / 2, y0), title, fill=(0, 0, 0), font=font)
+        canvas = np.asarray(pil)
+
+    return canvas
+
+
+def save_png(canvas: np.ndarray, out_path: PathLike) -> Path:
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(canvas).save(out_path, format="PNG", optimize=False)
+    return out_path
+
+
+def compose_grid(
+    image_paths: Sequence[PathLike],
+    titles: Optional[List[str]],
+    out_path: PathLike,
+    cols: Optional[int] = None,
+    scale: Optional[int] = None,
+) -> Path:
+    """Decode, tile and write a comparison grid in one go."""
+    images = [load_rgb(p) for p in image_paths]
+    return save_png(tile_images(images, titles, cols=cols, scale=scale), out_path)
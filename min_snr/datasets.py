@@ -0,0 +1,309 @@
+"""
+Image sources for reference statistics and evaluation: uniform random access
+to uint8 NHWC images by index range, whatever they are stored as.
+
+Supported:
+    CIFAR-10 python batches   directory with data_batch_1..5 (train) / test_batch
+    image folder              directory of PNG/JPG files (sorted by path)
+    array file                .npy of uint8 (N, H, W, C), memory-mapped
+    sample shard              *.samples (see min_snr.samples)
+
+Sources are cheap to construct and read lazily, so a process pool can open
+its own copy per worker and read only the chunk it was given.
+
+For training, `build_cifar10_cache` decodes CIFAR-10 once into a contiguous
+uint8 NCHW ``.npy`` and `MemmapLoader` serves batches from it: one fancy-index
+gather per batch into a reused buffer, flips and [-1, 1] normalization as
+batched tensor ops, and a permutation derived from (seed, epoch), so the
+batch at any step is reproducible without worker processes or pickled
+per-sample transforms.
+
+Usage:
+    src = open_source("data/cifar-10-batches-py")
+    len(src), src.read(0, 2500).shape      # (50000, (2500, 32, 32, 3))
+
+    cache = build_cifar10_cache("data/cifar-10-batches-py", "data/cifar10_train_u8.npy")
+    loader = MemmapLoader(cache, batch_size=4, seed=1077)
+    for step, (x, y) in zip(range(total_steps), loader.batches()):
+        ...
+"""
+
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from min_snr.logs import PathLike
+
+CIFAR10_TRAIN = tuple(f"data_batch_{i}" for i in range(1, 6))
+CIFAR10_TEST = ("test_batch",)
+CIFAR10_BATCH = 10_000
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+
+class ImageSource:
+    """Random access to N uint8 (H, W, C) images."""
+
+    name = "source"
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Images [start, stop) as a uint8 (n, H, W, C) array."""
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, str]:
+        return {"kind": self.name}
+
+
+class ArraySource(ImageSource):
+    name = "array"
+
+    def __init__(self, path: PathLike) -> None:
+        self.path = Path(path)
+        self.images = np.load(self.path, mmap_mode="c")
+        if self.images.ndim != 4 or self.images.dtype != np.uint8:
+            raise ValueError(f"Expected uint8 (N, H, W, C) in {path}, got "
+                             f"{self.images.dtype} {self.images.shape}")
+
+    def __len__(self) -> int:
+        return self.images.shape[0]
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        return np.asarray(self.images[start:stop])
+
+    def describe(self) -> Dict[str, str]:
+        return {"kind": self.name, "path": str(self.path)}
+
+
+class ShardSource(ArraySource):
+    name = "samples"
+
+    def __init__(self, path: PathLike) -> None:
+        from min_snr.samples import open_shard
+
+        self.path = Path(path)
+        self.images = open_shard(path).images
+
+
+class CIFAR10Source(ImageSource):
+    """The python-pickle CIFAR-10 release (cifar-10-batches-py)."""
+
+    name = "cifar10"
+
+    def __init__(self, root: PathLike, split: str = "train") -> None:
+        self.root = Path(root)
+        self.split = split
+        self.files = CIFAR10_TRAIN if split == "train" else CIFAR10_TEST
+        missing = [f for f in self.files if not (self.root / f).exists()]
+        if missing:
+            raise FileNotFoundError(f"CIFAR-10 batches missing under {self.root}: {missing}")
+        self._cache: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return CIFAR10_BATCH * len(self.files)
+
+    def _batch(self, i: int) -> np.ndarray:
+        if i not in self._cache:
+            self._cache.clear()  # keep one 30 MB batch decoded at a time
+            self._cache[i] = load_cifar10_batch(self.root / self.files[i])
+        return self._cache[i]
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        parts = []
+        while start < stop:
+            b, off = divmod(start, CIFAR10_BATCH)
+            take = min(stop - start, CIFAR10_BATCH - off)
+            parts.append(self._batch(b)[off:off + take])
+            start += take
+        return np.concatenate(parts) if len(parts) != 1 else parts[0]
+
+    def describe(self) -> Dict[str, str]:
+        return {"kind": self.name, "path": str(self.root), "split": self.split}
+
+
+class FolderSource(ImageSource):
+    name = "folder"
+
+    def __init__(self, root: PathLike) -> None:
+        self.root = Path(root)
+        self.files: List[Path] = sorted(
+            p for p in self.root.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES
+        )
+        if not self.files:
+            raise FileNotFoundError(f"No images ({', '.join(IMAGE_SUFFIXES)}) under {self.root}")
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        from min_snr.compose import load_rgb
+
+        return np.stack([load_rgb(p) for p in self.files[start:stop]])
+
+    def describe(self) -> Dict[str, str]:
+        return {"kind": self.name, "path": str(self.root)}
+
+
+def load_cifar10_batch(path: PathLike) -> np.ndarray:
+    """One CIFAR-10 pickle batch as uint8 (10000, 32, 32, 3)."""
+    with Path(path).open("rb") as f:
+        d = pickle.load(f, encoding="bytes")
+    data = np.asarray(d[b"data"], dtype=np.uint8)
+    return np.ascontiguousarray(data.reshape(-1, 3, 32, 32).transpose(0, 2, 3, 1))
+
+
+def open_source(path: PathLike, split: Optional[str] = None) -> ImageSource:
+    """Pick the source type from what `path` looks like."""
+    p = Path(path)
+    if p.suffix == ".samples":
+        return ShardSource(p)
+    if p.suffix == ".npy":
+        return ArraySource(p)
+    if p.is_dir():
+        if (p / CIFAR10_TRAIN[0]).exists() or (p / CIFAR10_TEST[0]).exists():
+            return CIFAR10Source(p, split or "train")
+        if (p / "cifar-10-batches-py").is_dir():
+            return CIFAR10Source(p / "cifar-10-batches-py", split or "train")
+        return FolderSource(p)
+    raise ValueError(f"Don't know how to read images from {path}")
+
+
+# ---------------------------------------------------------------------------
+# Training cache
+# ---------------------------------------------------------------------------
+
+def labels_path(cache_path: PathLike) -> Path:
+    p = Path(cache_path)
+    return p.with_name(p.stem + ".labels.npy")
+
+
+def build_cifar10_cache(
+    root: PathLike,
+    out: PathLike,
+    split: str = "train",
+    force: bool = False,
+) -> Path:
+    """
+    Decode CIFAR-10 once into ``out`` (uint8 (N, 3, 32, 32) .npy) plus
+    ``<out stem>.labels.npy``. Returns `out`; an existing cache is reused.
+    """
+    out = Path(out)
+    if out.exists() and labels_path(out).exists() and not force:
+        return out
+    src = open_source(root, split)
+    if not isinstance(src, CIFAR10Source):
+        raise ValueError(f"{root} is not a CIFAR-10 python-batches directory")
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp.npy")
+    images = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8, shape=(len(src), 3, 32, 32))
+    labels = np.empty(len(src), dtype=np.int64)
+    for i, name in enumerate(src.files):
+        with (src.root / name).open("rb") as f:
+            d = pickle.load(f, encoding="bytes")
+        sl = slice(i * CIFAR10_BATCH, (i + 1) * CIFAR10_BATCH)
+        images[sl] = np.asarray(d[b"data"], dtype=np.uint8).reshape(-1, 3, 32, 32)
+        labels[sl] = d[b"labels"]
+    images.flush()
+    del images
+    np.save(labels_path(out), labels)
+    os.replace(tmp, out)
+    print(f"[datasets] Cached {len(src)} CIFAR-10 {split} images -> {out}")
+    return out
+
+
+class MemmapLoader:
+    """
+    Batches from a uint8 NCHW cache, deterministic in (seed, step).
+
+    Each epoch's permutation and flip mask are drawn up front from
+    ``default_rng([seed, epoch])``, so `batches(start_step)` resumes mid-run
+    with exactly the same data, and the per-batch work is one gather, an
+    in-place flip of the selected uint8 images and one float conversion.
+    Images come out as float32 NCHW in [-1, 1] on `device`.
+    """
+
+    def __init__(
+        self,
+        cache_path: PathLike,
+        batch_size: int,
+        seed: int = 0,
+        shuffle: bool = True,
+        hflip: bool = True,
+        drop_last: bool = True,
+        subset: Optional[int] = None,
+        device: str = "cpu",
+    ) -> None:
+        self.images = np.load(Path(cache_path), mmap_mode="r")
+        self.labels = np.load(labels_path(cache_path))
+        self.n = len(self.images) if subset is None else min(subset, len(self.images))
+        self.batch_size = batch_size
+        self.seed = seed
+        self.shuffle = shuffle
+        self.hflip = hflip
+        self.drop_last = drop_last
+        self.device = device
+        self._buf = np.empty((batch_size,) + self.images.shape[1:], dtype=np.uint8)
+
+    def __len__(self) -> int:
+        """Batches per epoch."""
+        if self.drop_last:
+            return self.n // self.batch_size
+        return -(-self.n // self.batch_size)
+
+    def epoch_order(self, epoch: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(sample order, per-position flip mask) of one epoch."""
+        rng = np.random.default_rng([self.seed, epoch])
+        order = rng.permutation(self.n) if self.shuffle else np.arange(self.n)
+        flips = rng.random(self.n) < 0.5 if self.hflip else np.zeros(self.n, dtype=bool)
+        return order, flips
+
+    def _collate(self, idx: np.ndarray, flip: np.ndarray) -> Tuple[Any, Any]:
+        import torch
+
+        buf = self._buf[:idx.size]
+        np.take(self.images, idx, axis=0, out=buf)
+        if flip.any():
+            buf[flip] = buf[flip, ..., ::-1]
+        x = torch.from_numpy(buf).to(self.device, non_blocking=True)
+        x = x.float().mul_(2.0 / 255.0).sub_(1.0)
+        y = torch.from_numpy(self.labels[idx]).to(self.device)
+        return x, y
+
+    def batches(self, start_step: int = 0) -> Iterator[Tuple[Any, Any]]:
+        """Endless (x, y) stream, starting at global batch `start_step`."""
+        per_epoch = len(self)
+        if per_epoch == 0:
+            raise ValueError(f"{self.n} images give no batch of {self.batch_size}")
+        epoch, i = divmod(start_step, per_epoch)
+        bs = self.batch_size
+        while True:
+            order, flips = self.epoch_order(epoch)
+            for b in range(i, per_epoch):
+                yield self._collate(order[b * bs:(b + 1) * bs], flips[b * bs:(b + 1) * bs])
+            epoch, i = epoch + 1, 0
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        """One epoch (epoch 0), like a DataLoader."""
+        it = self.batches()
+        for _ in range(len(self)):
+            yield next(it)
+
+
+def loader_from_config(cfg: Dict[str, Any], cache_path: PathLike, device: str = "cpu") -> MemmapLoader:
+    """MemmapLoader for a study config's ``data`` block (num_workers is ignored)."""
+    data = cfg.get("data", {})
+    if data.get("dataset", "cifar10") != "cifar10":
+        raise ValueError(f"MemmapLoader only serves cifar10, not {data.get('dataset')}")
+    return MemmapLoader(
+        cache_path,
+        batch_size=int(data.get("batch_size", 128)),
+        seed=int(cfg.get("seed", 0)),
+        shuffle=bool(data.get("shuffle", True)),
+        subset=data.get("subset"),
+        device=device,
+    )
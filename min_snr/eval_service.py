@@ -0,0 +1,345 @@
+"""
+Milestone evaluation out of the training loop.
+
+The trainer hands EMA weights to a `SnapshotQueue` and carries on: the
+weights are copied to host memory on the calling thread (so the snapshot is
+consistent), and a background thread writes them into the queue directory
+as ``step_NNNNNNNNN.ckpt`` (min_snr.ckpt, tmp file + rename, so readers
+never see a partial file). A separate process runs `Evaluator` over that
+directory, scores each snapshot (by default: sample + FID, see
+`fid_evaluate`) and appends ``{"_i": step, "out": {"val/fid": ...}}`` to
+the run's log.
+
+The backlog is bounded on both ends, with one of two policies:
+
+    skip     keep the oldest pending snapshots; new ones are dropped while
+             `max_pending` are already waiting (evaluate every k-th milestone)
+    latest   keep the newest; older pending snapshots are deleted, and the
+             evaluator always takes the most recent one
+
+Either way `submit` never waits for the evaluator, and never touches the
+queue directory: the writer thread recounts the pending snapshots after
+each write and every `poll_s` while idle, so a snapshot the evaluator has
+consumed frees its `skip` slot within `poll_s`. `close()` writes a STOP
+file after the last snapshot, and the evaluator exits once the queue is
+drained.
+
+An evaluator claims a snapshot by renaming it to
+``step_NNNNNNNNN.ckpt.<host>.<pid>.claimed``. If it dies mid-evaluation the
+claim is left behind; the next evaluator started on that host puts claims
+whose process is gone back into the queue (`Evaluator.recover`), where the
+policy applies to them like to any other pending snapshot.
+
+Usage (trainer):
+    q = SnapshotQueue("runs/e6/eval_queue", policy="latest")
+    if step % 2000 == 0:
+        q.submit(step, ema.state_dict())
+    ...
+    q.close()
+
+Usage (evaluator, another process / machine sharing the directory):
+    python -m min_snr.cli eval-worker runs/e6/eval_queue --log runs/e6/loss.jsonl \\
+        --model-factory my_models:unet_cifar32 --sampler ddpm --nfe 50 --n 5000 \\
+        --ref-stats stats/cifar10_inception_train.npz --device cuda
+"""
+
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from min_snr.ckpt import CKPT_SUFFIX, load_state, save_checkpoint
+from min_snr.logs import PathLike, append_record
+
+POLICIES = ("skip", "latest")
+SNAPSHOT_SUFFIX = CKPT_SUFFIX
+CLAIMED_SUFFIX = ".claimed"
+STOP_FILE = "STOP"
+DEFAULT_POLL_S = 5.0
+
+
+def snapshot_name(step: int) -> str:
+    return f"step_{step:09d}{SNAPSHOT_SUFFIX}"
+
+
+def snapshot_step(path: PathLike) -> int:
+    return int(Path(path).name.split(".")[0].split("_")[1])
+
+
+def pending_snapshots(queue_dir: PathLike) -> List[Path]:
+    """Complete, unclaimed snapshots, oldest step first."""
+    return sorted(Path(queue_dir).glob(f"step_*{SNAPSHOT_SUFFIX}"), key=snapshot_step)
+
+
+def _owner() -> str:
+    return f"{socket.gethostname().split('.')[0]}.{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # someone else's process
+        return True
+    return True
+
+
+def _unlink_quietly(path: Path) -> bool:
+    try:
+        path.unlink()
+        return True
+    except FileNotFoundError:  # claimed by an evaluator in the meantime
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Trainer side
+# ---------------------------------------------------------------------------
+
+class SnapshotQueue:
+    """Non-blocking hand-off of EMA snapshots to an evaluator directory."""
+
+    def __init__(
+        self,
+        queue_dir: PathLike,
+        policy: str = "latest",
+        max_pending: int = 1,
+        poll_s: float = DEFAULT_POLL_S,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backlog policy {policy!r} (expected one of {POLICIES})")
+        self.queue_dir = Path(queue_dir)
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        (self.queue_dir / STOP_FILE).unlink(missing_ok=True)
+        self.policy = policy
+        self.max_pending = max(1, max_pending)
+        self.poll_s = poll_s
+        self._on_disk = len(pending_snapshots(self.queue_dir))  # kept current by the writer
+        self.submitted = 0
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._next: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._writing = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._writer, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, step: int, state_dict: Dict[str, Any]) -> bool:
+        """Queue a copy of `state_dict` for evaluation; False if dropped."""
+        if self._error is not None:
+            raise RuntimeError("snapshot writer failed") from self._error
+        with self._cond:
+            in_memory = int(self._next is not None) + int(self._writing)
+            backlog = self._on_disk + in_memory
+            if self.policy == "skip" and backlog >= self.max_pending:
+                self.dropped += 1
+                print(f"[eval-queue] step {step}: {backlog} snapshot(s) pending, skipped")
+                return False
+        snap = {k: v.detach().to("cpu", copy=True) for k, v in state_dict.items()}
+        with self._cond:
+            if self._next is not None:  # latest: superseded before it was written
+                self.dropped += 1
+            self._next = (step, snap)
+            self.submitted += 1
+            self._cond.notify()
+        return True
+
+    def _recount(self) -> None:
+        """Pending snapshots on disk, for `skip`'s backlog check in submit."""
+        if self.policy == "skip":
+            try:
+                self._on_disk = len(pending_snapshots(self.queue_dir))
+            except OSError:  # mount hiccup: keep the last count
+                pass
+
+    def _writer(self) -> None:
+        while True:
+            with self._cond:
+                if self._next is None and not self._closed:
+                    self._cond.wait(self.poll_s)
+                if self._next is None:
+                    if self._closed:
+                        return
+                    idle = True
+                else:
+                    step, snap = self._next
+                    self._next = None
+                    self._writing = True
+                    idle = False
+            if idle:
+                self._recount()
+                continue
+            try:
+                save_checkpoint(self.queue_dir / snapshot_name(step), {"ema": snap}, {"step": step})
+                if self.policy == "latest":
+                    for old in pending_snapshots(self.queue_dir)[:-self.max_pending]:
+                        if _unlink_quietly(old):
+                            self.dropped += 1
+                self._recount()
+            except BaseException as e:  # surfaced on the next submit / close
+                self._error = e
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def flush(self) -> None:
+        """Wait until every submitted snapshot is on disk."""
+        with self._cond:
+            while self._next is not None or self._writing:
+                self._cond.wait()
+        if self._error is not None:
+            raise RuntimeError("snapshot writer failed") from self._error
+
+    def close(self) -> None:
+        """Write what is left and tell evaluators no more snapshots are coming."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        (self.queue_dir / STOP_FILE).touch()
+
+
+# ---------------------------------------------------------------------------
+# Evaluator side
+# ---------------------------------------------------------------------------
+
+class Evaluator:
+    """
+    Consume snapshots from `queue_dir` with `evaluate(path, step) -> dict`
+    and append each result to `log_path` at the snapshot's step.
+    """
+
+    def __init__(
+        self,
+        queue_dir: PathLike,
+        evaluate: Callable[[Path, int], Dict[str, Any]],
+        log_path: PathLike,
+        policy: str = "latest",
+        poll_s: float = DEFAULT_POLL_S,
+        keep: bool = False,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backlog policy {policy!r} (expected one of {POLICIES})")
+        self.queue_dir = Path(queue_dir)
+        self.evaluate = evaluate
+        self.log_path = Path(log_path)
+        self.policy = policy
+        self.poll_s = poll_s
+        self.keep = keep
+        self.done: List[int] = []
+        self.skipped: List[int] = []
+        self.recovered: List[int] = []
+
+    def claim(self) -> Optional[Tuple[int, Path]]:
+        """Take one snapshot off the queue (atomic rename), per the policy."""
+        ready = pending_snapshots(self.queue_dir)
+        if not ready:
+            return None
+        if self.policy == "latest":
+            pick = ready[-1]
+            for old in ready[:-1]:
+                if _unlink_quietly(old):
+                    self.skipped.append(snapshot_step(old))
+                    print(f"[eval-worker] step {snapshot_step(old)}: superseded, skipped")
+        else:
+            pick = ready[0]
+        claimed = pick.with_name(f"{pick.name}.{_owner()}{CLAIMED_SUFFIX}")
+        try:
+            os.rename(pick, claimed)
+        except FileNotFoundError:  # another evaluator got it first
+            return None
+        return snapshot_step(pick), claimed
+
+    def recover(self) -> List[int]:
+        """
+        Put claims left by dead evaluators on this host back into the queue.
+        Claims held by live processes or by other hosts are left alone.
+        Returns the re-queued steps.
+        """
+        host = _owner().split(".")[0]
+        steps = []
+        for path in sorted(self.queue_dir.glob(f"step_*{SNAPSHOT_SUFFIX}.*{CLAIMED_SUFFIX}")):
+            owner = path.name[:-len(CLAIMED_SUFFIX)].split(".")
+            if owner[-2] != host or not owner[-1].isdigit() or _pid_alive(int(owner[-1])):
+                continue
+            step = snapshot_step(path)
+            try:
+                os.rename(path, path.with_name(snapshot_name(step)))
+            except FileNotFoundError:  # another evaluator recovered it first
+                continue
+            steps.append(step)
+            print(f"[eval-worker] step {step}: stale claim from pid {owner[-1]}, re-queued")
+        self.recovered.extend(steps)
+        return steps
+
+    def run_once(self) -> Optional[int]:
+        """Evaluate one snapshot if one is ready; returns its step."""
+        item = self.claim()
+        if item is None:
+            return None
+        step, path = item
+        t0 = time.perf_counter()
+        out = dict(self.evaluate(path, step))
+        out["eval/wall_s"] = time.perf_counter() - t0
+        append_record(self.log_path, step, out)
+        self.done.append(step)
+        print(f"[eval-worker] step {step}: " + ", ".join(
+            f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in out.items()
+        ))
+        if self.keep:
+            os.replace(path, path.with_name(snapshot_name(step) + ".done"))
+        else:
+            path.unlink()
+        return step
+
+    def finished(self) -> bool:
+        return (self.queue_dir / STOP_FILE).exists() and not pending_snapshots(self.queue_dir)
+
+    def run(self, stop_when_finished: bool = True) -> List[int]:
+        """
+        Re-queue stale claims, then poll until the trainer has closed its queue
+        and nothing is pending.
+        """
+        self.recover()
+        while True:
+            if self.run_once() is not None:
+                continue
+            if stop_when_finished and self.finished():
+                return self.done
+            time.sleep(self.poll_s)
+
+
+def fid_evaluate(
+    factory: str,
+    ref_stats: PathLike,
+    n: int,
+    device: Any = "cpu",
+    seed: int = 0,
+    extractor: Optional[str] = None,
+    **engine_kwargs: Any,
+) -> Callable[[Path, int], Dict[str, Any]]:
+    """
+    evaluate(path, step) that loads a snapshot's EMA weights into one model
+    built up front, samples `n` images and returns {"val/fid": ...}.
+    """
+    from min_snr.features import get_extractor, input_size
+    from min_snr.fid import fid_from_stats, gaussian_stats, load_ref_stats
+    from min_snr.sampling import SamplerEngine, load_model, sample_features
+
+    model = load_model(factory, device=device)
+    engine = SamplerEngine(model, device=device, **engine_kwargs)
+    ref = load_ref_stats(ref_stats)
+    extract = get_extractor(extractor)
+
+    def evaluate(path: Path, step: int) -> Dict[str, Any]:
+        model.load_state_dict(load_state(path, "ema"))
+        feats, _ = sample_features(engine, n, extract, seed, resize=input_size(extractor))
+        return {"val/fid": fid_from_stats(*gaussian_stats(feats), ref)}
+
+    return evaluate
@@ -0,0 +1,129 @@
+"""
+Inception features for stored sample shards, cached next to the shard.
+
+Feature extraction is the only expensive step left once samples live in a
+shard (min_snr.samples), so it runs once per shard: the (N, 2048) float32
+activations are written as ``<shard>.feats.npy`` and every metric (FID, KID,
+precision/recall) memory-maps that file afterwards.
+
+Extraction uses the same Inception path as the harness' FID evaluation
+(``ablation_harness.eval.generative._inception_activations``), imported
+lazily so metric code can run on cached features without the harness.
+
+Usage:
+    feats = shard_features("runs/e8a/samples/step_50000.samples", device="cuda")
+    ref = load_features("stats/cifar10_inception_train.feats.npy")
+"""
+
+import importlib
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from min_snr.logs import PathLike
+
+FEATS_SUFFIX = ".feats.npy"
+# Default feature extractor: fn(x01 NCHW float tensor, device) -> (n, D) array.
+INCEPTION = "ablation_harness.eval.generative:_inception_activations"
+# Its input resolution. Inception resizes to this itself; doing it beforehand
+# moves the resize onto min_snr.pipeline's producer thread.
+INCEPTION_SIZE = 299
+
+
+def _import_inception():
+    try:
+        from ablation_harness.eval.generative import _inception_activations
+    except ImportError as e:
+        raise ImportError(
+            "Extracting Inception features needs ablation_harness "
+            "(git submodule update --init && pip install -e external/ablation-harness)."
+        ) from e
+    return _inception_activations
+
+
+def load_callable(spec: str) -> Callable[..., Any]:
+    """Resolve a ``"package.module:attr"`` string to the object it names."""
+    module, _, attr = spec.partition(":")
+    if not module or not attr:
+        raise ValueError(f"Expected 'module:callable', got {spec!r}")
+    obj = importlib.import_module(module)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def get_extractor(spec: Optional[str] = None) -> Callable[..., Any]:
+    """The feature extractor named by `spec` (default: the harness' Inception)."""
+    if spec is None or spec == INCEPTION:
+        return _import_inception()
+    return load_callable(spec)
+
+
+def input_size(spec: Optional[str] = None) -> Optional[int]:
+    """Size to resize inputs to for `spec`'s extractor (None: leave as is)."""
+    return INCEPTION_SIZE if spec is None or spec == INCEPTION else None
+
+
+def features_path(shard_path: PathLike) -> Path:
+    p = Path(shard_path)
+    return p.with_name(p.name + FEATS_SUFFIX)
+
+
+def load_features(path: PathLike) -> np.ndarray:
+    """Memory-map an (N, D) feature array saved with np.save."""
+    feats = np.load(Path(path), mmap_mode="r")
+    if feats.ndim != 2:
+        raise ValueError(f"Expected (N, D) features in {path}, got shape {feats.shape}")
+    return feats
+
+
+def shard_features(
+    shard_path: PathLike,
+    batch_size: int = 250,
+    device: str = "cuda",
+    refresh: bool = False,
+) -> np.ndarray:
+    """
+    Inception features of every sample in a shard, cached as
+    ``<shard>.feats.npy`` (recomputed when the shard is newer or `refresh`).
+    """
+    from min_snr.pipeline import extract_features
+    from min_snr.samples import open_shard
+
+    shard_path = Path(shard_path)
+    cache = features_path(shard_path)
+    if (
+        not refresh
+        and cache.exists()
+        and cache.stat().st_mtime >= shard_path.stat().st_mtime
+    ):
+        return load_features(cache)
+
+    shard = open_shard(shard_path)
+    if len(shard) == 0:
+        raise ValueError(f"Shard has no samples: {shard_path}")
+    out, stats = extract_features(
+        shard.iter_batches(batch_size, device),
+        _import_inception(),
+        device,
+        n_total=len(shard),
+        from_pm1=False,
+        resize=INCEPTION_SIZE,
+    )
+    print(f"[features] {stats.summary()}")
+
+    tmp = cache.with_name(cache.name + ".tmp.npy")
+    np.save(tmp, out)
+    tmp.replace(cache)
+    print(f"[features] Cached {out.shape} -> {cache}")
+    return load_features(cache)
+
+
+def resolve_features(path: PathLike, batch_size: int = 250, device: str = "cuda") -> np.ndarray:
+    """Features from a ``.npy`` file, or (cached) from a sample shard."""
+    from min_snr.samples import is_shard
+
+    if is_shard(path):
+        return shard_features(path, batch_size, device)
+    return load_features(path)
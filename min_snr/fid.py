@@ -0,0 +1,192 @@
+"""
+FID from Gaussian feature statistics, plus 1/N bias-corrected extrapolation.
+
+FID is biased upwards at finite sample counts, roughly FID_N = FID_inf + k/N,
+so milestone FIDs at n_samples=5000 and final FIDs at 10000 are not directly
+comparable. `fid_extrapolate` takes one feature set, computes FID on disjoint
+subsets of N/8, N/4, N/2 and N samples, fits that line in 1/N and reports the
+intercept FID_inf with its standard error.
+
+The subset statistics are built bottom-up: one pass over the features gives
+(count, sum, Gram) for eight random chunks, and each coarser level merges
+pairs of chunks, so the features are read once regardless of the number of
+levels. The matrix square root uses the reference covariance's
+eigendecomposition (computed once, or read from the stats file), leaving one
+symmetric eigvalsh per FID.
+
+Usage:
+    ref = load_ref_stats("stats/cifar10_inception_train.npz")
+    fid_from_stats(*gaussian_stats(feats), ref)
+    res = fid_extrapolate(feats, ref)
+    res.fid_inf, res.fid_inf_se
+"""
+
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from min_snr.logs import PathLike
+
+DEFAULT_LEVELS = 4   # N/8, N/4, N/2, N
+_BLOCK = 4096
+
+
+class RefStats(NamedTuple):
+    mu: np.ndarray
+    sigma: np.ndarray
+    sqrt_sigma: np.ndarray   # symmetric PSD square root of sigma
+
+
+class FIDExtrapolation(NamedTuple):
+    fid_inf: float
+    fid_inf_se: float
+    slope: float             # k in FID_N = FID_inf + k / N
+    fid_n: float             # FID on all N samples
+    sizes: np.ndarray        # subset size of every fitted point
+    fids: np.ndarray         # FID of every fitted point
+
+    def as_log(self, prefix: str = "val/") -> dict:
+        return {
+            f"{prefix}fid_inf": self.fid_inf,
+            f"{prefix}fid_inf_se": self.fid_inf_se,
+            f"{prefix}fid_inf_slope": self.slope,
+        }
+
+
+def sqrt_psd(sigma: np.ndarray) -> np.ndarray:
+    """Symmetric square root of a PSD matrix via eigh (negative eigenvalues clipped)."""
+    w, v = np.linalg.eigh(sigma)
+    return (v * np.sqrt(np.clip(w, 0.0, None))) @ v.T
+
+
+def ref_stats(mu: np.ndarray, sigma: np.ndarray) -> RefStats:
+    mu = np.asarray(mu, dtype=np.float64)
+    sigma = np.asarray(sigma, dtype=np.float64)
+    return RefStats(mu, sigma, sqrt_psd(sigma))
+
+
+def load_ref_stats(path: PathLike) -> RefStats:
+    """
+    Reference stats from an .npz with ``mu`` and ``sigma``; the square root is
+    rebuilt from stored ``eigvals`` / ``eigvecs`` when present.
+    """
+    with np.load(Path(path)) as stats:
+        mu = stats["mu"].astype(np.float64)
+        sigma = stats["sigma"].astype(np.float64)
+        if "eigvals" in stats and "eigvecs" in stats:
+            w = np.clip(stats["eigvals"].astype(np.float64), 0.0, None)
+            v = stats["eigvecs"].astype(np.float64)
+            return RefStats(mu, sigma, (v * np.sqrt(w)) @ v.T)
+    return RefStats(mu, sigma, sqrt_psd(sigma))
+
+
+def gaussian_stats(feats: np.ndarray, block: int = _BLOCK) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean and (n - 1)-normalized covariance of (N, D) features, in float64."""
+    n, s, g = _moments(feats, np.arange(feats.shape[0]), block)
+    return _mean_cov(n, s, g)
+
+
+def fid_from_stats(mu: np.ndarray, sigma: np.ndarray, ref: RefStats) -> float:
+    """
+    Frechet distance between N(mu, sigma) and the reference Gaussian.
+
+    tr sqrt(sigma_ref sigma) is computed as the sum of square roots of the
+    eigenvalues of sqrt(sigma_ref) sigma sqrt(sigma_ref), which is symmetric.
+    """
+    diff = mu - ref.mu
+    m = ref.sqrt_sigma @ sigma @ ref.sqrt_sigma
+    tr_covmean = np.sqrt(np.clip(np.linalg.eigvalsh((m + m.T) / 2.0), 0.0, None)).sum()
+    return float(diff @ diff + np.trace(sigma) + np.trace(ref.sigma) - 2.0 * tr_covmean)
+
+
+# ---------------------------------------------------------------------------
+# Extrapolation
+# ---------------------------------------------------------------------------
+
+def _moments(
+    feats: np.ndarray,
+    idx: np.ndarray,
+    block: int,
+    shift: Optional[np.ndarray] = None,
+) -> tuple:
+    """
+    (count, sum, Gram) of feats[idx] - shift, read in sorted blocks
+    (memmap-friendly).
+    """
+    idx = np.sort(idx)
+    d = feats.shape[1]
+    s = np.zeros(d)
+    g = np.zeros((d, d))
+    for a in range(0, idx.size, block):
+        x = np.asarray(feats[idx[a:a + block]], dtype=np.float64)
+        if shift is not None:
+            x -= shift
+        s += x.sum(axis=0)
+        g += x.T @ x
+    return idx.size, s, g
+
+
+def _mean_cov(n: int, s: np.ndarray, g: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    mu = s / n
+    return mu, (g - n * np.outer(mu, mu)) / (n - 1)
+
+
+def fit_inverse_n(sizes: np.ndarray, fids: np.ndarray) -> Tuple[float, float, float]:
+    """
+    Least-squares fit fid = a + b / n. Returns (a, standard error of a, b).
+
+    The standard error treats the points as independent; subsets of one
+    feature set are positively correlated, so read it as a rough band.
+    """
+    x = 1.0 / np.asarray(sizes, dtype=np.float64)
+    y = np.asarray(fids, dtype=np.float64)
+    m = x.size
+    xbar = x.mean()
+    sxx = ((x - xbar) ** 2).sum()
+    b = ((x - xbar) * (y - y.mean())).sum() / sxx
+    a = y.mean() - b * xbar
+    if m <= 2:
+        return float(a), float("nan"), float(b)
+    s2 = ((y - a - b * x) ** 2).sum() / (m - 2)
+    se = np.sqrt(s2 * (1.0 / m + xbar ** 2 / sxx))
+    return float(a), float(se), float(b)
+
+
+def fid_extrapolate(
+    feats: np.ndarray,
+    ref: RefStats,
+    levels: int = DEFAULT_LEVELS,
+    rng_seed: int = 0,
+    block: int = _BLOCK,
+) -> FIDExtrapolation:
+    """
+    FID on disjoint subsets of N / 2**(levels-1), ..., N/2, N samples and the
+    1/N extrapolation to FID_inf.
+    """
+    n_total = feats.shape[0]
+    n_chunks = 2 ** (levels - 1)
+    if n_total // n_chunks < 2:
+        raise ValueError(f"Need at least {2 * n_chunks} samples for {levels} levels")
+
+    # Shift by a rough mean so the Gram accumulation doesn't lose precision.
+    shift = np.asarray(feats[: min(n_total, _BLOCK)], dtype=np.float64).mean(axis=0)
+    perm = np.random.default_rng(rng_seed).permutation(n_total)
+    level = [_moments(feats, idx, block, shift) for idx in np.array_split(perm, n_chunks)]
+
+    sizes: List[int] = []
+    fids: List[float] = []
+    while True:
+        for n, s, g in level:
+            mu, sigma = _mean_cov(n, s, g)
+            sizes.append(n)
+            fids.append(fid_from_stats(mu + shift, sigma, ref))
+        if len(level) == 1:
+            break
+        level = [
+            tuple(a + b for a, b in zip(level[i], level[i + 1]))
+            for i in range(0, len(level), 2)
+        ]
+
+    fid_inf, se, slope = fit_inverse_n(np.array(sizes), np.array(fids))
+    return FIDExtrapolation(fid_inf, se, slope, fids[-1], np.array(sizes), np.array(fids))
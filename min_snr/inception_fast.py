@@ -0,0 +1,291 @@
+"""
+Faster CPU Inception feature extraction, guarded by an FID calibration check.
+
+Modes:
+    fp32   the reference: the harness' Inception (min_snr.features.INCEPTION),
+           i.e. the network the reference stats were built with, unchanged
+    fast   channels_last weights and inputs, traced + frozen TorchScript graph
+           (conv/bn folding, optimize_for_inference)
+    int8   fast, plus post-training int8 quantization (FX graph mode, x86
+           backend) calibrated on the calibration images
+
+Speed is only worth having with a known error, so a non-fp32 mode is handed
+out by `guarded_extractor` only after `calibrate` has run both the reference
+extractor (the FID path actually in use) and the fast model on a fixed,
+seeded calibration set and the FID difference (against the reference stats,
+or between the two feature sets when no stats are given) is within `tol`.
+Otherwise it raises FastModeRefused. A fast model built from a different
+network than the one behind the stats fails this check and is refused.
+
+The fast model comes from a factory returning an nn.Module that maps [0, 1]
+NCHW images to (n, 2048) pool features; the default wraps pytorch-fid's
+InceptionV3 (pip install -e '.[fast-fid]'), and ``--inception-factory
+module:callable`` points at any other builder. Fast models run on CPU;
+inputs on another device are copied over.
+
+Usage:
+    ext, report = guarded_extractor("int8", calib_images, ref, tol=0.1)
+    print(report.summary())
+    feats = ext(x01, "cpu")
+"""
+
+import time
+import warnings
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+from min_snr.fid import RefStats, fid_from_stats, gaussian_stats, ref_stats
+
+MODES = ("fp32", "fast", "int8")
+DEFAULT_TOL = 0.1          # absolute FID points
+DEFAULT_CALIB_N = 1000
+_CALIB_BATCH = 50
+
+
+class FastModeRefused(RuntimeError):
+    pass
+
+
+class CalibrationReport(NamedTuple):
+    mode: str
+    n_images: int
+    fid_fp32: float
+    fid_fast: float
+    delta: float             # |fid_fast - fid_fp32|
+    max_rel_err: float       # max over images of |f_fast - f_fp32| / |f_fp32|
+    fp32_s: float
+    fast_s: float
+    tol: float
+
+    @property
+    def ok(self) -> bool:
+        return self.delta <= self.tol
+
+    @property
+    def speedup(self) -> float:
+        return self.fp32_s / max(self.fast_s, 1e-9)
+
+    def summary(self) -> str:
+        verdict = "ok" if self.ok else "REFUSED"
+        return (
+            f"{self.mode}: FID delta {self.delta:.4f} (tol {self.tol}) on {self.n_images} images, "
+            f"max feature rel. err {self.max_rel_err:.2e}, {self.speedup:.2f}x faster -> {verdict}"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Models
+# ---------------------------------------------------------------------------
+
+def _import_pytorch_fid():
+    try:
+        from pytorch_fid.inception import InceptionV3
+    except ImportError as e:
+        raise ImportError(
+            "The default fast-Inception model needs the 'pytorch-fid' package "
+            "(pip install -e '.[fast-fid]'), or pass --inception-factory module:callable."
+        ) from e
+    return InceptionV3
+
+
+def pytorch_fid_inception():
+    """pytorch-fid InceptionV3 pool3 features as an (n, 2048) nn.Module."""
+    import torch.nn as nn
+
+    InceptionV3 = _import_pytorch_fid()
+
+    class Pool3(nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.net = InceptionV3([InceptionV3.BLOCK_INDEX_BY_DIM[2048]])
+
+        def forward(self, x):
+            return self.net(x)[0].flatten(1)
+
+    return Pool3()
+
+
+def load_model(factory: Optional[str] = None):
+    from min_snr.features import load_callable
+
+    build = load_callable(factory) if factory else pytorch_fid_inception
+    model = build()
+    model.eval()
+    for p in model.parameters():
+        p.requires_grad_(False)
+    return model
+
+
+def optimize(model, mode: str, example, calib: Optional[Callable[[], Any]] = None):
+    """
+    Apply the `mode` optimizations to an eval-mode model. `example` is one
+    input batch; `calib` yields calibration batches for int8.
+    """
+    import torch
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r} (expected one of {MODES})")
+    if mode == "fp32":
+        return model
+
+    if mode == "int8":
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+        torch.backends.quantized.engine = "x86"
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            prepared = prepare_fx(model, get_default_qconfig_mapping("x86"), (example,))
+            with torch.inference_mode():
+                for x in calib():
+                    prepared(x)
+            model = convert_fx(prepared)
+
+    model = model.to(memory_format=torch.channels_last)
+    example = example.contiguous(memory_format=torch.channels_last)
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, example, check_trace=False)
+        traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+        traced(example)  # warm-up / profile run
+    return traced
+
+
+def as_extractor(model, mode: str) -> Callable[[Any, Any], np.ndarray]:
+    """Wrap a model as extractor(x01, device) -> (n, D) float32 array."""
+    import torch
+
+    channels_last = mode != "fp32"
+
+    def extract(x01, device=None):
+        with torch.inference_mode():
+            x01 = x01.cpu()  # the model (and its traced graph) lives on CPU
+            if channels_last:
+                x01 = x01.contiguous(memory_format=torch.channels_last)
+            return model(x01).float().cpu().numpy()
+
+    return extract
+
+
+# ---------------------------------------------------------------------------
+# Calibration
+# ---------------------------------------------------------------------------
+
+def calibration_images(source: Optional[str] = None, n: int = DEFAULT_CALIB_N, seed: int = 0):
+    """
+    Fixed calibration set as a float [0, 1] NCHW tensor: `n` seeded picks
+    from an image source (see min_snr.datasets), or without one seeded
+    smooth random images.
+    """
+    import torch
+    import torch.nn.functional as F
+
+    if source is not None:
+        from min_snr.datasets import open_source
+
+        src = open_source(source)
+        idx = np.sort(np.random.default_rng(seed).choice(len(src), min(n, len(src)), replace=False))
+        imgs = np.stack([src.read(i, i + 1)[0] for i in idx])
+        return torch.from_numpy(imgs).permute(0, 3, 1, 2).float().div_(255.0)
+
+    g = torch.Generator().manual_seed(seed)
+    low = torch.rand(n, 3, 4, 4, generator=g)
+    return (F.interpolate(low, size=(32, 32), mode="bicubic", align_corners=False)
+            + 0.1 * torch.randn(n, 3, 32, 32, generator=g)).clamp_(0.0, 1.0)
+
+
+def _features(extract, images, batch: int = _CALIB_BATCH):
+    t0 = time.perf_counter()
+    feats = np.concatenate([
+        np.asarray(extract(images[a:a + batch], "cpu")) for a in range(0, len(images), batch)
+    ])
+    return feats.astype(np.float64), time.perf_counter() - t0
+
+
+def calibrate(
+    mode: str,
+    images,
+    ref: Optional[RefStats] = None,
+    tol: float = DEFAULT_TOL,
+    factory: Optional[str] = None,
+    reference: Optional[Callable[..., Any]] = None,
+) -> tuple:
+    """
+    Build the `mode` extractor and compare it on `images` with `reference`
+    (default: the harness' Inception). Returns (extractor, CalibrationReport).
+    """
+    from min_snr.features import get_extractor
+
+    f32, t32 = _features(reference or get_extractor(None), images)
+
+    example = images[:_CALIB_BATCH]
+    calib = lambda: (images[a:a + _CALIB_BATCH] for a in range(0, len(images), _CALIB_BATCH))  # noqa: E731
+    fast = as_extractor(optimize(load_model(factory), mode, example, calib), mode)
+    ffast, tfast = _features(fast, images)
+
+    if ref is None:
+        # No reference: distance of the fast features from the fp32 ones.
+        ref = ref_stats(*gaussian_stats(f32))
+    fid32 = fid_from_stats(*gaussian_stats(f32), ref)
+    fidfast = fid_from_stats(*gaussian_stats(ffast), ref)
+    rel = np.linalg.norm(ffast - f32, axis=1) / np.maximum(np.linalg.norm(f32, axis=1), 1e-12)
+
+    report = CalibrationReport(
+        mode, len(images), fid32, fidfast, abs(fidfast - fid32), float(rel.max()), t32, tfast, tol,
+    )
+    return fast, report
+
+
+def guarded_extractor(
+    mode: str,
+    images=None,
+    ref: Optional[RefStats] = None,
+    tol: float = DEFAULT_TOL,
+    factory: Optional[str] = None,
+    reference: Optional[Callable[..., Any]] = None,
+) -> tuple:
+    """
+    Extractor for `mode`, or FastModeRefused when calibration against
+    `reference` (default: the harness' Inception) misses `tol`. fp32 is the
+    reference itself and needs no calibration. Returns (extractor, report or None).
+    """
+    if mode == "fp32":
+        from min_snr.features import get_extractor
+
+        return reference or get_extractor(None), None
+    if images is None:
+        images = calibration_images()
+    fast, report = calibrate(mode, images, ref, tol, factory, reference)
+    if not report.ok:
+        raise FastModeRefused(f"[inception] {report.summary()}")
+    return fast, report
+
+
+def add_fast_args(parser) -> None:
+    """Shared CLI flags for tools that can use the fast extractor."""
+    parser.add_argument(
+        "--inception-mode",
+        choices=MODES,
+        default=None,
+        help="fp32: the harness' Inception; fast/int8: an optimized CPU model, used only "
+        "if it passes a calibration check against fp32.",
+    )
+    parser.add_argument(
+        "--inception-factory",
+        type=str,
+        default=None,
+        help="'module:callable' returning an nn.Module [0,1] NCHW -> (n, 2048).",
+    )
+    parser.add_argument(
+        "--calib-source",
+        type=str,
+        default=None,
+        help="Images for the calibration check (CIFAR dir, folder, .npy, .samples).",
+    )
+    parser.add_argument("--calib-n", type=int, default=DEFAULT_CALIB_N, help="Calibration images.")
+    parser.add_argument(
+        "--fast-tol",
+        type=float,
+        default=DEFAULT_TOL,
+        help="Max |FID_fast - FID_fp32| on the calibration set.",
+    )
@@ -0,0 +1,128 @@
+"""
+Readers for run logs (loss.jsonl / results.jsonl).
+
+Logs may be stored plain or compressed (``loss.jsonl.zst`` / ``loss.jsonl.gz``,
+see ``min_snr.archive``). Everything here streams line by line, so compressed
+files are decoded on the fly and never unpacked to a temp file.
+
+A path that no longer exists is resolved to its compressed sibling, so
+commands that point at ``docs/assets/e7/e7b_data/loss.jsonl`` keep working
+after the run directory has been archived.
+"""
+
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, TextIO, Tuple, Union
+
+import numpy as np
+
+PathLike = Union[str, Path]
+MetricSeries = Tuple[np.ndarray, np.ndarray]  # (steps, values)
+
+# Checked in this order when the plain path is missing.
+COMPRESSED_SUFFIXES = (".zst", ".gz")
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "Reading/writing .zst logs needs the 'zstandard' package "
+            "(pip install -e '.[zstd]')."
+        ) from e
+    return zstandard
+
+
+def resolve_log_path(path: PathLike) -> Path:
+    """
+    Return `path` if it exists, else its first existing compressed sibling
+    (``<path>.zst`` then ``<path>.gz``).
+    """
+    p = Path(path)
+    if p.exists():
+        return p
+    for suffix in COMPRESSED_SUFFIXES:
+        candidate = p.with_name(p.name + suffix)
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(
+        f"Log not found: {p} (also tried {', '.join(COMPRESSED_SUFFIXES)})"
+    )
+
+
+def open_log_binary(path: PathLike) -> BinaryIO:
+    """Open a (possibly compressed) log as a decoded binary stream."""
+    p = resolve_log_path(path)
+    if p.suffix == ".gz":
+        return gzip.open(p, "rb")
+    if p.suffix == ".zst":
+        zstandard = _import_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(p.open("rb"), closefd=True)
+    return p.open("rb")
+
+
+def open_log(path: PathLike) -> TextIO:
+    """Open a (possibly compressed) text log for streaming reads."""
+    return io.TextIOWrapper(open_log_binary(path), encoding="utf-8")
+
+
+def iter_records(path: PathLike) -> Iterator[Dict[str, Any]]:
+    """Yield one parsed JSON object per non-empty line."""
+    with open_log(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line)
+
+
+def record_step(rec: Dict[str, Any]):
+    """Step of a raw record: top-level "_i", else "step"/"global_step"."""
+    step = rec.get("_i")
+    if step is None:
+        step = rec.get("step") or rec.get("global_step")
+    return step
+
+
+def load_metric_series(path: PathLike) -> Dict[str, MetricSeries]:
+    """
+    Read a loss.jsonl file and return a mapping:
+        metric_name -> (steps, values)
+
+    Steps come from top-level "_i" (or "step"/"global_step" fallback, then the
+    line index). Each metric keeps its own step array, so sparsely-logged
+    metrics (like curvature or val/fid) are handled correctly.
+    """
+    metric_steps: Dict[str, List[int]] = {}
+    metric_vals: Dict[str, List[float]] = {}
+
+    for line_idx, rec in enumerate(iter_records(path)):
+        step = record_step(rec)
+        if step is None:
+            step = line_idx
+
+        step = int(step)
+        out = rec.get("out", {})
+        for k, v in out.items():
+            if isinstance(v, (int, float)):
+                metric_steps.setdefault(k, []).append(step)
+                metric_vals.setdefault(k, []).append(float(v))
+
+    series: Dict[str, MetricSeries] = {}
+    for k, vals in metric_vals.items():
+        s = np.asarray(metric_steps[k], dtype=np.int64)
+        v = np.asarray(vals, dtype=np.float32)
+        series[k] = (s, v)
+
+    return series
+
+
+def append_record(path: PathLike, step: int, out: Dict[str, Any]) -> None:
+    """Append one ``{"_i": step, "out": {...}}`` line (the loss.jsonl layout)."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with p.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"_i": int(step), "out": out}) + "\n")
@@ -0,0 +1,185 @@
+"""
+Per-example gradient norms for a training batch, keyed by timestep and SNR.
+
+`train/grad_global_L2` and `mins_snr/snr_mean` are batch aggregates, so a
+plot of one against the other blurs the per-t relationship the Min-SNR
+study is about. `PerSampleGradNorms` computes ||grad_theta loss_i|| for every
+example i of a batch with torch.func (`vmap` over `grad` of a
+`functional_call`), i.e. one vectorized backward per chunk of examples
+instead of a Python loop of backward passes, and records each example's t,
+SNR(t) = abar_t / (1 - abar_t), weighted loss and gradient norm.
+
+Per-example gradients take (chunk x #params) memory, so the batch is
+processed `chunk_size` examples at a time and each chunk is reduced to norms
+before the next one. The cost is a few plain steps' worth, so it runs on a
+cadence (`every` steps, optionally on the first `max_examples` of the
+batch); tools/bench_per_sample_grads.py measures it against a plain step.
+
+Records go to their own jsonl (one line per sampled step, lists per key, in
+the loss.jsonl layout) so loss.jsonl stays small; `load_per_sample` flattens
+them back into arrays for min_snr.binned / plot_e8_snr_geometry.py
+--per-sample.
+
+The model is called as ``model(x_t, t)`` and must not use batch statistics
+(GroupNorm is fine; BatchNorm in train mode is not vmappable).
+
+Usage:
+    psg = PerSampleGradNorms(model, schedule="linear", T=1000, every=500,
+                             log_path=out_dir / "per_sample_grads.jsonl")
+    ...
+    psg.maybe(step, x_t, t, eps, weight=min_snr_w)   # before optimizer.step()
+"""
+
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from min_snr.logs import PathLike, append_record, iter_records
+from min_snr.sampling import DEFAULT_T, make_betas
+
+DEFAULT_EVERY = 500
+DEFAULT_CHUNK = 16
+
+
+class PerSampleRecord(NamedTuple):
+    step: int
+    t: np.ndarray          # (B,) int
+    snr: np.ndarray        # (B,)
+    loss: np.ndarray       # (B,) weighted per-example loss
+    grad_norm: np.ndarray  # (B,) ||d loss_i / d theta||_2
+
+    def as_log(self) -> Dict[str, Any]:
+        return {
+            "t": self.t.tolist(),
+            "snr": self.snr.tolist(),
+            "loss": self.loss.tolist(),
+            "grad_norm": self.grad_norm.tolist(),
+        }
+
+    def summary(self) -> Dict[str, float]:
+        """Scalars for loss.jsonl."""
+        return {
+            "psg/grad_norm_mean": float(self.grad_norm.mean()),
+            "psg/grad_norm_max": float(self.grad_norm.max()),
+        }
+
+
+def snr_table(schedule: str = "linear", T: int = DEFAULT_T) -> np.ndarray:
+    """SNR(t) = abar_t / (1 - abar_t) for t = 0..T-1."""
+    abar = np.cumprod(1.0 - make_betas(schedule, T))
+    return abar / (1.0 - abar)
+
+
+def min_snr_weight(snr, gamma: float = 5.0):
+    """Min-SNR-gamma weight for eps prediction: min(SNR, gamma) / SNR."""
+    return np.minimum(snr, gamma) / snr
+
+
+class PerSampleGradNorms:
+    """Vectorized per-example gradient norms of a weighted eps-MSE loss."""
+
+    def __init__(
+        self,
+        model: Any,
+        schedule: str = "linear",
+        T: int = DEFAULT_T,
+        every: int = DEFAULT_EVERY,
+        max_examples: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK,
+        log_path: Optional[PathLike] = None,
+    ) -> None:
+        self.model = model
+        self.snr = snr_table(schedule, T)
+        self.every = max(1, every)
+        self.max_examples = max_examples
+        self.chunk_size = max(1, chunk_size)
+        self.log_path = Path(log_path) if log_path is not None else None
+        self._fn = None
+
+    def due(self, step: int) -> bool:
+        return step % self.every == 0
+
+    def _per_example(self):
+        """vmap(grad_and_value(loss of one example)) over the batch dim."""
+        if self._fn is None:
+            from torch.func import functional_call, grad_and_value, vmap
+
+            model = self.model
+
+            def loss_one(params, buffers, x, t, target, w):
+                pred = functional_call(model, (params, buffers), (x.unsqueeze(0), t.unsqueeze(0)))
+                return w * (pred - target.unsqueeze(0)).pow(2).mean()
+
+            self._fn = vmap(
+                grad_and_value(loss_one),
+                in_dims=(None, None, 0, 0, 0, 0),
+                randomness="different",
+            )
+        return self._fn
+
+    def compute(self, x_t, t, target, weight=None):
+        """(loss, grad_norm) device tensors of shape (B,) for this batch."""
+        import torch
+
+        params = {k: p.detach() for k, p in self.model.named_parameters() if p.requires_grad}
+        buffers = {k: b.detach() for k, b in self.model.named_buffers()}
+        if weight is None:
+            weight = torch.ones(len(t), device=x_t.device)
+        fn = self._per_example()
+        losses, norms = [], []
+        for a in range(0, len(t), self.chunk_size):
+            sl = slice(a, a + self.chunk_size)
+            grads, loss = fn(params, buffers, x_t[sl], t[sl], target[sl], weight[sl])
+            sq = torch.stack([g.flatten(1).float().pow(2).sum(1) for g in grads.values()]).sum(0)
+            losses.append(loss.detach().float())
+            norms.append(sq.sqrt())
+            del grads  # free (chunk x #params) before the next chunk
+        return torch.cat(losses), torch.cat(norms)
+
+    def __call__(self, step: int, x_t, t, target, weight=None) -> PerSampleRecord:
+        import torch
+
+        if self.max_examples is not None:
+            n = self.max_examples
+            x_t, t, target = x_t[:n], t[:n], target[:n]
+            weight = None if weight is None else weight[:n]
+        loss, norm = self.compute(x_t, t, target, weight)
+        packed = torch.stack([t.to(loss.dtype), loss, norm]).cpu().numpy()  # one sync
+        ts = packed[0].astype(np.int64)
+        rec = PerSampleRecord(int(step), ts, self.snr[ts], packed[1], packed[2])
+        if self.log_path is not None:
+            append_record(self.log_path, rec.step, rec.as_log())
+        return rec
+
+    def maybe(self, step: int, x_t, t, target, weight=None) -> Optional[PerSampleRecord]:
+        """`self(...)` on cadence steps, else None."""
+        return self(step, x_t, t, target, weight) if self.due(step) else None
+
+
+def loop_grad_norms(model: Any, x_t, t, target, weight=None):
+    """One backward per example (the slow reference; tests and benchmarks)."""
+    import torch
+
+    params = [p for p in model.parameters() if p.requires_grad]
+    norms = []
+    for i in range(len(t)):
+        w = 1.0 if weight is None else weight[i]
+        loss = w * (model(x_t[i:i + 1], t[i:i + 1]) - target[i:i + 1]).pow(2).mean()
+        grads = torch.autograd.grad(loss, params)
+        norms.append(torch.sqrt(sum(g.float().pow(2).sum() for g in grads)))
+    return torch.stack(norms)
+
+
+def load_per_sample(path: PathLike) -> Dict[str, np.ndarray]:
+    """All records of a per-sample jsonl, flattened: step, t, snr, loss, grad_norm."""
+    cols: Dict[str, list] = {"step": [], "t": [], "snr": [], "loss": [], "grad_norm": []}
+    for rec in iter_records(path):
+        out = rec["out"]
+        cols["step"].append(np.full(len(out["t"]), rec["_i"], dtype=np.int64))
+        for k in ("t", "snr", "loss", "grad_norm"):
+            cols[k].append(np.asarray(out[k]))
+    return {
+        k: np.concatenate(v) if v else np.empty(0, dtype=np.int64 if k in ("step", "t") else np.float64)
+        for k, v in cols.items()
+    }
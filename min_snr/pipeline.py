@@ -0,0 +1,216 @@
+"""
+Two-stage producer/consumer pipeline for feature extraction.
+
+The sequential FID path (generate -> map [-1, 1] to [0, 1] -> resize ->
+Inception -> copy features to host) leaves the model idle while the next
+batch is prepared. Here a worker thread produces batches (generation or
+shard reads), maps and optionally resizes them into a small ring of
+preallocated input buffers, while the main thread runs the extractor and
+writes features into a preallocated output array. Buffer slots circulate
+through two queues (prepared -> main thread, free -> worker); `depth + 1`
+slots are allocated once and reused, and at most `depth` prepared batches
+wait at any time. Torch releases the GIL inside its kernels, so the stages overlap
+on a multi-core CPU as well as on GPU.
+
+Slots are float32 at the prepared size, so with `resize` set to
+Inception's 299 one slot of 250 images is ~270 MB, and the default
+`depth + 1 = 3` slots would hold ~800 MB (in host memory on CPU runs). The
+number of slots is therefore also capped by `memory_budget` (default 512
+MiB), sized from the first batch actually seen, but never below two: one
+slot in the extractor and one being prepared, which keeps the overlap. Lower
+the batch size to get more slots within the budget.
+
+`StageStats` records how long each stage was busy, blocked on the other,
+or starved, so one line says whether inference ever waited for inputs.
+
+Usage:
+    feats, stats = extract_features(batches, extractor, device, n_total=10_000)
+    print(stats.summary())
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_DEPTH = 2
+DEFAULT_MEMORY_BUDGET = 512 << 20  # bytes of prepared-input slots
+_POLL_S = 0.1
+
+
+class StageStats(NamedTuple):
+    wall_s: float
+    produce_s: float         # producer: generate + map + resize
+    produce_blocked_s: float  # producer waiting for a free buffer
+    consume_s: float         # main thread: extractor + feature copy
+    starved_s: float         # main thread waiting for a prepared batch
+    n_batches: int
+    n_images: int
+
+    def utilization(self) -> dict:
+        wall = max(self.wall_s, 1e-9)
+        return {
+            "produce": self.produce_s / wall,
+            "infer": self.consume_s / wall,
+            "infer_starved": self.starved_s / wall,
+        }
+
+    def summary(self) -> str:
+        u = self.utilization()
+        return (
+            f"{self.n_images} images in {self.wall_s:.1f}s "
+            f"({self.n_images / max(self.wall_s, 1e-9):.0f} img/s) | "
+            f"prep busy {u['produce']:.0%}, infer busy {u['infer']:.0%}, "
+            f"infer waiting for input {u['infer_starved']:.0%}"
+        )
+
+
+class _Stop(NamedTuple):
+    error: Optional[BaseException]
+
+
+def prepare_into(
+    x,
+    out,
+    from_pm1: bool = True,
+    resize: Optional[int] = None,
+):
+    """
+    Write `x` mapped to [0, 1] (and resized to `resize` x `resize`) into the
+    preallocated `out`; returns the filled view out[:n].
+    """
+    import torch.nn.functional as F
+
+    n = x.shape[0]
+    dst = out[:n]
+    if resize is not None and tuple(x.shape[-2:]) != (resize, resize):
+        x = F.interpolate(x.to(dst.dtype), size=(resize, resize), mode="bilinear", align_corners=False)
+    dst.copy_(x, non_blocking=True)
+    if from_pm1:
+        dst.clamp_(-1.0, 1.0).add_(1.0).mul_(0.5)
+    return dst
+
+
+def extract_features(
+    batches: Iterable[Any],
+    extractor: Callable[[Any, Any], Any],
+    device: Any,
+    n_total: Optional[int] = None,
+    from_pm1: bool = True,
+    resize: Optional[int] = None,
+    depth: int = DEFAULT_DEPTH,
+    memory_budget: Optional[int] = DEFAULT_MEMORY_BUDGET,
+) -> Tuple[np.ndarray, StageStats]:
+    """
+    Run `extractor(x01, device)` over `batches` with preparation overlapped.
+
+    `batches` yields NCHW tensors, in [-1, 1] when `from_pm1` (generator
+    outputs) or already in [0, 1]. Iteration itself runs on the worker
+    thread, so a generator that samples images overlaps with inference too.
+    At most `depth + 1` input slots are allocated, fewer (but at least two)
+    if they would exceed `memory_budget` bytes (None: no cap).
+    Returns (features (N, D) float32, stage stats).
+    """
+    import torch
+
+    free: "queue.Queue[int]" = queue.Queue()
+    ready: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    slots: List[Any] = []
+    max_slots = depth + 1
+    stop = threading.Event()
+    timing = {"produce": 0.0, "blocked": 0.0}
+
+    def put(item: Any) -> None:
+        # Bounded put that gives up once the consumer has stopped.
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=_POLL_S)
+                return
+            except queue.Full:
+                pass
+
+    def producer() -> None:
+        nonlocal max_slots
+        try:
+            it = iter(batches)
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    x = next(it)
+                except StopIteration:
+                    break
+                x = x.to(device, non_blocking=True)
+                t1 = time.perf_counter()
+                if not slots and memory_budget is not None:
+                    slot_bytes = x.shape[0] * x.shape[1] * (resize * resize if resize else x.shape[-2] * x.shape[-1]) * 4
+                    max_slots = max(2, min(max_slots, memory_budget // max(slot_bytes, 1)))
+                if len(slots) < max_slots:
+                    shape = (x.shape[0], x.shape[1]) + ((resize, resize) if resize else tuple(x.shape[-2:]))
+                    slots.append(torch.empty(shape, dtype=torch.float32, device=device))
+                    slot = len(slots) - 1
+                else:
+                    while True:
+                        try:
+                            slot = free.get(timeout=_POLL_S)
+                            break
+                        except queue.Empty:
+                            if stop.is_set():
+                                return
+                t2 = time.perf_counter()
+                if x.shape[0] > slots[slot].shape[0]:
+                    slots[slot] = torch.empty(
+                        (x.shape[0],) + tuple(slots[slot].shape[1:]), dtype=torch.float32, device=device
+                    )
+                x01 = prepare_into(x, slots[slot], from_pm1, resize)
+                t3 = time.perf_counter()
+                timing["produce"] += (t1 - t0) + (t3 - t2)
+                timing["blocked"] += t2 - t1
+                put((slot, x01))
+            put(_Stop(None))
+        except BaseException as e:  # surfaced on the main thread
+            put(_Stop(e))
+
+    feats: Optional[np.ndarray] = None
+    chunks: List[np.ndarray] = []
+    n_done = 0
+    n_batches = 0
+    consume_s = starved_s = 0.0
+
+    t_start = time.perf_counter()
+    worker = threading.Thread(target=producer, name="feature-prep", daemon=True)
+    worker.start()
+    try:
+        while True:
+            t0 = time.perf_counter()
+            item = ready.get()
+            t1 = time.perf_counter()
+            starved_s += t1 - t0
+            if isinstance(item, _Stop):
+                if item.error is not None:
+                    raise item.error
+                break
+            slot, x01 = item
+            f = np.asarray(extractor(x01, device), dtype=np.float32)
+            free.put(slot)
+            if n_total is not None:
+                if feats is None:
+                    feats = np.empty((n_total, f.shape[1]), dtype=np.float32)
+                feats[n_done:n_done + f.shape[0]] = f
+            else:
+                chunks.append(f)
+            n_done += f.shape[0]
+            n_batches += 1
+            consume_s += time.perf_counter() - t1
+    finally:
+        stop.set()
+        worker.join()
+
+    wall = time.perf_counter() - t_start
+    if n_total is None:
+        feats = np.concatenate(chunks) if chunks else np.empty((0, 0), dtype=np.float32)
+    elif n_done != n_total:
+        raise ValueError(f"Expected {n_total} images, got {n_done}")
+    stats = StageStats(wall, timing["produce"], timing["blocked"], consume_s, starved_s, n_batches, n_done)
+    return feats, stats
@@ -0,0 +1,273 @@
+"""
+Build reference FID statistics (stats/cifar10_inception_train.npz) in a
+streaming, sharded, resumable way.
+
+The source (CIFAR-10 batches, an image folder, a .npy array or a sample
+shard; see min_snr.datasets) is split into fixed-size chunks. Each chunk is
+handled by a worker process: read the images, extract features batch by
+batch, fold them into a Gaussian state (count, mean, centered scatter
+matrix) and write that state to ``<out>.parts/part_NNNNN.npz``. No process
+ever holds more than one batch of features.
+
+Finished part files are skipped on restart, so an interrupted build resumes
+where it stopped. The parent merges the states in chunk order with Chan's
+parallel update (exact, and independent of how work was scheduled) and
+writes:
+
+    mu, sigma            mean / (n - 1)-normalized covariance, float64
+    eigvals, eigvecs     eigendecomposition of sigma (min_snr.fid reuses it)
+    n                    number of images
+    fingerprint          sha256 over per-image pixel digests, in order
+    extractor, source    what produced the features / from where
+
+Usage:
+    python -m min_snr.cli refstats data/cifar-10-batches-py \\
+        --out stats/cifar10_inception_train.npz --workers 8 --device cpu
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from min_snr.logs import PathLike
+
+DEFAULT_CHUNK_SIZE = 2500
+DEFAULT_BATCH_SIZE = 250
+
+
+class GaussianState(NamedTuple):
+    n: int
+    mean: np.ndarray   # (D,)
+    m2: np.ndarray     # (D, D) sum of outer products of centered rows
+
+    @property
+    def cov(self) -> np.ndarray:
+        return self.m2 / (self.n - 1)
+
+
+def gaussian_state(x: np.ndarray) -> GaussianState:
+    """State of one (n, D) block of features."""
+    x = np.asarray(x, dtype=np.float64)
+    mean = x.mean(axis=0)
+    xc = x - mean
+    return GaussianState(x.shape[0], mean, xc.T @ xc)
+
+
+def merge_states(a: Optional[GaussianState], b: GaussianState) -> GaussianState:
+    """Chan et al. pairwise merge of two Gaussian states."""
+    if a is None or a.n == 0:
+        return b
+    n = a.n + b.n
+    delta = b.mean - a.mean
+    mean = a.mean + delta * (b.n / n)
+    m2 = a.m2 + b.m2 + np.outer(delta, delta) * (a.n * b.n / n)
+    return GaussianState(n, mean, m2)
+
+
+def image_digests(images: np.ndarray) -> bytes:
+    """16-byte blake2b digest of every image, concatenated."""
+    return b"".join(hashlib.blake2b(im.tobytes(), digest_size=16).digest() for im in images)
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+class ChunkJob(NamedTuple):
+    index: int
+    start: int
+    stop: int
+    source: str
+    split: Optional[str]
+    extractor: Optional[str]
+    batch_size: int
+    device: str
+    part_path: str
+
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(threads: int) -> Optional[int]:
+    """Set torch's thread count; returns the previous one (None without torch)."""
+    try:
+        import torch
+    except ImportError:
+        return None
+    prev = torch.get_num_threads()
+    torch.set_num_threads(max(1, threads))
+    return prev
+
+
+def _worker_state(job: ChunkJob):
+    """Source and extractor, opened once per worker process."""
+    from min_snr.datasets import open_source
+    from min_snr.features import get_extractor
+
+    key = (job.source, job.split, job.extractor)
+    if _WORKER.get("key") != key:
+        _WORKER.update(
+            key=key,
+            source=open_source(job.source, job.split),
+            extractor=get_extractor(job.extractor),
+        )
+    return _WORKER["source"], _WORKER["extractor"]
+
+
+def process_chunk(job: ChunkJob) -> Tuple[int, int]:
+    """Features of one chunk -> Gaussian state part file. Returns (index, n)."""
+    import torch
+
+    source, extractor = _worker_state(job)
+    state: Optional[GaussianState] = None
+    digests = []
+    for a in range(job.start, job.stop, job.batch_size):
+        images = source.read(a, min(a + job.batch_size, job.stop))
+        digests.append(image_digests(images))
+        x01 = torch.from_numpy(images).to(job.device).permute(0, 3, 1, 2).float().div_(255.0)
+        feats = np.asarray(extractor(x01, job.device))
+        state = merge_states(state, gaussian_state(feats))
+
+    part = Path(job.part_path)
+    tmp = part.with_name(part.name + ".tmp.npz")
+    np.savez(
+        tmp,
+        n=state.n,
+        mean=state.mean,
+        m2=state.m2,
+        digests=np.frombuffer(b"".join(digests), dtype=np.uint8),
+    )
+    os.replace(tmp, part)
+    return job.index, state.n
+
+
+def load_part(path: PathLike) -> Tuple[GaussianState, bytes]:
+    with np.load(Path(path)) as p:
+        return GaussianState(int(p["n"]), p["mean"], p["m2"]), p["digests"].tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def _check_job_file(parts_dir: Path, job_info: Dict[str, Any]) -> None:
+    """Refuse to resume parts that were built from different inputs."""
+    job_file = parts_dir / "job.json"
+    if job_file.exists():
+        old = json.loads(job_file.read_text())
+        if old != job_info:
+            raise ValueError(
+                f"{parts_dir} holds parts of a different build ({old}); "
+                "delete it or pick another --out."
+            )
+    else:
+        job_file.write_text(json.dumps(job_info, indent=2, sort_keys=True))
+
+
+def build_refstats(
+    source: PathLike,
+    out: PathLike,
+    split: Optional[str] = None,
+    extractor: Optional[str] = None,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    device: str = "cpu",
+    limit: Optional[int] = None,
+    keep_parts: bool = False,
+) -> Path:
+    """Build (or resume building) reference stats for `source` into `out`."""
+    from min_snr.datasets import open_source
+    from min_snr.features import INCEPTION
+
+    out = Path(out)
+    src = open_source(source, split)
+    n_total = len(src) if limit is None else min(limit, len(src))
+    parts_dir = out.with_name(out.name + ".parts")
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    extractor_name = extractor or INCEPTION
+    _check_job_file(parts_dir, {
+        "source": src.describe(),
+        "n": n_total,
+        "chunk_size": chunk_size,
+        "extractor": extractor_name,
+    })
+
+    jobs: List[ChunkJob] = []
+    for i, a in enumerate(range(0, n_total, chunk_size)):
+        part = parts_dir / f"part_{i:05d}.npz"
+        jobs.append(ChunkJob(
+            i, a, min(a + chunk_size, n_total), str(source), split, extractor,
+            batch_size, device, str(part),
+        ))
+    todo = [j for j in jobs if not Path(j.part_path).exists()]
+    print(
+        f"[refstats] {src.describe()} n={n_total}: {len(jobs)} chunks, "
+        f"{len(jobs) - len(todo)} already done, {workers} worker(s)"
+    )
+
+    t0 = time.perf_counter()
+    n_done = 0
+    if workers <= 1:
+        # In the caller's process: its thread count is put back afterwards.
+        prev_threads = _init_worker(os.cpu_count() or 1)
+        try:
+            results = (process_chunk(j) for j in todo)
+            for k, (i, n) in enumerate(results, 1):
+                n_done += n
+                _report(k, len(todo), n_done, t0)
+        finally:
+            if prev_threads is not None:
+                _init_worker(prev_threads)
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [pool.submit(process_chunk, j) for j in todo]
+            for k, fut in enumerate(as_completed(futures), 1):
+                _, n = fut.result()
+                n_done += n
+                _report(k, len(todo), n_done, t0)
+
+    # Merge in chunk order so the result does not depend on scheduling.
+    state: Optional[GaussianState] = None
+    h = hashlib.sha256()
+    for j in jobs:
+        part, digests = load_part(j.part_path)
+        state = merge_states(state, part)
+        h.update(digests)
+
+    sigma = state.cov
+    eigvals, eigvecs = np.linalg.eigh(sigma)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp.npz")
+    np.savez(
+        tmp,
+        mu=state.mean,
+        sigma=sigma,
+        eigvals=eigvals,
+        eigvecs=eigvecs,
+        n=state.n,
+        fingerprint=h.hexdigest(),
+        extractor=extractor_name,
+        source=json.dumps(src.describe(), sort_keys=True),
+    )
+    os.replace(tmp, out)
+
+    if not keep_parts:
+        for j in jobs:
+            Path(j.part_path).unlink()
+        (parts_dir / "job.json").unlink()
+        parts_dir.rmdir()
+    print(f"[refstats] Wrote {out} (n={state.n}, fingerprint {h.hexdigest()[:16]})")
+    return out
+
+
+def _report(k: int, total: int, n_done: int, t0: float) -> None:
+    rate = n_done / max(time.perf_counter() - t0, 1e-9)
+    print(f"[refstats] chunk {k}/{total} done ({rate:.0f} img/s)")
@@ -0,0 +1,247 @@
+"""
+Render helpers that keep plot cost flat as runs get longer.
+
+Line series are reduced to roughly one point per horizontal pixel before
+they reach matplotlib:
+
+    lttb     Largest-Triangle-Three-Buckets; keeps the visual shape
+    minmax   min and max of each pixel bucket; keeps every spike
+
+Scatters above `max_points` switch to a rasterized hexbin density (or the
+mean of `c` per cell, e.g. step), so a 50k-step log costs the same as a
+5k-step one.
+
+The tools expose this through --target-px / --scatter-max-points
+(see add_render_args):
+
+    from min_snr import render
+    render.line(ax, steps, loss, target_px=args.target_px, label="loss")
+    sc = render.scatter(ax, mean, std, c=steps, max_points=args.scatter_max_points)
+"""
+
+import argparse
+from typing import Optional
+
+import numpy as np
+
+# Tools save at dpi=200..300; size the default budget for the larger one.
+RENDER_DPI = 300
+DEFAULT_SCATTER_MAX_POINTS = 5000
+DOWNSAMPLE_METHODS = ("lttb", "minmax", "none")
+
+
+def add_render_args(parser: argparse.ArgumentParser) -> None:
+    """Shared CLI flags for tools that plot dense series."""
+    parser.add_argument(
+        "--target-px",
+        type=int,
+        default=None,
+        help="Horizontal pixel budget for line series (default: axes width at 300 dpi).",
+    )
+    parser.add_argument(
+        "--downsample",
+        type=str,
+        default="lttb",
+        choices=DOWNSAMPLE_METHODS,
+        help="Line downsampling method.",
+    )
+    parser.add_argument(
+        "--scatter-max-points",
+        type=int,
+        default=DEFAULT_SCATTER_MAX_POINTS,
+        help="Scatters with more points are drawn as a hexbin density.",
+    )
+
+
+def axes_width_px(ax, dpi: int = RENDER_DPI) -> int:
+    """Width of `ax` in output pixels."""
+    fig = ax.figure
+    return max(1, int(ax.get_position().width * fig.get_figwidth() * dpi))
+
+
+# ---------------------------------------------------------------------------
+# Downsampling (return indices into the input)
+# ---------------------------------------------------------------------------
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Indices of the min and max of `y` in each of `n_buckets` equal-count
+    buckets, plus the first and last point. Fully vectorized.
+    """
+    n = y.size
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+
+    k = -(-n // n_buckets)  # bucket width
+    yf = y.astype(float, copy=False)
+    lo = np.full(n_buckets * k, np.inf)
+    hi = np.full(n_buckets * k, -np.inf)
+    # NaNs never win the min or the max.
+    lo[:n] = np.where(np.isnan(yf), np.inf, yf)
+    hi[:n] = np.where(np.isnan(yf), -np.inf, yf)
+    offsets = np.arange(n_buckets) * k
+    idx = np.concatenate((
+        [0],
+        offsets + lo.reshape(n_buckets, k).argmin(axis=1),
+        offsets + hi.reshape(n_buckets, k).argmax(axis=1),
+        [n - 1],
+    ))
+    return np.unique(idx.clip(0, n - 1))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection of `n_out` points.
+
+    One Python iteration per output bucket (not per input point); the
+    triangle areas within a bucket are computed vectorized.
+    """
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x.astype(float, copy=False)
+    y = y.astype(float, copy=False)
+
+    # Bucket boundaries over the interior points (first/last kept as-is).
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of each bucket, used as the third triangle vertex.
+    csx = np.r_[0.0, np.cumsum(x)]
+    csy = np.r_[0.0, np.cumsum(y)]
+    counts = np.maximum(edges[1:] - edges[:-1], 1)
+    mean_x = (csx[edges[1:]] - csx[edges[:-1]]) / counts
+    mean_y = (csy[edges[1:]] - csy[edges[:-1]]) / counts
+    mean_x = np.r_[mean_x, x[-1]]
+    mean_y = np.r_[mean_y, y[-1]]
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs(
+            (x[a] - mean_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (mean_y[i + 1] - y[a])
+        )
+        a = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        out[i + 1] = a
+    return np.unique(out)
+
+
+def downsample(
+    x: np.ndarray,
+    y: np.ndarray,
+    target_px: int,
+    method: str = "lttb",
+):
+    """Reduce (x, y) to about `target_px` points (2x for minmax)."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if method == "none" or x.size <= 2 * target_px:
+        return x, y
+    if method == "lttb":
+        idx = lttb_indices(x, y, target_px)
+    elif method == "minmax":
+        idx = minmax_indices(y, target_px)
+    else:
+        raise ValueError(f"Unknown downsample method: {method}")
+    return x[idx], y[idx]
+
+
+# ---------------------------------------------------------------------------
+# Axes helpers
+# ---------------------------------------------------------------------------
+
+def line(
+    ax,
+    x,
+    y,
+    *args,
+    target_px: Optional[int] = None,
+    method: str = "lttb",
+    **kwargs,
+):
+    """`ax.plot` with the series downsampled to the axes' pixel width."""
+    px = target_px or axes_width_px(ax)
+    xs, ys = downsample(x, y, px, method)
+    return ax.plot(xs, ys, *args, **kwargs)
+
+
+def scatter(
+    ax,
+    x,
+    y,
+    c=None,
+    max_points: int = DEFAULT_SCATTER_MAX_POINTS,
+    gridsize: int = 80,
+    **kwargs,
+):
+    """
+    `ax.scatter` for small inputs, a rasterized hexbin above `max_points`.
+
+    With `c` the hexbin colours each cell by the mean of `c` (so a
+    colour-by-step plot keeps its meaning); without it, by log count.
+    Returns the mappable for a colorbar.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size <= max_points:
+        return ax.scatter(x, y, c=c, **kwargs)
+
+    hex_kwargs = {
+        k: v for k, v in kwargs.items()
+        if k in ("label", "cmap", "xscale", "yscale", "norm", "alpha")
+    }
+    if c is not None:
+        return ax.hexbin(
+            x, y, C=np.asarray(c, dtype=float), reduce_C_function=np.mean,
+            gridsize=gridsize, mincnt=1, rasterized=True, **hex_kwargs,
+        )
+    return ax.hexbin(
+        x, y, gridsize=gridsize, bins="log", mincnt=1, rasterized=True, **hex_kwargs,
+    )
+
+
+def band(ax, bands, label: Optional[str] = None, alpha: float = 0.25, **kwargs):
+    """
+    Mean line plus shaded bootstrap band from `min_snr.seeds.seed_bands`.
+    The median is drawn dotted when there is more than one run.
+    """
+    (mean_line,) = ax.plot(bands.steps, bands.mean, label=label, **kwargs)
+    color = mean_line.get_color()
+    if bands.n_runs > 1:
+        ax.fill_between(bands.steps, bands.lo, bands.hi, color=color, alpha=alpha, linewidth=0)
+        ax.plot(bands.steps, bands.median, color=color, linestyle=":", linewidth=0.8)
+    return mean_line
+
+
+def binned(
+    ax,
+    stats,
+    group: int = 0,
+    label: Optional[str] = None,
+    band: tuple = (0.25, 0.75),
+    alpha: float = 0.25,
+    min_count: int = 1,
+    **kwargs,
+):
+    """
+    Median per bin (line + markers) with a shaded quantile band, from
+    `min_snr.binned.binned_stats`. Bins with fewer than `min_count` points
+    are left out.
+    """
+    ok = stats.count[group] >= min_count
+    x = stats.centers[ok]
+    kwargs.setdefault("marker", "o")
+    kwargs.setdefault("markersize", 3)
+    (med_line,) = ax.plot(x, stats.quantile(0.5)[group][ok], label=label, **kwargs)
+    ax.fill_between(
+        x,
+        stats.quantile(band[0])[group][ok],
+        stats.quantile(band[1])[group][ok],
+        color=med_line.get_color(),
+        alpha=alpha,
+        linewidth=0,
+    )
+    return med_line
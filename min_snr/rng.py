@@ -0,0 +1,106 @@
+"""
+Counter-based Gaussian noise for sampling (Philox4x32-10, numpy).
+
+Every noise value is a pure function of (seed, sample index, step, element):
+the seed is the Philox key and the rest is the counter. The noise a sample
+sees therefore does not depend on the batch it landed in, how many processes
+split the work, or where a resumed run restarted, so sharded generation
+reproduces a single-process run image for image.
+
+Counter layout (4 x uint32):  [element block, step, index lo, index hi]
+Each block yields 4 uint32 -> 4 normals (Box-Muller in float64, rounded to
+float32). Step 0 is the initial x_T; sampler step k uses step k + 1.
+
+The uint32 streams match the Random123 reference exactly. The normals go
+through numpy's float64 log/sqrt/cos, which are bitwise stable for a given
+numpy build and CPU; across heterogeneous machines expect agreement to the
+last float32 ulp, not necessarily bitwise.
+
+Usage:
+    z = philox_normal(seed=1077, indices=np.arange(5000, 5250), step=0, size=3 * 32 * 32)
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+PHILOX_M = (0xD2511F53, 0xCD9E8D57)
+PHILOX_W = (0x9E3779B9, 0xBB67AE85)
+PHILOX_ROUNDS = 10
+_MASK32 = np.uint64(0xFFFFFFFF)
+_TWO_PI = 2.0 * np.pi
+
+
+def _key(seed: int) -> Tuple[np.uint64, np.uint64]:
+    seed = int(seed)
+    if not 0 <= seed < 1 << 64:
+        raise ValueError(f"seed must fit in 64 bits, got {seed}")
+    return np.uint64(seed & 0xFFFFFFFF), np.uint64(seed >> 32)
+
+
+def philox4x32(counter: np.ndarray, key: Tuple[int, int], rounds: int = PHILOX_ROUNDS) -> np.ndarray:
+    """
+    Philox4x32 of a (..., 4) array of uint32 counters under a 2-word key.
+    Returns uint32 (..., 4).
+    """
+    c = np.asarray(counter, dtype=np.uint64)
+    c0, c1, c2, c3 = (c[..., i].copy() for i in range(4))
+    k0, k1 = int(key[0]), int(key[1])
+    m0, m1 = np.uint64(PHILOX_M[0]), np.uint64(PHILOX_M[1])
+    shift = np.uint64(32)
+    p0, p1 = np.empty_like(c0), np.empty_like(c0)
+    for _ in range(rounds):
+        # In place: no temporaries per round.
+        np.multiply(c0, m0, out=p0)
+        np.multiply(c2, m1, out=p1)
+        np.right_shift(p1, shift, out=c0)
+        c0 ^= c1
+        c0 ^= np.uint64(k0)
+        np.right_shift(p0, shift, out=c2)
+        c2 ^= c3
+        c2 ^= np.uint64(k1)
+        np.bitwise_and(p1, _MASK32, out=c1)
+        np.bitwise_and(p0, _MASK32, out=c3)
+        k0 = (k0 + PHILOX_W[0]) & 0xFFFFFFFF
+        k1 = (k1 + PHILOX_W[1]) & 0xFFFFFFFF
+    return np.stack([c0, c1, c2, c3], axis=-1).astype(np.uint32)
+
+
+def philox_uint32(seed: int, indices: np.ndarray, step: int, n_blocks: int) -> np.ndarray:
+    """uint32 (len(indices), 4 * n_blocks) stream for each sample index at `step`."""
+    idx = np.asarray(indices, dtype=np.uint64).reshape(-1, 1)
+    ctr = np.empty((idx.shape[0], n_blocks, 4), dtype=np.uint64)
+    ctr[..., 0] = np.arange(n_blocks, dtype=np.uint64)
+    ctr[..., 1] = np.uint64(step)
+    ctr[..., 2] = idx & _MASK32
+    ctr[..., 3] = idx >> np.uint64(32)
+    return philox4x32(ctr, _key(seed)).reshape(idx.shape[0], -1)
+
+
+def philox_normal(
+    seed: int,
+    indices: np.ndarray,
+    step: int,
+    size: int,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Standard normals, float32 (len(indices), size): row r depends only on
+    (seed, indices[r], step).
+    """
+    n_blocks = -(-size // 4)
+    u = philox_uint32(seed, indices, step, n_blocks).reshape(-1, n_blocks, 2, 2)
+    r = u[..., 0] * (-1.0 / 4294967296.0)           # -u in (-1, 0]
+    np.log1p(r, out=r)
+    r *= -2.0
+    np.sqrt(r, out=r)
+    theta = u[..., 1] * (_TWO_PI / 4294967296.0)
+    z = np.empty(u.shape, dtype=np.float32)
+    np.multiply(r, np.cos(theta), out=z[..., 0], casting="same_kind")
+    np.sin(theta, out=theta)
+    np.multiply(r, theta, out=z[..., 1], casting="same_kind")
+    z = z.reshape(len(u), -1)[:, :size]
+    if out is None:
+        return z if z.flags.c_contiguous else np.ascontiguousarray(z)
+    np.copyto(out, z)
+    return out
@@ -0,0 +1,240 @@
+"""
+On-disk sample shards: generated images stored once as raw uint8.
+
+A shard is a single ``*.samples`` file:
+
+    b"MSNRSMP1" | uint64 header length | JSON header | pad to 4096 | uint8 NHWC
+
+The JSON header records the array shape plus free-form metadata (checkpoint,
+sampler, nfe, seed range, ...). Pixel data starts on a page boundary, so
+`open_shard` maps it straight into an (N, H, W, C) np.memmap; FID / KID /
+precision-recall and the grid tools read slices of it without decoding or
+copying, and new metrics on an old checkpoint cost only feature extraction.
+
+Writing streams batch by batch into a ``.tmp`` file that is renamed into
+place on close, so a crashed evaluation never leaves a half-written shard
+behind under the final name.
+
+Usage:
+    with ShardWriter(out, meta={"checkpoint": ckpt, "sampler": "ddpm", "nfe": 50,
+                                "seed_start": 0}) as w:
+        for x in batches:              # model outputs in [-1, 1], NCHW
+            w.append(x)
+
+    shard = open_shard(out)
+    shard.meta["nfe"], len(shard)
+    for x01 in shard.iter_batches(250, device="cuda"):   # float NCHW in [0, 1]
+        feats = extractor(x01)
+"""
+
+import json
+import math
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+from min_snr.logs import PathLike
+
+SHARD_SUFFIX = ".samples"
+MAGIC = b"MSNRSMP1"
+FORMAT_VERSION = 1
+# Space reserved for the header; pixel data starts right after, page-aligned.
+ALIGN = 4096
+
+_PREFIX = struct.Struct("<8sQ")
+
+
+def _pack_header(header: Dict[str, Any]) -> bytes:
+    blob = json.dumps(header, sort_keys=True, default=str).encode("utf-8")
+    packed = _PREFIX.pack(MAGIC, len(blob)) + blob
+    if len(packed) > ALIGN:
+        raise ValueError(f"Shard header too large ({len(packed)} > {ALIGN} bytes)")
+    return packed.ljust(ALIGN, b"\0")
+
+
+def to_uint8(x) -> np.ndarray:
+    """
+    Model outputs in [-1, 1] (torch or numpy, NCHW) -> uint8 NHWC.
+
+    Same mapping as the FID path: clamp, (x + 1) / 2, then round to 0..255.
+    uint8 input is assumed to be NHWC already and passed through.
+    """
+    if hasattr(x, "detach"):
+        x = x.detach()
+        x = ((x.clamp(-1.0, 1.0) + 1.0) * 127.5).round_().to(dtype=_torch().uint8)
+        return x.permute(0, 2, 3, 1).contiguous().cpu().numpy()
+    x = np.asarray(x)
+    if x.dtype == np.uint8:
+        return x
+    x = np.rint((np.clip(x, -1.0, 1.0) + 1.0) * 127.5).astype(np.uint8)
+    return np.ascontiguousarray(x.transpose(0, 2, 3, 1))
+
+
+def _torch():
+    import torch
+
+    return torch
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+class ShardWriter:
+    """
+    Stream batches into a new shard.
+
+    Pass `capacity` when the sample count is known to preallocate the file;
+    otherwise it grows as batches arrive. `meta` is stored verbatim, with
+    ``count`` and (if ``seed_start`` is given) ``seed_stop`` filled in on close.
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        meta: Optional[Dict[str, Any]] = None,
+        capacity: Optional[int] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + ".tmp")
+        self.meta = dict(meta or {})
+        self.capacity = capacity
+        self.count = 0
+        self.hwc: Optional[tuple] = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.tmp.open("wb")
+        self._f.write(b"\0" * ALIGN)  # header is written on close
+
+    def append(self, x) -> None:
+        """Append a batch: uint8 NHWC, or float NCHW in [-1, 1]."""
+        batch = to_uint8(x)
+        if batch.ndim != 4:
+            raise ValueError(f"Expected a 4-D batch, got shape {batch.shape}")
+        if self.hwc is None:
+            self.hwc = tuple(batch.shape[1:])
+            if self.capacity:
+                self._f.truncate(ALIGN + self.capacity * int(np.prod(self.hwc)))
+        elif tuple(batch.shape[1:]) != self.hwc:
+            raise ValueError(f"Batch shape {batch.shape[1:]} != shard shape {self.hwc}")
+        self._f.write(np.ascontiguousarray(batch).data)
+        self.count += batch.shape[0]
+
+    def _header(self) -> Dict[str, Any]:
+        meta = dict(self.meta, count=self.count)
+        if "seed_start" in meta:
+            meta.setdefault("seed_stop", int(meta["seed_start"]) + self.count)
+        return {
+            "version": FORMAT_VERSION,
+            "dtype": "uint8",
+            "layout": "NHWC",
+            "shape": [self.count, *(self.hwc or (0, 0, 0))],
+            "meta": meta,
+        }
+
+    def close(self) -> Path:
+        """Write the final header and move the shard into place."""
+        if self._f.closed:
+            return self.path
+        self._f.truncate(self._f.tell())  # drop unused preallocated capacity
+        self._f.seek(0)
+        self._f.write(_pack_header(self._header()))
+        self._f.close()
+        os.replace(self.tmp, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._f.close()
+        self.tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_shard(path: PathLike, images, meta: Optional[Dict[str, Any]] = None) -> Path:
+    """Write a whole array (uint8 NHWC or float NCHW in [-1, 1]) as one shard."""
+    with ShardWriter(path, meta) as w:
+        w.append(images)
+    return Path(path)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class SampleShard(NamedTuple):
+    path: Path
+    images: np.ndarray          # (N, H, W, C) uint8 memmap
+    meta: Dict[str, Any]
+
+    def __len__(self) -> int:
+        return self.images.shape[0]
+
+    def iter_batches(
+        self,
+        batch_size: int,
+        device: str = "cpu",
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """
+        Yield float32 NCHW torch batches in [0, 1] (the Inception input range).
+
+        Each batch is a view of the mapped file until it reaches `device`.
+        """
+        torch = _torch()
+        stop = len(self) if stop is None else min(stop, len(self))
+        for a in range(start, stop, batch_size):
+            x = torch.from_numpy(self.images[a:min(a + batch_size, stop)])
+            x = x.to(device, non_blocking=True).permute(0, 3, 1, 2)
+            yield x.float().div_(255.0)
+
+    def grid(self, n: int = 36, cols: Optional[int] = None, pad: int = 2) -> np.ndarray:
+        """First `n` samples tiled into one uint8 (H, W, C) image."""
+        n = min(n, len(self))
+        cols = cols or math.ceil(math.sqrt(n))
+        rows = math.ceil(n / cols)
+        _, h, w, c = self.images.shape
+        out = np.zeros((pad + rows * (h + pad), pad + cols * (w + pad), c), dtype=np.uint8)
+        for i in range(n):
+            r, k = divmod(i, cols)
+            y0, x0 = pad + r * (h + pad), pad + k * (w + pad)
+            out[y0:y0 + h, x0:x0 + w] = self.images[i]
+        return out
+
+
+def read_header(path: PathLike) -> Dict[str, Any]:
+    with Path(path).open("rb") as f:
+        magic, n = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a sample shard: {path}")
+        return json.loads(f.read(n).decode("utf-8"))
+
+
+def open_shard(path: PathLike) -> SampleShard:
+    """
+    Map a shard read-only (copy-on-write, so torch.from_numpy works without
+    warnings and nothing is ever written back).
+    """
+    path = Path(path)
+    header = read_header(path)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard version {header.get('version')} in {path}")
+    shape = tuple(header["shape"])
+    if shape[0] == 0:
+        images = np.zeros(shape, dtype=np.uint8)
+    else:
+        images = np.memmap(path, dtype=np.uint8, mode="c", offset=ALIGN, shape=shape)
+    return SampleShard(path, images, header["meta"])
+
+
+def is_shard(path: PathLike) -> bool:
+    return Path(path).suffix == SHARD_SUFFIX
@@ -0,0 +1,441 @@
+"""
+Batched DDPM / DDIM / DPM-Solver++ sampling for evaluation (grids, KID, FID milestones).
+
+Everything that does not depend on the images is computed once:
+
+  * `respaced(schedule, T, sampler, nfe, ...)` (lru_cache) turns the beta
+    schedule and the respacing into one tuple of per-step scalars. Every
+    update is written as
+
+        x0     = clip(k1 * x - k2 * eps)
+        x_prev = c1 * x0 + c2 * x + cp * x0_prev + sigma * z
+
+    which covers DDPM ancestral steps on a respaced schedule (posterior
+    mean and variance), DDIM (eps re-derived from the clipped x0;
+    sigma = 0 for eta = 0) and the DPM-Solver++(2M) multistep ODE solver
+    (log-SNR spaced steps; cp != 0 mixes in the previous x0), which
+    reaches DDPM-50 quality in 10-15 model calls.
+  * The batch size is the largest that fits `memory_budget` (measured once
+    on CUDA, estimated from activation sizes on CPU) unless given.
+  * x, x0, noise and the per-step timestep tensors are allocated once per
+    engine and updated in place, so the loop is model call + a few fused
+    in-place ops per step.
+
+Initial and per-step noise come from min_snr.rng (Philox keyed by seed,
+sample index and step), so `sample(n, seed, start)` over any partition of
+the index range -- other batch sizes, worker counts, a resumed run --
+gives the same images, as long as the model's output for one sample does
+not depend on the rest of its batch (true for eval-mode UNets; GPU conv
+algorithms picked per batch size can still differ in the last bits).
+
+Finished batches are yielded as views of the engine's buffer (valid until
+the next batch) so they can be streamed straight into a feature extractor
+(`sample_features`, via min_snr.pipeline) or a sample shard.
+
+The model is called as model(x, t) with t a long tensor of original
+timesteps, predicting eps.
+
+Usage:
+    engine = SamplerEngine(model, "linear", sampler="ddpm", nfe=50, device="cuda")
+    for x in engine.sample(5000, seed=0):      # [-1, 1] NCHW batches
+        writer.append(x)
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_T = 1000
+SCHEDULES = ("linear", "cosine")
+SAMPLERS = ("ddpm", "ddim", "dpm++2m")
+DEFAULT_MEMORY_BUDGET = 2 << 30   # bytes of activations per model call
+_BATCH_MULTIPLE = 8
+LOGSNR_FLOOR = -5.0              # ~ lambda(T - 1) of the linear schedule
+
+
+# ---------------------------------------------------------------------------
+# Schedules and cached coefficients
+# ---------------------------------------------------------------------------
+
+def make_betas(schedule: str, T: int = DEFAULT_T) -> np.ndarray:
+    """DDPM linear (1e-4 -> 0.02, scaled for T) or Nichol & Dhariwal cosine betas."""
+    if schedule == "linear":
+        scale = 1000.0 / T
+        return np.linspace(scale * 1e-4, scale * 0.02, T, dtype=np.float64)
+    if schedule == "cosine":
+        s = 0.008
+        f = lambda t: math.cos((t / T + s) / (1 + s) * math.pi / 2) ** 2  # noqa: E731
+        return np.array([min(1.0 - f(i + 1) / f(i), 0.999) for i in range(T)], dtype=np.float64)
+    raise ValueError(f"Unknown beta schedule {schedule!r} (expected one of {SCHEDULES})")
+
+
+def respaced_timesteps(T: int, nfe: int) -> np.ndarray:
+    """`nfe` evenly spaced timesteps in [0, T - 1], ascending."""
+    if not 1 <= nfe <= T:
+        raise ValueError(f"nfe must be in [1, {T}], got {nfe}")
+    return np.unique(np.round(np.linspace(0, T - 1, nfe)).astype(np.int64))
+
+
+def log_snr(abar):
+    """Half log-SNR, lambda = log(alpha / sigma)."""
+    return 0.5 * np.log(abar / (1.0 - abar))
+
+
+def logsnr_timesteps(abar_full: np.ndarray, nfe: int) -> np.ndarray:
+    """
+    `nfe` timesteps evenly spaced in log-SNR (the spacing DPM-Solver uses
+    for pixel-space models), snapped to integers and kept strictly
+    increasing, ascending. The grid starts at T - 1 but is spaced from
+    LOGSNR_FLOOR at most, so the cosine schedule's clipped tail (lambda
+    down to -10 over its last few steps) is crossed in one step instead
+    of eating the budget.
+    """
+    T = len(abar_full)
+    if not 1 <= nfe <= T:
+        raise ValueError(f"nfe must be in [1, {T}], got {nfe}")
+    lam = log_snr(abar_full)                       # decreasing in t
+    targets = np.linspace(max(lam[-1], LOGSNR_FLOOR), lam[0], nfe)
+    ts = np.round(np.interp(targets, lam[::-1], np.arange(T)[::-1])).astype(np.int64)
+    ts = np.sort(ts)
+    ts[-1] = T - 1
+    for i in range(1, nfe):
+        ts[i] = max(ts[i], ts[i - 1] + 1)
+    return np.minimum(ts, T - 1 - np.arange(nfe)[::-1])
+
+
+class Step(NamedTuple):
+    t: int          # original timestep fed to the model
+    k1: float
+    k2: float
+    c1: float
+    c2: float
+    sigma: float
+    cp: float = 0.0  # weight of the previous step's x0 (multistep solvers)
+
+
+@lru_cache(maxsize=32)
+def respaced(
+    schedule: str,
+    T: int,
+    sampler: str,
+    nfe: int,
+    eta: float = 0.0,
+) -> Tuple[Step, ...]:
+    """Per-step coefficients, in sampling order (high t first)."""
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler {sampler!r} (expected one of {SAMPLERS})")
+    abar_full = np.cumprod(1.0 - make_betas(schedule, T))
+    ts = logsnr_timesteps(abar_full, nfe) if sampler == "dpm++2m" else respaced_timesteps(T, nfe)
+    abar = abar_full[ts]
+    abar_prev = np.concatenate(([1.0], abar[:-1]))
+
+    steps = []
+    h_last = None
+    for i in reversed(range(len(ts))):
+        a, ap = abar[i], abar_prev[i]
+        k1, k2 = math.sqrt(1.0 / a), math.sqrt(1.0 / a - 1.0)
+        if sampler == "ddpm":
+            beta = 1.0 - a / ap                         # respaced beta
+            c1 = math.sqrt(ap) * beta / (1.0 - a)
+            c2 = math.sqrt(1.0 - beta) * (1.0 - ap) / (1.0 - a)
+            var = beta * (1.0 - ap) / (1.0 - a)         # posterior variance
+            steps.append(Step(int(ts[i]), k1, k2, c1, c2, math.sqrt(var) if i > 0 else 0.0))
+        elif sampler == "ddim":
+            sigma = eta * math.sqrt((1.0 - ap) / (1.0 - a) * (1.0 - a / ap)) if i > 0 else 0.0
+            # DDIM direction term with eps re-derived from the (clipped) x0,
+            # eps = (x - sqrt(a) x0) / sqrt(1 - a), folded into c1 and c2.
+            d = math.sqrt(max(1.0 - ap - sigma ** 2, 0.0)) / math.sqrt(1.0 - a)
+            steps.append(Step(int(ts[i]), k1, k2, math.sqrt(ap) - d * math.sqrt(a), d, sigma))
+        elif i == 0:
+            # Last step to sigma = 0: the (first-order) data prediction itself.
+            steps.append(Step(int(ts[i]), k1, k2, 1.0, 0.0, 0.0))
+        else:
+            # DPM-Solver++(2M): x' = (s'/s) x + a' (1 - e^-h) D with
+            # D = (1 + 1/2r) x0 - (1/2r) x0_prev, r = h_prev / h.
+            h = float(log_snr(ap) - log_snr(a))
+            b = math.sqrt(ap) * -math.expm1(-h)
+            c2 = math.sqrt((1.0 - ap) / (1.0 - a))
+            if h_last is None:
+                steps.append(Step(int(ts[i]), k1, k2, b, c2, 0.0))
+            else:
+                half_inv_r = 0.5 * h / h_last
+                steps.append(Step(int(ts[i]), k1, k2, b * (1.0 + half_inv_r), c2, 0.0, -b * half_inv_r))
+            h_last = h
+    return tuple(steps)
+
+
+# ---------------------------------------------------------------------------
+# Batch size from a memory budget
+# ---------------------------------------------------------------------------
+
+def bytes_per_sample(model, shape: Tuple[int, int, int], device: Any, probe: int = 2) -> int:
+    """
+    Activation memory of one sample in a model call: peak allocation on
+    CUDA, else the summed size of all module outputs (an upper bound).
+    """
+    import torch
+
+    x = torch.zeros((probe,) + tuple(shape), device=device)
+    t = torch.zeros(probe, dtype=torch.long, device=device)
+    if torch.device(device).type == "cuda":
+        torch.cuda.synchronize(device)
+        torch.cuda.reset_peak_memory_stats(device)
+        base = torch.cuda.memory_allocated(device)
+        with torch.inference_mode():
+            model(x, t)
+        torch.cuda.synchronize(device)
+        return max(1, (torch.cuda.max_memory_allocated(device) - base) // probe)
+
+    total = [0]
+
+    def hook(_m, _inp, out):
+        if torch.is_tensor(out):
+            total[0] += out.numel() * out.element_size()
+
+    handles = [m.register_forward_hook(hook) for m in model.modules()]
+    try:
+        with torch.inference_mode():
+            model(x, t)
+    finally:
+        for h in handles:
+            h.remove()
+    return max(1, total[0] // probe)
+
+
+def batch_for_budget(per_sample: int, budget: int, n: int) -> int:
+    b = max(1, budget // per_sample)
+    if b >= _BATCH_MULTIPLE:
+        b -= b % _BATCH_MULTIPLE
+    return int(min(b, n))
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class SamplerEngine:
+    def __init__(
+        self,
+        model,
+        schedule: str = "linear",
+        sampler: str = "ddpm",
+        nfe: int = 50,
+        T: int = DEFAULT_T,
+        shape: Tuple[int, int, int] = (3, 32, 32),
+        device: Any = "cpu",
+        batch_size: Optional[int] = None,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        eta: float = 0.0,
+        clip_x0: bool = True,
+    ) -> None:
+        self.model = model
+        self.steps = respaced(schedule, T, sampler, nfe, eta)
+        self.shape = tuple(shape)
+        self.device = device
+        self.clip_x0 = clip_x0
+        self.batch_size = batch_size
+        self.memory_budget = memory_budget
+        self._bufs: Optional[dict] = None
+
+    def _buffers(self, b: int) -> dict:
+        import torch
+
+        if self._bufs is None or self._bufs["x"].shape[0] < b:
+            full = (b,) + self.shape
+            on_cpu = torch.device(self.device).type == "cpu"
+            self._bufs = {
+                "x": torch.empty(full, device=self.device),
+                "x0": torch.empty(full, device=self.device),
+                "x0p": torch.empty(full, device=self.device),
+                "z": torch.empty(full, device=self.device),
+                # Host staging for the counter-based noise (pinned for GPUs).
+                "host": None if on_cpu else torch.empty(full, pin_memory=torch.cuda.is_available()),
+                "t": [torch.full((b,), s.t, dtype=torch.long, device=self.device) for s in self.steps],
+            }
+        return self._bufs
+
+    def resolve_batch_size(self, n: int) -> int:
+        if self.batch_size is None:
+            per = bytes_per_sample(self.model, self.shape, self.device)
+            self.batch_size = batch_for_budget(per, self.memory_budget, max(n, 1))
+        return self.batch_size
+
+    def _noise(self, dst, seed: int, start: int, step: int) -> None:
+        """Fill `dst` with the noise of samples start.. at `step` (min_snr.rng)."""
+        from min_snr.rng import philox_normal
+
+        b = dst.shape[0]
+        host = self._bufs["host"]
+        host = dst if host is None else host[:b]
+        philox_normal(seed, np.arange(start, start + b), step, host[0].numel(), out=host.numpy().reshape(b, -1))
+        if host is not dst:
+            dst.copy_(host)
+
+    def run_batch(self, seed: int, start: int, b: int) -> Any:
+        """
+        Sample images start..start + b - 1 of the `seed` stream; returns a
+        view of the x buffer.
+        """
+        import torch
+
+        bufs = self._buffers(b)
+        x, x0, z = bufs["x"][:b], bufs["x0"][:b], bufs["z"][:b]
+        x0p = bufs["x0p"][:b]
+        self._noise(x, seed, start, 0)
+        with torch.inference_mode():
+            for k, (s, t) in enumerate(zip(self.steps, bufs["t"])):
+                eps = self.model(x, t[:b])
+                torch.mul(x, s.k1, out=x0).sub_(eps, alpha=s.k2)
+                if self.clip_x0:
+                    x0.clamp_(-1.0, 1.0)
+                x.mul_(s.c2).add_(x0, alpha=s.c1)
+                if s.cp:
+                    x.add_(x0p, alpha=s.cp)
+                if s.sigma:
+                    self._noise(z, seed, start, k + 1)
+                    x.add_(z, alpha=s.sigma)
+                x0, x0p = x0p, x0
+        return x
+
+    def sample(self, n: int, seed: int = 0, start: int = 0) -> Iterator[Any]:
+        """
+        Yield batches (views of the engine buffer, [-1, 1] NCHW) of samples
+        start..start + n - 1. Noise is keyed by (seed, sample index, step),
+        so any split of the index range reproduces the same images.
+        """
+        bs = self.resolve_batch_size(n)
+        for a in range(start, start + n, bs):
+            yield self.run_batch(seed, a, min(bs, start + n - a))
+
+
+def sample_features(
+    engine: SamplerEngine,
+    n: int,
+    extractor: Callable[[Any, Any], Any],
+    seed: int = 0,
+    writer=None,
+    start: int = 0,
+    resize: Optional[int] = None,
+):
+    """
+    Sample `n` images and extract features with sampling overlapped with the
+    extractor (min_snr.pipeline), resized to `resize` on the way (see
+    min_snr.features.input_size). Optionally also append them to a
+    ShardWriter. Returns (features, StageStats).
+    """
+    from min_snr.pipeline import extract_features
+
+    def batches():
+        for x in engine.sample(n, seed, start):
+            if writer is not None:
+                writer.append(x)
+            yield x
+
+    return extract_features(batches(), extractor, engine.device, n_total=n, from_pm1=True, resize=resize)
+
+
+# ---------------------------------------------------------------------------
+# Models from checkpoints
+# ---------------------------------------------------------------------------
+
+def load_model(
+    factory: str,
+    ckpt: Optional[str] = None,
+    state_key: Optional[str] = None,
+    device: Any = "cpu",
+):
+    """
+    Build a model with a ``"module:callable"`` factory and load a checkpoint
+    into it: a min_snr.ckpt file (`state_key` names the section, default
+    "ema") or anything torch.load reads (`state_key` picks a sub-dict, e.g.
+    "ema"). A "module." prefix from DataParallel is stripped.
+    """
+    import torch
+
+    from min_snr.ckpt import is_checkpoint, load_state
+    from min_snr.features import load_callable
+
+    model = load_callable(factory)()
+    if ckpt and is_checkpoint(ckpt):
+        state = load_state(ckpt, state_key or "ema")   # mapped, only this section is read
+    elif ckpt:
+        state = torch.load(ckpt, map_location="cpu")
+        if state_key:
+            for part in state_key.split("."):
+                state = state[part]
+    if ckpt:
+        state = {k[len("module."):] if k.startswith("module.") else k: v for k, v in state.items()}
+        model.load_state_dict(state)
+    model.to(device).eval()
+    for p in model.parameters():
+        p.requires_grad_(False)
+    return model
+
+
+def add_sampler_args(parser, checkpoint: bool = True) -> None:
+    """Shared CLI flags for tools that sample from a checkpoint (or, with
+    checkpoint=False, from weights they receive some other way)."""
+    parser.add_argument("--model-factory", required=True, help="'module:callable' building the UNet.")
+    if checkpoint:
+        parser.add_argument("--ckpt", default=None, help="Checkpoint (*.ckpt, or torch.load-able).")
+        parser.add_argument("--state-key", default=None, help="Sub-dict of the checkpoint, e.g. 'ema'.")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="linear", help="Beta schedule.")
+    parser.add_argument("--T", type=int, default=DEFAULT_T, help="Training timesteps.")
+    parser.add_argument("--sampler", choices=SAMPLERS, default="ddpm")
+    parser.add_argument("--nfe", type=int, default=50, help="Model calls per sample.")
+    parser.add_argument("--eta", type=float, default=0.0, help="DDIM eta.")
+    parser.add_argument("--image-size", type=int, default=32)
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--sample-batch", type=int, default=None, help="Fixed sampling batch size.")
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=int,
+        default=DEFAULT_MEMORY_BUDGET >> 20,
+        help="Activation budget used to pick the sampling batch size.",
+    )
+    parser.add_argument("--device", default="cuda")
+
+
+def engine_from_args(args) -> SamplerEngine:
+    model = load_model(args.model_factory, args.ckpt, args.state_key, args.device)
+    return SamplerEngine(
+        model,
+        schedule=args.schedule,
+        sampler=args.sampler,
+        nfe=args.nfe,
+        T=args.T,
+        shape=(args.channels, args.image_size, args.image_size),
+        device=args.device,
+        batch_size=args.sample_batch,
+        memory_budget=args.memory_budget_mb << 20,
+        eta=args.eta,
+    )
+
+
+def engine_from_config(
+    model,
+    cfg: dict,
+    block: str,
+    device: Any = "cpu",
+    batch_size: Optional[int] = None,
+) -> SamplerEngine:
+    """
+    Engine for a study config's ``eval.<block>`` (grid, kid, fid_milestone,
+    final): its sampler and nfe, with the ``diffusion`` beta schedule.
+    """
+    diffusion = cfg.get("diffusion", {})
+    ev = cfg.get("eval", {}).get(block)
+    if ev is None:
+        raise KeyError(f"Config has no eval.{block} block")
+    return SamplerEngine(
+        model,
+        schedule=diffusion.get("beta_schedule", "linear"),
+        sampler=ev.get("sampler", "ddpm"),
+        nfe=int(ev.get("nfe", 50)),
+        T=int(diffusion.get("num_timesteps", DEFAULT_T)),
+        device=device,
+        batch_size=batch_size,
+        eta=float(ev.get("eta", 0.0)),
+    )
@@ -0,0 +1,262 @@
+"""
+Sample generation + feature extraction split across a process pool.
+
+One small UNet at evaluation batch sizes does not keep 32 intra-op threads
+busy, so the final 10k-sample FID is split by sample index instead: the
+range [0, n) is cut into fixed-size parts, and each worker process (pinned
+to its own slice of cores, torch threads set to match) samples its part
+through min_snr.sampling.sample_features (the same pipeline as the
+single-process path: sampling overlapped with the extractor, resize on the
+producer thread) and folds the features into a Gaussian state (count,
+mean, centered scatter; see min_snr.refstats). The state and per-image
+digests go to ``<out>.parts/part_NNNNN.npz``.
+
+The parent merges the parts in index order and computes FID against the
+reference stats. Because noise is keyed by sample index (min_snr.rng), the
+merged result and the sample fingerprint are the same for any number of
+workers, and an interrupted evaluation resumes from the parts on disk.
+
+Usage:
+    python -m min_snr.cli shard-eval --model-factory my_models:unet_cifar32 \\
+        --ckpt runs/e8a/ckpt.pt --state-key ema --sampler ddpm --nfe 50 \\
+        --n 10000 --ref-stats stats/cifar10_inception_train.npz \\
+        --workers 8 --device cpu --out runs/e8a/eval/final
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from min_snr.logs import PathLike
+from min_snr.refstats import (
+    GaussianState,
+    _check_job_file,
+    gaussian_state,
+    image_digests,
+    load_part,
+    merge_states,
+)
+
+DEFAULT_PART_SIZE = 500
+
+
+class SamplerSpec(NamedTuple):
+    """Everything a worker needs to rebuild the sampling engine."""
+
+    factory: str
+    ckpt: Optional[str]
+    state_key: Optional[str]
+    schedule: str = "linear"
+    T: int = 1000
+    sampler: str = "ddpm"
+    nfe: int = 50
+    eta: float = 0.0
+    shape: Tuple[int, int, int] = (3, 32, 32)
+    batch_size: Optional[int] = None
+    memory_budget: int = 2 << 30
+
+
+class PartJob(NamedTuple):
+    index: int
+    start: int
+    stop: int
+    seed: int
+    spec: SamplerSpec
+    extractor: Optional[str]
+    part_path: str
+
+
+class ShardedFID(NamedTuple):
+    fid: float
+    n: int
+    fingerprint: str
+    wall_s: float
+    workers: int
+
+    def as_log(self) -> Dict[str, float]:
+        return {"val/fid": self.fid}
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(slot, threads: int, device: str) -> None:
+    """Claim a worker slot, pin to its cores and pick its device."""
+    import torch
+
+    with slot.get_lock():
+        w = slot.value
+        slot.value += 1
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        mine = cores[(w * threads) % len(cores):][:threads]
+        if mine:
+            os.sched_setaffinity(0, mine)
+    torch.set_num_threads(max(1, threads))
+    if device == "cuda" and torch.cuda.device_count() > 1:
+        device = f"cuda:{w % torch.cuda.device_count()}"
+    _WORKER["device"] = device
+
+
+def _worker_state(job: PartJob):
+    """Engine and extractor, built once per worker process."""
+    from min_snr.features import get_extractor
+    from min_snr.sampling import SamplerEngine, load_model
+
+    device = _WORKER.setdefault("device", "cpu")
+    key = (job.spec, job.extractor, device)
+    if _WORKER.get("key") != key:
+        spec = job.spec
+        model = load_model(spec.factory, spec.ckpt, spec.state_key, device)
+        _WORKER.update(
+            key=key,
+            engine=SamplerEngine(
+                model, spec.schedule, spec.sampler, spec.nfe, spec.T, spec.shape,
+                device, spec.batch_size, spec.memory_budget, spec.eta,
+            ),
+            extractor=get_extractor(job.extractor),
+        )
+    return _WORKER["engine"], _WORKER["extractor"], device
+
+
+class _Digests:
+    """`writer` for sample_features that keeps only per-image digests."""
+
+    def __init__(self) -> None:
+        self.parts: List[bytes] = []
+
+    def append(self, x) -> None:
+        from min_snr.samples import to_uint8
+
+        self.parts.append(image_digests(to_uint8(x)))
+
+
+def process_part(job: PartJob) -> Tuple[int, int]:
+    """Sample one index range -> Gaussian state part file. Returns (index, n)."""
+    from min_snr.features import input_size
+    from min_snr.sampling import sample_features
+
+    engine, extractor, _ = _worker_state(job)
+    digests = _Digests()
+    feats, _ = sample_features(
+        engine, job.stop - job.start, extractor, job.seed, digests, job.start,
+        resize=input_size(job.extractor),
+    )
+    state = gaussian_state(feats)
+
+    part = Path(job.part_path)
+    tmp = part.with_name(part.name + ".tmp.npz")
+    np.savez(
+        tmp,
+        n=state.n,
+        mean=state.mean,
+        m2=state.m2,
+        digests=np.frombuffer(b"".join(digests.parts), dtype=np.uint8),
+    )
+    os.replace(tmp, part)
+    return job.index, state.n
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def sharded_fid(
+    spec: SamplerSpec,
+    n: int,
+    ref_stats: PathLike,
+    out: PathLike,
+    seed: int = 0,
+    workers: int = 1,
+    part_size: int = DEFAULT_PART_SIZE,
+    extractor: Optional[str] = None,
+    device: str = "cpu",
+    keep_parts: bool = False,
+) -> ShardedFID:
+    """Sample `n` images across `workers` processes and return their FID."""
+    import multiprocessing as mp
+
+    from min_snr.fid import fid_from_stats, load_ref_stats
+
+    out = Path(out)
+    parts_dir = out.with_name(out.name + ".parts")
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    job_info = {
+        "spec": spec._asdict(),
+        "n": n,
+        "seed": seed,
+        "part_size": part_size,
+        "extractor": extractor,
+    }
+    _check_job_file(parts_dir, json.loads(json.dumps(job_info)))
+
+    jobs: List[PartJob] = [
+        PartJob(i, a, min(a + part_size, n), seed, spec, extractor, str(parts_dir / f"part_{i:05d}.npz"))
+        for i, a in enumerate(range(0, n, part_size))
+    ]
+    todo = [j for j in jobs if not Path(j.part_path).exists()]
+    print(
+        f"[shard-eval] n={n} {spec.sampler} nfe={spec.nfe}: {len(jobs)} parts, "
+        f"{len(jobs) - len(todo)} already done, {workers} worker(s)"
+    )
+
+    t0 = time.perf_counter()
+    n_done = 0
+    threads = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    slot = mp.Value("i", 0)
+    if workers <= 1:
+        # In the caller's process: no pinning, and its thread count is put back.
+        import torch
+
+        prev_threads = torch.get_num_threads()
+        torch.set_num_threads(os.cpu_count() or 1)
+        _WORKER["device"] = device
+        try:
+            for k, j in enumerate(todo, 1):
+                n_done += process_part(j)[1]
+                _report(k, len(todo), n_done, t0)
+        finally:
+            torch.set_num_threads(prev_threads)
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(slot, threads, device)) as pool:
+            futures = [pool.submit(process_part, j) for j in todo]
+            for k, fut in enumerate(as_completed(futures), 1):
+                n_done += fut.result()[1]
+                _report(k, len(todo), n_done, t0)
+
+    # Merge in index order so the result does not depend on scheduling.
+    state: Optional[GaussianState] = None
+    h = hashlib.sha256()
+    for j in jobs:
+        part, digests = load_part(j.part_path)
+        state = merge_states(state, part)
+        h.update(digests)
+    fid = fid_from_stats(state.mean, state.cov, load_ref_stats(ref_stats))
+    result = ShardedFID(fid, state.n, h.hexdigest(), time.perf_counter() - t0, workers)
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_text(json.dumps(result._asdict(), indent=2) + "\n")
+    os.replace(tmp, out)
+    if not keep_parts:
+        for j in jobs:
+            Path(j.part_path).unlink()
+        (parts_dir / "job.json").unlink()
+        parts_dir.rmdir()
+    print(f"[shard-eval] FID={fid:.3f} (n={state.n}, fingerprint {h.hexdigest()[:16]}) -> {out}")
+    return result
+
+
+def _report(k: int, total: int, n_done: int, t0: float) -> None:
+    rate = n_done / max(time.perf_counter() - t0, 1e-9)
+    print(f"[shard-eval] part {k}/{total} done ({rate:.1f} samples/s)")
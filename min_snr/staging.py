@@ -0,0 +1,346 @@
+"""
+Run directories on fast local disk, mirrored to a slow destination.
+
+Writing ``out_dir`` straight to ``/content/drive/MyDrive/...`` puts every
+loss.jsonl append, TensorBoard flush and checkpoint on a high-latency FUSE
+mount. `StagedDir` gives the run a local directory instead and a background
+thread mirrors it to the destination:
+
+  - batched: one pass every `interval_s` picks up everything that changed
+    since the last one, so a hundred log appends become one copy
+  - incremental: a file that only grew (loss.jsonl, event files) gets just
+    its new tail appended, after checking the already-synced prefix hash
+  - safe: other files are written to a temp name on the destination and
+    renamed into place; files still being written locally (``*.tmp*``) are
+    left for the next pass, as are files that change mid-copy
+  - rate-limited (`max_bytes_per_s`) so syncing does not starve data loading
+  - checksummed: the SHA-256 of what was copied is recorded in a manifest
+    and, with `verify`, compared against a re-read of the destination
+
+The manifest (``.staging.json`` in the local directory) is written after
+every pass. `close()`, also registered with atexit, runs a final
+unthrottled pass and a full checksum check of the destination, then leaves
+a copy of the manifest next to the mirrored files.
+
+Crash recovery: the local directory is derived from the destination path,
+so a restarted run finds the previous run's local files and manifest and
+the first pass re-sends whatever had not made it across
+(``python -m min_snr.cli stage-sync`` does the same by hand). If the local
+disk is gone (a fresh VM), the destination is pulled back into a new local
+directory first, so resuming from its checkpoints works unchanged.
+
+Usage:
+    stage = StagedDir("/content/drive/MyDrive/min-snr/e7b")
+    out_dir = stage.path            # give this to the trainer
+    ...
+    stage.close()                   # or let atexit do it
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from min_snr.logs import PathLike
+
+MANIFEST = ".staging.json"
+STAGING_ENV = "MIN_SNR_STAGING"
+DEFAULT_LOCAL_ROOT = "/tmp/min_snr_staging"
+DEFAULT_INTERVAL_S = 30.0
+_CHUNK = 1 << 20
+_TMP_MARK = ".tmp"
+
+
+class SyncStats(NamedTuple):
+    copied: int       # files copied whole
+    appended: int     # files that only got their new tail
+    deleted: int
+    nbytes: int
+    pending: int      # changed files left for the next pass
+    seconds: float
+
+
+def default_local_dir(dest: PathLike, root: Optional[PathLike] = None) -> Path:
+    """Stable local directory for `dest` (same destination -> same directory)."""
+    dest = Path(dest).expanduser().absolute()
+    root = Path(root or os.environ.get(STAGING_ENV, DEFAULT_LOCAL_ROOT))
+    return root / f"{dest.name}-{hashlib.sha1(str(dest).encode()).hexdigest()[:8]}"
+
+
+def _sha256_file(path: Path, start: int = 0, stop: Optional[int] = None) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(start)
+        left = None if stop is None else stop - start
+        while left is None or left > 0:
+            buf = f.read(_CHUNK if left is None else min(_CHUNK, left))
+            if not buf:
+                break
+            h.update(buf)
+            if left is not None:
+                left -= len(buf)
+    return h.hexdigest()
+
+
+def _write_chunk(f, buf: bytes) -> None:
+    """One write to the destination (the slow part; tests slow it down here)."""
+    f.write(buf)
+
+
+class _Throttle:
+    """Token bucket over bytes written to the destination."""
+
+    def __init__(self, bytes_per_s: Optional[float]) -> None:
+        self.rate = bytes_per_s
+        self._t = time.monotonic()
+        self._debt = 0.0
+
+    def __call__(self, n: int) -> None:
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self._debt = max(0.0, self._debt - (now - self._t) * self.rate) + n
+        self._t = now
+        if self._debt > self.rate * 0.1:  # allow ~100 ms of burst
+            time.sleep((self._debt - self.rate * 0.1) / self.rate)
+
+
+class StagedDir:
+    """Local run directory mirrored to `dest`; see the module docstring."""
+
+    def __init__(
+        self,
+        dest: PathLike,
+        local: Optional[PathLike] = None,
+        interval_s: float = DEFAULT_INTERVAL_S,
+        max_bytes_per_s: Optional[float] = None,
+        verify: bool = True,
+        delete: bool = True,
+        start: bool = True,
+    ) -> None:
+        self.dest = Path(dest)
+        self.path = Path(local) if local is not None else default_local_dir(dest)
+        self.interval_s = interval_s
+        self.verify = verify
+        self.delete = delete
+        self.last_error: Optional[BaseException] = None
+        self._throttle = _Throttle(max_bytes_per_s)
+        self._lock = threading.Lock()      # one pass at a time
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        manifest = self.path / MANIFEST
+        if manifest.exists():
+            data = json.loads(manifest.read_text())
+            if data["dest"] != str(self.dest):
+                raise ValueError(f"{self.path} is staging {data['dest']}, not {self.dest}")
+            self.manifest = data["files"]
+            print(f"[staging] Recovering {self.path} ({len(self.manifest)} files already mirrored)")
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            if self.dest.is_dir():
+                self._pull()
+
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self._thread = threading.Thread(target=self._loop, name="staging-sync", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    # -- scanning -------------------------------------------------------------
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        for root, dirs, names in os.walk(self.path):
+            dirs.sort()
+            for name in names:
+                if name == MANIFEST or _TMP_MARK in name:
+                    continue
+                p = Path(root) / name
+                try:
+                    st = p.stat()
+                except FileNotFoundError:  # renamed away mid-scan
+                    continue
+                files[p.relative_to(self.path).as_posix()] = (st.st_size, st.st_mtime_ns)
+        return files
+
+    def _pull(self) -> None:
+        """Seed an empty local directory from an existing destination."""
+        n = 0
+        for src in sorted(self.dest.rglob("*")):
+            rel = src.relative_to(self.dest).as_posix()
+            if not src.is_file() or src.name == MANIFEST or _TMP_MARK in src.name:
+                continue
+            dst = self.path / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src, dst)
+            st = dst.stat()
+            self.manifest[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256_file(dst)}
+            n += 1
+        if n:
+            self._save_manifest()
+            print(f"[staging] Pulled {n} files from {self.dest} into {self.path}")
+
+    def _save_manifest(self, target: Optional[Path] = None) -> None:
+        target = target or self.path / MANIFEST
+        tmp = target.with_name(target.name + _TMP_MARK)
+        tmp.write_text(json.dumps({"dest": str(self.dest), "files": self.manifest}, indent=1))
+        os.replace(tmp, target)
+
+    # -- copying --------------------------------------------------------------
+
+    def _copy(self, src: Path, dst: Path, offset: int, mode: str) -> Tuple[int, str]:
+        """Copy src[offset:] to dst (appending or writing); returns (bytes, tail sha256)."""
+        h = hashlib.sha256()
+        n = 0
+        with open(src, "rb") as fi, open(dst, mode) as fo:
+            fi.seek(offset)
+            while True:
+                buf = fi.read(_CHUNK)
+                if not buf:
+                    break
+                self._throttle(len(buf))
+                _write_chunk(fo, buf)
+                h.update(buf)
+                n += len(buf)
+            fo.flush()
+            os.fsync(fo.fileno())
+        return n, h.hexdigest()
+
+    def _push(self, rel: str, stat: Tuple[int, int]) -> Optional[Tuple[str, int]]:
+        """Mirror one file. Returns (how, bytes) or None if it changed mid-copy."""
+        src, dst = self.path / rel, self.dest / rel
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        prev = self.manifest.get(rel)
+        size = stat[0]
+
+        appendable = (
+            prev is not None
+            and size > prev["size"]
+            and dst.exists()
+            and dst.stat().st_size == prev["size"]
+            and _sha256_file(src, 0, prev["size"]) == prev["sha256"]
+        )
+        if appendable:
+            offset = prev["size"]
+            n, tail = self._copy(src, dst, offset, "ab")
+            how = "append"
+        else:
+            offset = 0
+            tmp = dst.with_name(f".{dst.name}{_TMP_MARK}")
+            n, tail = self._copy(src, tmp, 0, "wb")
+            how = "copy"
+
+        st = src.stat()
+        if (st.st_size, st.st_mtime_ns) != stat or offset + n != size:
+            if how == "copy":
+                tmp.unlink(missing_ok=True)
+            return None  # still being written: next pass
+        if self.verify and _sha256_file(tmp if how == "copy" else dst, offset) != tail:
+            raise IOError(f"Checksum mismatch writing {dst}")
+        if how == "copy":
+            os.replace(tmp, dst)
+        full = tail if offset == 0 else _sha256_file(src)
+        self.manifest[rel] = {"size": size, "mtime_ns": stat[1], "sha256": full}
+        return how, n
+
+    def sync_once(self) -> SyncStats:
+        """One batched pass: mirror everything that changed since the last one."""
+        with self._lock:
+            t0 = time.perf_counter()
+            files = self._scan()
+            changed = [
+                rel for rel, st in files.items()
+                if rel not in self.manifest
+                or (self.manifest[rel]["size"], self.manifest[rel]["mtime_ns"]) != st
+            ]
+            copied = appended = deleted = nbytes = pending = 0
+            for rel in changed:
+                try:
+                    done = self._push(rel, files[rel])
+                except FileNotFoundError:  # removed locally mid-pass
+                    done = None
+                if done is None:
+                    pending += 1
+                    continue
+                how, n = done
+                copied += how == "copy"
+                appended += how == "append"
+                nbytes += n
+            if self.delete:
+                for rel in [r for r in self.manifest if r not in files]:
+                    (self.dest / rel).unlink(missing_ok=True)
+                    del self.manifest[rel]
+                    deleted += 1
+            if copied or appended or deleted:
+                self._save_manifest()
+            return SyncStats(copied, appended, deleted, nbytes, pending, time.perf_counter() - t0)
+
+    def check(self) -> Dict[str, str]:
+        """Destination files whose checksum differs from the manifest: {rel: reason}."""
+        bad = {}
+        for rel, e in self.manifest.items():
+            dst = self.dest / rel
+            if not dst.exists():
+                bad[rel] = "missing"
+            elif dst.stat().st_size != e["size"]:
+                bad[rel] = "size"
+            elif _sha256_file(dst) != e["sha256"]:
+                bad[rel] = "sha256"
+        return bad
+
+    # -- background -----------------------------------------------------------
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.sync_once()
+                self.last_error = None
+            except OSError as e:  # flaky mount: keep training, retry next pass
+                self.last_error = e
+                print(f"[staging] Sync to {self.dest} failed, retrying: {e}")
+
+    def flush(self) -> SyncStats:
+        """Sync now on the calling thread (waits for a pass in progress)."""
+        return self.sync_once()
+
+    def close(self) -> Dict[str, str]:
+        """Final unthrottled pass + destination checksum check; returns mismatches."""
+        if self._closed:
+            return {}
+        self._closed = True
+        atexit.unregister(self.close)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._throttle.rate = None
+        stats = self.sync_once()
+        for _ in range(50):  # something was still being written
+            if not stats.pending:
+                break
+            time.sleep(0.1)
+            stats = self.sync_once()
+        bad = self.check()
+        if bad:  # re-send once from local, then report what is still off
+            for rel in bad:
+                self.manifest.pop(rel)
+            self.sync_once()
+            bad = self.check()
+        self._save_manifest(self.dest / MANIFEST)
+        print(
+            f"[staging] Closed {self.path} -> {self.dest}: {len(self.manifest)} files"
+            + (f", {len(bad)} mismatched: {sorted(bad)}" if bad else ", all checksums match")
+        )
+        return bad
@@ -0,0 +1,22 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from min_snr import datasets
+
+CIFAR_PER_BATCH = 100
+
+
+@pytest.fixture
+def cifar_root(tmp_path, monkeypatch):
+    """A fake CIFAR-10 python-batches directory with 5 small training batches."""
+    monkeypatch.setattr(datasets, "CIFAR10_BATCH", CIFAR_PER_BATCH)
+    rng = np.random.default_rng(0)
+    root = tmp_path / "cifar"
+    root.mkdir()
+    for name in datasets.CIFAR10_TRAIN:
+        data = rng.integers(0, 256, size=(CIFAR_PER_BATCH, 3072), dtype=np.uint8)
+        with (root / name).open("wb") as f:
+            pickle.dump({b"data": data, b"labels": [0] * CIFAR_PER_BATCH}, f)
+    return root
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from min_snr.align import align_series
+
+
+def test_exact_join_intersects_and_dedups():
+    a = (np.array([0, 100, 200, 300, 300]), np.array([0.0, 1.0, 2.0, 3.0, 3.5]))
+    b = (np.array([300, 100, 50]), np.array([30.0, 10.0, 5.0]))
+
+    out = align_series([a, b], how="exact")
+
+    assert out.steps.tolist() == [100, 300]
+    assert out.values[0].tolist() == [1.0, 3.5]  # last duplicate wins
+    assert out.values[1].tolist() == [10.0, 30.0]
+
+
+def test_nearest_and_asof_with_tolerance():
+    fid = (np.array([2000, 4000, 6000]), np.array([300.0, 200.0, 150.0]))
+    curv = (np.array([1900, 4000, 5000]), np.array([1.0, 2.0, 3.0]))
+
+    near = align_series([fid, curv], how="nearest")
+    assert near.values[1].tolist() == [1.0, 2.0, 3.0]
+    assert near.src_steps[1].tolist() == [1900, 4000, 5000]
+
+    near_tol = align_series([fid, curv], how="nearest", tolerance=200)
+    assert near_tol.steps.tolist() == [2000, 4000]
+
+    asof = align_series([curv, fid], how="asof")
+    assert asof.steps.tolist() == [4000, 5000]  # nothing logged before 1900
+    assert asof.values[1].tolist() == [200.0, 200.0]
+
+
+def test_unknown_join_raises():
+    with pytest.raises(ValueError):
+        align_series([(np.arange(3), np.arange(3))], how="left")
@@ -0,0 +1,110 @@
+import json
+import subprocess
+import sys
+import textwrap
+import time
+
+import numpy as np
+import torch
+
+from min_snr.async_log import AsyncLogger, TensorBoardBackend, coalesce, detach_metrics
+from min_snr.logs import load_metric_series
+
+
+class SlowBackend:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = []
+        self.closed = False
+
+    def log_batch(self, records):
+        time.sleep(self.delay)
+        self.calls.append(list(records))
+
+    def close(self):
+        self.closed = True
+
+
+class BrokenBackend:
+    def log_batch(self, records):
+        raise RuntimeError("backend down")
+
+
+def test_step_path_is_a_queue_push_and_output_is_ordered(tmp_path):
+    slow = SlowBackend()
+    logger = AsyncLogger(tmp_path / "loss.jsonl", [slow, BrokenBackend()])
+    metrics = {f"mse_t/{i}": 0.1 * i for i in range(40)}
+    t0 = time.perf_counter()
+    for step in range(2000):
+        metrics["loss"] = 1.0 / (step + 1)
+        logger.log(step, metrics)
+    assert time.perf_counter() - t0 < 0.5  # vs. >= 40 s for one backend call per record
+    logger.close()
+
+    steps, loss = load_metric_series(tmp_path / "loss.jsonl")["loss"]
+    assert steps.tolist() == list(range(2000))
+    np.testing.assert_allclose(loss, 1.0 / (np.arange(2000) + 1), rtol=1e-6)
+    assert len(slow.calls) < 200 and slow.closed  # batched
+    assert [s for batch in slow.calls for s, _ in batch] == list(range(2000))
+    assert len(logger.errors) == len(slow.calls)
+
+
+def test_coalesce_merges_records_that_share_a_step():
+    recs = [(10, {"loss": 1.0}), (10, {"val/fid": 30.0}), (11, {"loss": 0.9}), (10, {"loss": 0.5})]
+    assert coalesce(recs) == [(10, {"loss": 1.0, "val/fid": 30.0}), (11, {"loss": 0.9}), (10, {"loss": 0.5})]
+    assert recs[0][1] == {"loss": 1.0}
+
+
+def test_detach_and_leftover_tensors(tmp_path):
+    m = detach_metrics({"loss": torch.tensor(0.25), "lr": 1e-4, "per_t": torch.arange(3.0), "n": torch.tensor([7])})
+    assert m == {"loss": 0.25, "lr": 1e-4, "per_t": [0.0, 1.0, 2.0], "n": 7.0}
+
+    logger = AsyncLogger(tmp_path / "loss.jsonl")
+    logger.log(5, {"loss": torch.tensor(0.5), "count": np.int64(3)})
+    assert logger.flush(timeout=5)
+    rec = json.loads((tmp_path / "loss.jsonl").read_text())
+    assert rec == {"_i": 5, "out": {"loss": 0.5, "count": 3}}
+    logger.close()
+
+
+def test_tensorboard_backend_flushes_once_per_batch():
+    class Writer:
+        def __init__(self):
+            self.scalars, self.flushes = [], 0
+
+        def add_scalar(self, k, v, step):
+            self.scalars.append((k, v, step))
+
+        def flush(self):
+            self.flushes += 1
+
+    w = Writer()
+    TensorBoardBackend(None, writer=w).log_batch([(1, {"loss": 0.5, "mse_t": [0.1, 0.2], "tag": "x"}), (2, {"loss": 0.4})])
+    assert w.scalars == [("loss", 0.5, 1), ("mse_t/0", 0.1, 1), ("mse_t/1", 0.2, 1), ("loss", 0.4, 2)]
+    assert w.flushes == 1
+
+
+def test_everything_is_written_when_training_crashes(tmp_path):
+    script = textwrap.dedent(f"""
+        from min_snr.async_log import AsyncLogger
+        logger = AsyncLogger({str(tmp_path / "loss.jsonl")!r})
+        for step in range(5000):
+            logger.log(step, {{"loss": float(step)}})
+        raise RuntimeError("NaN loss")
+    """)
+    proc = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    assert "NaN loss" in proc.stderr
+    lines = (tmp_path / "loss.jsonl").read_text().splitlines()
+    assert [json.loads(l)["_i"] for l in lines] == list(range(5000))
+
+
+def test_unserializable_record_is_dropped_alone(tmp_path):
+    logger = AsyncLogger(tmp_path / "loss.jsonl")
+    logger.log(1, {"loss": 1.0})
+    logger.log(2, {"loss": object()})
+    logger.log(3, {"loss": 3.0})
+    logger.close()
+
+    lines = (tmp_path / "loss.jsonl").read_text().splitlines()
+    assert [json.loads(l) for l in lines] == [{"_i": 1, "out": {"loss": 1.0}}, {"_i": 3, "out": {"loss": 3.0}}]
+    assert len(logger.errors) == 1
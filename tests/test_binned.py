@@ -0,0 +1,34 @@
+import numpy as np
+
+from min_snr.binned import binned_stats, log_bins
+
+
+def test_binned_stats_matches_numpy_per_bin():
+    rng = np.random.default_rng(0)
+    x = 10 ** rng.uniform(-4, 0, size=20_000)
+    y = np.log10(x) + rng.normal(size=x.size)
+    groups = rng.integers(0, 3, size=x.size)
+    edges = log_bins(x, n_bins=8)
+
+    stats = binned_stats(x, y, edges, groups=groups, n_groups=3)
+
+    for g in range(3):
+        for b in range(8):
+            sel = (groups == g) & (x >= edges[b]) & (x < edges[b + 1])
+            assert stats.count[g, b] == sel.sum()
+            assert np.isclose(stats.mean[g, b], y[sel].mean())
+            assert np.isclose(stats.std[g, b], y[sel].std())
+            assert np.isclose(stats.quantile(0.9)[g, b], np.quantile(y[sel], 0.9))
+    assert stats.count.sum() == x.size
+
+
+def test_empty_bins_are_nan_and_nonfinite_dropped():
+    x = np.array([1e-3, 1e-3, 1.0, np.nan, -1.0])
+    y = np.array([1.0, 3.0, 5.0, 7.0, 9.0])
+    edges = np.geomspace(1e-4, 10, 6)
+
+    stats = binned_stats(x, y, edges)
+
+    assert stats.count.sum() == 3
+    assert np.isnan(stats.mean[0, 0])
+    assert stats.quantile(0.5)[0, 1] == 2.0
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import torch
+
+from min_snr.ckpt import (
+    AsyncCheckpointer,
+    convert_torch_checkpoint,
+    load_checkpoint,
+    load_state,
+    read_header,
+    save_checkpoint,
+)
+
+
+def _trained():
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(5, 7), torch.nn.ReLU(), torch.nn.Linear(7, 2))
+    opt = torch.optim.Adam(model.parameters(), lr=1e-3)
+    model(torch.randn(3, 5)).sum().backward()
+    opt.step()
+    ema = {k: v.detach().to(torch.bfloat16) for k, v in model.state_dict().items()}
+    return model, opt, ema
+
+
+def test_round_trip_sections_and_meta(tmp_path):
+    model, opt, ema = _trained()
+    path = save_checkpoint(
+        tmp_path / "last.ckpt",
+        {"model": model.state_dict(), "ema": ema, "optimizer": opt.state_dict()},
+        {"step": 1200, "val/fid": 31.5},
+    )
+    sections, meta = load_checkpoint(path)
+    assert meta == {"step": 1200, "val/fid": 31.5}
+    for k, v in model.state_dict().items():
+        assert torch.equal(sections["model"][k], v)
+    for k, v in ema.items():
+        assert sections["ema"][k].dtype == torch.bfloat16 and torch.equal(sections["ema"][k], v)
+
+    opt2 = torch.optim.Adam(model.parameters(), lr=1.0)
+    opt2.load_state_dict(sections["optimizer"])
+    assert opt2.param_groups[0]["lr"] == 1e-3
+    assert opt2.param_groups[0]["betas"] == (0.9, 0.999)
+    assert torch.equal(opt2.state[model[0].weight]["exp_avg"], opt.state[model[0].weight]["exp_avg"])
+
+
+def test_ema_load_maps_the_file(tmp_path, monkeypatch):
+    import min_snr.ckpt as ckpt
+
+    maps, real = [], np.memmap
+
+    def memmap(*args, **kwargs):
+        maps.append(real(*args, **kwargs))
+        return maps[-1]
+
+    monkeypatch.setattr(ckpt.np, "memmap", memmap)
+    model, opt, ema = _trained()
+    path = save_checkpoint(tmp_path / "c.ckpt", {"model": model.state_dict(), "ema": ema})
+    header = read_header(path)
+    assert header["data_start"] % 4096 == 0
+    assert all(e["offset"] % 64 == 0 for e in header["sections"]["ema"]["tensors"].values())
+
+    state = load_state(path, "ema")
+    w = state["0.weight"]
+    lo = maps[-1].ctypes.data
+    assert lo <= w.data_ptr() < lo + maps[-1].size  # a view of the mapping, not a copy
+
+    w.zero_()  # copy-on-write: the file is unchanged
+    assert torch.equal(load_state(path, "ema")["0.weight"], ema["0.weight"])
+    with pytest.raises(KeyError):
+        load_state(path, "optimizer")
+
+
+def test_async_save_snapshots_before_returning(tmp_path):
+    model, opt, ema = _trained()
+    ckptr = AsyncCheckpointer()
+    state = {k: v.clone() for k, v in model.state_dict().items()}
+    expected = {k: v.clone() for k, v in state.items()}
+    ckptr.save(tmp_path / "a.ckpt", {"model": state}, {"step": 1})
+    for v in state.values():
+        v.add_(1.0)  # training continues while the file is written
+    ckptr.save(tmp_path / "b.ckpt", {"model": state}, {"step": 2})
+    ckptr.close()
+
+    a = load_state(tmp_path / "a.ckpt", "model")
+    b = load_state(tmp_path / "b.ckpt", "model")
+    for k in expected:
+        assert torch.equal(a[k], expected[k])
+        assert torch.equal(b[k], expected[k] + 1.0)
+    assert ckptr.saves == 2
+
+
+def test_convert_torch_checkpoint(tmp_path):
+    model, opt, ema = _trained()
+    torch.save({"model": model.state_dict(), "ema": ema, "optimizer": opt.state_dict(), "step": 7},
+               tmp_path / "last.pt")
+    out = convert_torch_checkpoint(tmp_path / "last.pt", tmp_path / "last.ckpt")
+    header = read_header(out)
+    assert sorted(header["sections"]) == ["ema", "model", "optimizer"]
+    assert header["meta"]["step"] == 7
+    assert torch.equal(load_state(out, "ema")["2.bias"], ema["2.bias"])
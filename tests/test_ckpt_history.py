@@ -0,0 +1,139 @@
+import random
+
+import pytest
+import torch
+
+from min_snr.ckpt import load_checkpoint, save_checkpoint
+from min_snr.ckpt_history import CheckpointHistory
+from min_snr.cli import main
+
+
+def _trajectory(n_milestones, steps_per=20):
+    """(step, sections) snapshots of a small model trained with Adam."""
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.BatchNorm1d(32), torch.nn.Linear(32, 4))
+    frozen = torch.randn(64, 64)  # never changes: dedups after the first keyframe
+    opt = torch.optim.Adam(model.parameters(), lr=1e-4)
+    out = []
+    for m in range(n_milestones):
+        for _ in range(steps_per):
+            opt.zero_grad()
+            model(torch.randn(8, 16)).pow(2).mean().backward()
+            opt.step()
+        sections = {
+            "model": {k: v.clone() for k, v in model.state_dict().items()},
+            "ema": {k: v.to(torch.bfloat16) for k, v in model.state_dict().items() if v.is_floating_point()},
+            "frozen": {"table": frozen},
+            "optimizer": {
+                "state": {k: {kk: vv.clone() if torch.is_tensor(vv) else vv for kk, vv in s.items()}
+                          for k, s in opt.state_dict()["state"].items()},
+                "param_groups": opt.state_dict()["param_groups"],
+            },
+        }
+        out.append(((m + 1) * 2000, sections))
+    return out
+
+
+def _assert_same(a, b):
+    if torch.is_tensor(a):
+        assert a.dtype == b.dtype and a.shape == b.shape and torch.equal(a, b)
+    elif isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for k in a:
+            _assert_same(a[k], b[k])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            _assert_same(x, y)
+    else:
+        assert a == b
+
+
+def test_random_access_is_bit_exact_and_smaller(tmp_path):
+    traj = _trajectory(10)
+    hist = CheckpointHistory(tmp_path / "hist", keyframe_every=4, chunk_bytes=4096)
+    kinds = [hist.add(step, sections, {"lr": 1e-4}) for step, sections in traj]
+    assert kinds == ["key", "delta", "delta", "delta"] * 2 + ["key", "delta"]
+
+    order = list(range(len(traj)))
+    random.Random(0).shuffle(order)
+    for i in order:
+        step, sections = traj[i]
+        _assert_same(hist.load(step), sections)
+    _assert_same(hist.load(traj[5][0], "ema"), traj[5][1]["ema"])
+    assert hist.meta(traj[0][0]) == {"lr": 1e-4}
+
+    stats = hist.stats()
+    assert stats.milestones == 10 and stats.keyframes == 3
+    assert stats.stored_bytes < 0.6 * stats.raw_bytes
+
+
+def test_live_state_dict_across_in_place_steps(tmp_path):
+    # As documented: add(model.state_dict()) with no copy, then keep training.
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Linear(32, 4))
+    opt = torch.optim.SGD(model.parameters(), lr=1e-2)
+    hist = CheckpointHistory(tmp_path / "hist", keyframe_every=3)
+    expected = {}
+    for step in range(0, 7000, 1000):
+        hist.add(step, {"model": model.state_dict()})
+        expected[step] = {k: v.clone() for k, v in model.state_dict().items()}
+        for _ in range(5):
+            opt.zero_grad()
+            model(torch.randn(8, 16)).pow(2).mean().backward()
+            opt.step()
+    for step, sd in expected.items():
+        _assert_same(hist.load(step, "model"), sd)
+
+
+def test_unchanged_tensors_are_stored_once(tmp_path):
+    table = torch.randn(256, 256)
+    hist = CheckpointHistory(tmp_path / "hist", keyframe_every=2, chunk_bytes=1 << 14)
+    hist.add(0, {"frozen": {"table": table}})
+    first = hist.stats().chunks
+    for step in (1, 2, 3, 4):
+        hist.add(step, {"frozen": {"table": table}})
+    # Keyframes repeat the same chunks; deltas are all-zero chunks shared with each other.
+    assert hist.stats().chunks <= first + 1
+    _assert_same(hist.load(4, "frozen"), {"table": table})
+
+
+def test_reopen_continues_the_delta_chain(tmp_path):
+    traj = _trajectory(5)
+    hist = CheckpointHistory(tmp_path / "hist", keyframe_every=8)
+    for step, sections in traj[:3]:
+        hist.add(step, sections)
+    hist = CheckpointHistory(tmp_path / "hist")
+    assert hist.add(*traj[3]) == "delta"
+    hist.add(*traj[4])
+    assert hist.steps() == [s for s, _ in traj]
+    for step, sections in traj:
+        _assert_same(hist.load(step), sections)
+
+    with pytest.raises(ValueError, match="not after"):
+        hist.add(traj[0][0], traj[0][1])
+    with pytest.raises(KeyError):
+        hist.load(1)
+
+
+def test_shape_change_falls_back_to_full_tensor(tmp_path):
+    hist = CheckpointHistory(tmp_path / "hist")
+    hist.add(0, {"model": {"w": torch.randn(4, 4), "b": torch.zeros(4)}})
+    hist.add(1, {"model": {"w": torch.randn(8, 4), "b": torch.ones(4)}})
+    table = hist.milestones[1]["sections"]["model"]["tensors"]
+    assert not table["w"]["delta"] and table["b"]["delta"]
+    assert hist.load(1, "model")["w"].shape == (8, 4)
+
+
+def test_cli_add_and_export(tmp_path, capsys):
+    traj = _trajectory(3)
+    paths = []
+    for step, sections in traj:
+        paths.append(str(save_checkpoint(tmp_path / f"ckpt_{step}.ckpt", sections, {"step": step})))
+    main(["ckpt-history", str(tmp_path / "hist"), "--add", *paths])
+    main(["ckpt-history", str(tmp_path / "hist"), "--export", "4000", "--out", str(tmp_path / "m.ckpt")])
+    assert "3 milestones" in capsys.readouterr().out
+
+    sections, meta = load_checkpoint(tmp_path / "m.ckpt")
+    assert meta["step"] == 4000
+    _assert_same(sections["model"], traj[1][1]["model"])
@@ -0,0 +1,32 @@
+import numpy as np
+from PIL import Image
+
+from min_snr.compose import compose_grid, load_rgb, tile_images
+
+
+def test_tile_images_is_pixel_exact():
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 256, size=(4, 4, 3), dtype=np.uint8)
+    b = rng.integers(0, 256, size=(4, 4, 3), dtype=np.uint8)
+
+    canvas = tile_images([a, b], scale=3, pad=2)
+
+    assert canvas.shape == (2 + 12 + 2, 2 + 2 * (12 + 2), 3)
+    assert (canvas[2:14, 2:14] == a.repeat(3, 0).repeat(3, 1)).all()
+    assert (canvas[2:14, 16:28] == b.repeat(3, 0).repeat(3, 1)).all()
+
+
+def test_compose_grid_roundtrip_with_titles(tmp_path):
+    img = np.zeros((8, 8, 3), dtype=np.uint8)
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"s{i}.png"
+        Image.fromarray(img).save(p)
+        paths.append(p)
+
+    out = compose_grid(paths, ["a", "b", "c"], tmp_path / "out" / "grid.png", cols=3, scale=2)
+    canvas = load_rgb(out)
+
+    assert canvas.shape[1] == 8 + 3 * (16 + 8)
+    assert canvas.shape[0] > 8 + 16 + 8  # title band on top of the tiles
+    assert (canvas[-8 - 16:-8, 8:24] == 0).all()
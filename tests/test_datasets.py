@@ -0,0 +1,30 @@
+import numpy as np
+import torch
+
+from min_snr.datasets import MemmapLoader, build_cifar10_cache, load_cifar10_batch
+
+
+def test_cache_and_loader_are_deterministic(cifar_root, tmp_path):
+    cache = build_cifar10_cache(cifar_root, tmp_path / "train_u8.npy")
+    images = np.load(cache, mmap_mode="r")
+    first = load_cifar10_batch(cifar_root / "data_batch_1")
+    assert images.shape == (500, 3, 32, 32)
+    assert (images[73] == first[73].transpose(2, 0, 1)).all()
+
+    loader = MemmapLoader(cache, batch_size=4, seed=1077)
+    stream = loader.batches()
+    batches = [next(stream) for _ in range(300)]  # crosses into epoch 2
+    x, y = batches[5]
+    assert x.shape == (4, 3, 32, 32) and x.dtype == torch.float32
+    assert x.min() >= -1.0 and x.max() <= 1.0
+
+    # Every image of epoch 0 is seen once, flipped or not.
+    order, flips = loader.epoch_order(0)
+    assert np.array_equal(np.sort(order), np.arange(500))
+    ref = torch.from_numpy(images[order[20:24]].astype(np.float32)) * (2 / 255) - 1
+    for a, r, f in zip(x, ref, flips[20:24]):
+        assert torch.allclose(a, r.flip(-1) if f else r)
+
+    # Resuming at a step reproduces the same batch.
+    again = MemmapLoader(cache, batch_size=4, seed=1077).batches(start_step=253)
+    assert torch.equal(next(again)[0], batches[253][0])
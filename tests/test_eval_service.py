@@ -0,0 +1,158 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import torch
+
+from min_snr.ckpt import load_state, read_header
+from min_snr.eval_service import (
+    STOP_FILE,
+    Evaluator,
+    SnapshotQueue,
+    pending_snapshots,
+    snapshot_step,
+)
+from min_snr.logs import iter_records
+
+
+def _state(v: float):
+    return {"w": torch.full((4,), v), "b": torch.zeros(2)}
+
+
+def _steps(queue_dir):
+    return [snapshot_step(p) for p in pending_snapshots(queue_dir)]
+
+
+def test_submit_copies_the_weights(tmp_path):
+    q = SnapshotQueue(tmp_path / "q")
+    state = _state(1.0)
+    q.submit(100, state)
+    state["w"].fill_(2.0)  # training keeps mutating the live weights
+    q.close()
+    path = tmp_path / "q" / "step_000000100.ckpt"
+    assert read_header(path)["meta"] == {"step": 100}
+    assert torch.equal(load_state(path, "ema")["w"], torch.ones(4))
+    assert (tmp_path / "q" / STOP_FILE).exists()
+
+
+def test_skip_policy_drops_new_snapshots_while_backlogged(tmp_path):
+    q = SnapshotQueue(tmp_path / "q", policy="skip", max_pending=2)
+    assert q.submit(1, _state(1))
+    q.flush()
+    assert q.submit(2, _state(2))
+    q.flush()
+    assert not q.submit(3, _state(3))
+    q.close()
+    assert _steps(tmp_path / "q") == [1, 2]
+    assert q.dropped == 1
+
+
+def test_latest_policy_keeps_the_newest(tmp_path):
+    q = SnapshotQueue(tmp_path / "q", policy="latest")
+    for step in (1, 2, 3):
+        assert q.submit(step, _state(step))
+        q.flush()
+    q.close()
+    assert _steps(tmp_path / "q") == [3]
+
+
+def test_evaluator_policies(tmp_path):
+    q = SnapshotQueue(tmp_path / "q", policy="skip", max_pending=5)
+    for step in (10, 20, 30):
+        q.submit(step, _state(step))
+        q.flush()
+
+    seen = []
+    fifo = Evaluator(tmp_path / "q", lambda p, s: seen.append(s) or {"x": float(s)}, tmp_path / "a.jsonl",
+                     policy="skip")
+    assert fifo.run_once() == 10
+    latest = Evaluator(tmp_path / "q", lambda p, s: {"x": float(s)}, tmp_path / "b.jsonl", policy="latest")
+    assert latest.run_once() == 30
+    assert latest.skipped == [20]
+    assert pending_snapshots(tmp_path / "q") == []
+    assert [r["_i"] for r in iter_records(tmp_path / "a.jsonl")] == [10]
+
+
+def test_training_never_waits_for_a_slow_evaluator(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(path, step):
+        started.set()
+        release.wait(5)
+        return {"val/fid": float(step)}
+
+    ev = Evaluator(tmp_path / "q", slow, tmp_path / "loss.jsonl", poll_s=0.01)
+    q = SnapshotQueue(tmp_path / "q", policy="latest")
+    worker = threading.Thread(target=ev.run)
+    worker.start()
+
+    q.submit(2000, _state(0))
+    assert started.wait(5)
+    for step in (4000, 6000, 8000):  # evaluator is stuck on 2000
+        q.submit(step, _state(step))
+    q.close()
+    release.set()
+    worker.join(10)
+
+    assert not worker.is_alive()
+    steps = [r["_i"] for r in iter_records(tmp_path / "loss.jsonl")]
+    assert steps[0] == 2000 and steps[-1] == 8000
+    assert all(r["out"]["val/fid"] == r["_i"] for r in iter_records(tmp_path / "loss.jsonl"))
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        Evaluator(".", lambda p, s: {}, "x.jsonl", policy="fifo")
+
+
+def test_stale_claims_are_requeued_on_startup(tmp_path):
+    q = SnapshotQueue(tmp_path / "q", policy="skip", max_pending=5)
+    for step in (10, 20):
+        q.submit(step, _state(step))
+        q.flush()
+    q.close()
+
+    def crash(path, step):
+        raise RuntimeError("OOM")
+
+    with pytest.raises(RuntimeError):
+        Evaluator(tmp_path / "q", crash, tmp_path / "loss.jsonl", policy="skip").run_once()
+    claimed = next((tmp_path / "q").glob("*.claimed"))
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True, check=True).stdout.strip()
+    claimed.rename(claimed.with_name(claimed.name.replace(f".{os.getpid()}.", f".{dead}.")))
+    assert _steps(tmp_path / "q") == [20]
+
+    ev = Evaluator(tmp_path / "q", lambda p, s: {"x": float(s)}, tmp_path / "loss.jsonl", policy="skip")
+    live = tmp_path / "q" / "step_000000030.ckpt.otherhost.1.claimed"
+    live.write_bytes(b"")
+    assert ev.run() == [10, 20] and ev.recovered == [10]
+    assert live.exists()  # another host's claim is not ours to judge
+    assert [r["_i"] for r in iter_records(tmp_path / "loss.jsonl")] == [10, 20]
+
+
+def test_submit_never_touches_the_queue_directory(tmp_path, monkeypatch):
+    from min_snr import eval_service
+
+    callers = []
+    real = eval_service.pending_snapshots
+    monkeypatch.setattr(eval_service, "pending_snapshots",
+                        lambda d: callers.append(threading.current_thread().name) or real(d))
+    q = SnapshotQueue(tmp_path / "q", policy="skip", max_pending=1, poll_s=0.01)
+    callers.clear()
+    assert q.submit(1, _state(1))
+    q.flush()
+    assert not q.submit(2, _state(2))
+    assert set(callers) == {"snapshot-writer"}
+
+    (tmp_path / "q" / "step_000000001.ckpt").unlink()  # consumed by the evaluator
+    deadline = time.monotonic() + 5
+    while not q.submit(3, _state(3)):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    q.close()
+    assert _steps(tmp_path / "q") == [3]
+    assert set(callers) == {"snapshot-writer"}
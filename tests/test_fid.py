@@ -0,0 +1,42 @@
+import numpy as np
+
+from min_snr.fid import fid_extrapolate, fid_from_stats, fit_inverse_n, gaussian_stats, ref_stats
+
+
+def _fid_reference(mu1, s1, mu2, s2):
+    # tr sqrt(s1 s2) from the eigenvalues of the (non-symmetric) product.
+    ev = np.linalg.eigvals(s1 @ s2)
+    return ((mu1 - mu2) ** 2).sum() + np.trace(s1) + np.trace(s2) - 2 * np.sqrt(ev.real.clip(0)).sum()
+
+
+def test_fid_from_stats_matches_eigvals_formula():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(500, 12))
+    b = rng.normal(0.2, 1.3, size=(400, 12)) @ rng.normal(size=(12, 12))
+    mu1, s1 = gaussian_stats(a)
+    mu2, s2 = gaussian_stats(b, block=64)
+
+    assert np.allclose(mu2, b.mean(0)) and np.allclose(s2, np.cov(b, rowvar=False))
+    assert np.isclose(fid_from_stats(mu1, s1, ref_stats(mu2, s2)), _fid_reference(mu1, s1, mu2, s2))
+
+
+def test_fit_inverse_n_recovers_line():
+    n = np.array([500, 500, 1000, 2000])
+    a, se, b = fit_inverse_n(n, 3.0 + 2000.0 / n)
+    assert np.isclose(a, 3.0) and np.isclose(b, 2000.0) and se < 1e-9
+
+
+def test_extrapolation_removes_finite_sample_bias():
+    rng = np.random.default_rng(1)
+    d = 32
+    mix = rng.normal(size=(d, d)) / np.sqrt(d)
+    ref = ref_stats(np.zeros(d), mix @ mix.T)
+    feats = (rng.normal(size=(8000, d)) @ mix.T + 5.0).astype(np.float32)  # same cov, true FID = 25 d
+
+    res = fid_extrapolate(feats, ref)
+
+    assert list(res.sizes) == [1000] * 8 + [2000] * 4 + [4000] * 2 + [8000]
+    true_fid = 25.0 * d
+    assert res.slope > 0
+    assert abs(res.fid_inf - true_fid) < abs(res.fid_n - true_fid)
+    assert abs(res.fid_inf - true_fid) < 3 * res.fid_inf_se + 0.05
@@ -0,0 +1,92 @@
+import math
+
+import pytest
+import torch
+
+from min_snr.grad_stats import (
+    ABS_MAX,
+    ABS_MEAN,
+    GLOBAL_L2,
+    GROUP_PREFIX,
+    GradStats,
+    group_keys,
+    group_name,
+    reference_grad_stats,
+)
+
+
+class Net(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.inp = torch.nn.Conv2d(3, 8, 3)
+        self.down = torch.nn.ModuleList([torch.nn.Conv2d(8, 8, 3), torch.nn.GroupNorm(2, 8)])
+        self.head = torch.nn.Linear(8, 2)
+        self.frozen = torch.nn.Linear(2, 2)
+        self.frozen.requires_grad_(False)
+
+    def forward(self, x):
+        h = self.down[1](self.down[0](self.inp(x)))
+        return self.head(h.mean((2, 3)))
+
+
+def _backward(net, seed=0):
+    torch.manual_seed(seed)
+    net.zero_grad()
+    net(torch.randn(4, 3, 9, 9)).pow(2).sum().backward()
+
+
+def test_matches_per_tensor_reference():
+    torch.manual_seed(0)
+    net = Net()
+    _backward(net)
+    out = GradStats(net, depth=None)()
+    ref = reference_grad_stats(net)
+    assert out.keys() == ref.keys()
+    for k in ref:
+        assert out[k] == pytest.approx(ref[k], rel=1e-5)
+
+
+def test_group_norms_add_up_to_the_global_norm():
+    torch.manual_seed(0)
+    net = Net()
+    stats = GradStats(net, depth=2)
+    assert stats.groups == ["inp", "down.0", "down.1", "head"]
+    _backward(net)
+    out = stats()
+    groups = group_keys(out)
+    assert groups == [GROUP_PREFIX + g for g in ("down.0", "down.1", "head", "inp")]
+    assert math.sqrt(sum(out[k] ** 2 for k in groups)) == pytest.approx(out[GLOBAL_L2], rel=1e-5)
+    want = torch.cat([p.grad.reshape(-1) for p in net.down[0].parameters()]).norm().item()
+    assert out[GROUP_PREFIX + "down.0"] == pytest.approx(want, rel=1e-5)
+
+    # Parameters without a grad (unused this step) are skipped, not zero-filled.
+    net.head.weight.grad = None
+    ref = reference_grad_stats(net)
+    assert stats()[GLOBAL_L2] == pytest.approx(ref[GLOBAL_L2], rel=1e-5)
+
+
+def test_low_precision_grads_accumulate_in_float32():
+    p = torch.nn.Parameter(torch.zeros(4096, dtype=torch.bfloat16))
+    p.grad = torch.full((4096,), -3.0, dtype=torch.bfloat16)
+    out = GradStats([("w", p)])()
+    assert out[GLOBAL_L2] == pytest.approx(3.0 * 64)
+    assert out[ABS_MEAN] == pytest.approx(3.0) and out[ABS_MAX] == 3.0
+
+
+def test_one_host_sync(monkeypatch):
+    torch.manual_seed(0)
+    net = Net()
+    _backward(net)
+    calls = []
+    real = torch.Tensor.tolist
+    monkeypatch.setattr(torch.Tensor, "item", lambda self: calls.append("item"))
+    monkeypatch.setattr(torch.Tensor, "tolist", lambda self: calls.append("tolist") or real(self))
+    GradStats(net)()
+    assert calls == ["tolist"]
+    assert GradStats(torch.nn.Linear(2, 2))() == {}
+
+
+def test_group_name():
+    assert group_name("down.1.res.0.conv1.weight", 2) == "down.1"
+    assert group_name("head.bias", 2) == "head"
+    assert group_name("pos_emb", 2) == "pos_emb"
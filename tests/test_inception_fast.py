@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+
+from min_snr.inception_fast import (
+    FastModeRefused,
+    as_extractor,
+    calibration_images,
+    guarded_extractor,
+    load_model,
+)
+
+FACTORY = "tests.test_inception_fast:small_net"
+
+
+def small_net():
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Conv2d(3, 16, 3, padding=1),
+        nn.BatchNorm2d(16),
+        nn.ReLU(),
+        nn.Conv2d(16, 32, 3, stride=2, padding=1),
+        nn.ReLU(),
+        nn.AdaptiveAvgPool2d(1),
+        nn.Flatten(),
+    )
+
+
+def other_net():
+    torch.manual_seed(1)
+    return nn.Sequential(nn.Conv2d(3, 32, 5, padding=2), nn.ReLU(), nn.AdaptiveAvgPool2d(1), nn.Flatten())
+
+
+@pytest.fixture
+def reference():
+    """Stands in for the harness' Inception (the network behind the stats)."""
+    return as_extractor(load_model(FACTORY), "fp32")
+
+
+def test_fast_mode_matches_fp32(reference):
+    images = calibration_images(n=120)
+    fast, report = guarded_extractor("fast", images, tol=1e-3, factory=FACTORY, reference=reference)
+
+    assert np.allclose(fast(images[:10]), reference(images[:10]), atol=1e-5)
+    assert report.ok and report.n_images == 120
+    assert guarded_extractor("fp32", reference=reference) == (reference, None)
+
+
+def test_int8_is_calibrated_and_refused_past_tolerance(reference):
+    images = calibration_images(n=120)
+    _, report = guarded_extractor("int8", images, tol=1.0, factory=FACTORY, reference=reference)
+    assert 0.0 < report.max_rel_err < 0.2
+
+    with pytest.raises(FastModeRefused):
+        guarded_extractor("int8", images, tol=0.0, factory=FACTORY, reference=reference)
+
+
+def test_a_different_network_than_the_reference_is_refused(reference):
+    images = calibration_images(n=120)
+    with pytest.raises(FastModeRefused):
+        guarded_extractor("fast", images, tol=0.1, factory="tests.test_inception_fast:other_net",
+                          reference=reference)
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="needs a GPU")
+def test_cuda_batches_are_moved_to_cpu(reference):
+    images = calibration_images(n=8)
+    fast, _ = guarded_extractor("fast", images, tol=1e-3, factory=FACTORY, reference=reference)
+    assert np.allclose(fast(images.cuda(), "cuda"), reference(images), atol=1e-5)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from min_snr.kid import kid, poly_kernel, should_run_fid
+
+
+def _naive_mmd(x, y):
+    m = x.shape[0]
+    kxx, kyy, kxy = poly_kernel(x, x), poly_kernel(y, y), poly_kernel(x, y)
+    off = lambda k: (k.sum() - np.trace(k)) / (m * (m - 1))  # noqa: E731
+    return off(kxx) + off(kyy) - 2.0 * kxy.mean()
+
+
+def test_kid_matches_naive_per_subset():
+    rng = np.random.default_rng(0)
+    gen = rng.normal(size=(300, 16)).astype(np.float32)
+    ref = rng.normal(0.3, 1.0, size=(400, 16)).astype(np.float32)
+
+    res = kid(gen, ref, subset_size=100, repeats=4, rng_seed=7, block=37)
+
+    sub = np.random.default_rng(7)
+    gi = [sub.choice(300, 100, replace=False) for _ in range(4)]
+    ri = [sub.choice(400, 100, replace=False) for _ in range(4)]
+    expected = [_naive_mmd(gen[g].astype(float), ref[r].astype(float)) for g, r in zip(gi, ri)]
+    assert np.allclose(res.values, expected)
+    assert np.isclose(res.std, np.std(expected))
+
+
+def test_kid_near_zero_for_same_distribution():
+    rng = np.random.default_rng(1)
+    a = rng.normal(size=(1024, 32))
+    b = rng.normal(size=(1024, 32))
+    c = rng.normal(0.5, 1.0, size=(1024, 32))
+
+    assert abs(kid(a, b).mean) < 0.1 * kid(a, c).mean
+
+
+def test_should_run_fid_gate():
+    assert should_run_fid([], 0.0)
+    assert should_run_fid([0.05], 0.0)
+    assert should_run_fid([0.05, 0.04], 10.0)
+    assert not should_run_fid([0.05, 0.049], 10.0)
+    assert should_run_fid([0.05, 0.06], None)
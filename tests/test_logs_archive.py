@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from min_snr.archive import archive
+from min_snr.logs import iter_records, load_metric_series
+
+
+def _write_run(run_dir, n=50):
+    run_dir.mkdir(parents=True)
+    with (run_dir / "loss.jsonl").open("w") as f:
+        for i in range(n):
+            out = {"train/loss": 1.0 / (i + 1)}
+            if i % 10 == 0:
+                out["val/fid"] = 300.0 - i
+            f.write(json.dumps({"_i": i * 100, "out": out}) + "\n")
+    with (run_dir / "results.jsonl").open("w") as f:
+        f.write(json.dumps({"_i": 0, "out": {"val/fid": 42.0}}) + "\n")
+
+
+@pytest.mark.parametrize("codec", ["gz", "zst"])
+def test_archive_roundtrip(tmp_path, codec):
+    if codec == "zst":
+        pytest.importorskip("zstandard")
+
+    run_dir = tmp_path / "run"
+    _write_run(run_dir)
+    before = load_metric_series(run_dir / "loss.jsonl")
+
+    done = archive(tmp_path, codec=codec)
+
+    assert len(done) == 2
+    assert not (run_dir / "loss.jsonl").exists()
+    assert (run_dir / f"loss.jsonl.{codec}").exists()
+
+    # Old paths still resolve to the compressed files.
+    after = load_metric_series(run_dir / "loss.jsonl")
+    assert before.keys() == after.keys()
+    for k in before:
+        assert (before[k][0] == after[k][0]).all()
+        assert (before[k][1] == after[k][1]).all()
+    assert list(iter_records(run_dir / "results.jsonl"))[0]["out"]["val/fid"] == 42.0
+
+
+def test_archive_skips_unfinished_runs(tmp_path):
+    run_dir = tmp_path / "run"
+    _write_run(run_dir)
+    (run_dir / "results.jsonl").unlink()
+
+    assert archive(tmp_path, codec="gz") == []
+    assert (run_dir / "loss.jsonl").exists()
@@ -0,0 +1,63 @@
+import numpy as np
+
+from min_snr.prdc import IVF, knn_radii, prdc, sqdist
+
+
+def _naive(real, fake, k):
+    def radii(x):
+        d = sqdist(x, x)
+        return np.sort(d, axis=1)[:, k]
+
+    rr, fr = radii(real), radii(fake)
+    d = sqdist(fake, real)  # (fake, real)
+    return (
+        (d <= rr[None]).any(1).mean(),
+        (d <= fr[:, None]).any(0).mean(),
+        (d <= rr[None]).sum() / (k * fake.shape[0]),
+        (d.min(0) <= rr).mean(),
+    )
+
+
+def test_prdc_matches_naive():
+    rng = np.random.default_rng(0)
+    real = rng.normal(size=(700, 8)).astype(np.float32)
+    fake = rng.normal(0.4, 0.8, size=(500, 8)).astype(np.float32)
+
+    res = prdc(real, fake, k=5, approx=False, block=64)
+
+    assert np.allclose(tuple(res), _naive(real, fake, 5))
+
+
+def test_knn_radii_blocked_equals_full():
+    x = np.random.default_rng(1).normal(size=(300, 4)).astype(np.float32)
+    assert np.allclose(knn_radii(x, 3, block=17), np.sort(sqdist(x, x), axis=1)[:, 3])
+
+
+def test_ivf_close_to_exact_on_clustered_data():
+    rng = np.random.default_rng(2)
+    centers = rng.normal(scale=10.0, size=(20, 16))
+    real = (centers[rng.integers(0, 20, 4000)] + rng.normal(size=(4000, 16))).astype(np.float32)
+    fake = (centers[rng.integers(0, 15, 3000)] + rng.normal(size=(3000, 16))).astype(np.float32)
+
+    exact = prdc(real, fake, approx=False)
+    approx = prdc(real, fake, approx=True, n_cells=40, n_probe=6)
+
+    assert np.allclose(tuple(approx), tuple(exact), atol=0.02)
+    assert exact.coverage < 0.9  # fakes miss 5 of the 20 modes
+
+
+def test_ivf_radii_fall_back_to_exact_for_tiny_cells():
+    rng = np.random.default_rng(3)
+    # A big cluster and a far-away one of 3 points: with one cell per ~2 rows
+    # and a single probe, most rows see fewer than k + 1 candidates.
+    x = np.concatenate([rng.normal(size=(200, 4)), rng.normal(50.0, 1.0, size=(3, 4))]).astype(np.float32)
+    ivf = IVF(x, n_cells=100)
+    assert np.diff(ivf.offsets).min() < 6
+
+    r2 = knn_radii(x, 5, ivf, n_probe=1)
+    assert np.isfinite(r2).all()
+    assert np.allclose(r2, knn_radii(x, 5))
+
+    fake = rng.normal(size=(100, 4)).astype(np.float32)
+    approx = prdc(x, fake, k=5, approx=True, n_cells=100, n_probe=1)
+    assert approx.precision <= prdc(x, fake, k=5, approx=False).precision
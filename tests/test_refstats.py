@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from min_snr.datasets import open_source
+from min_snr.refstats import build_refstats, gaussian_state, merge_states
+
+EXTRACTOR = "tests.test_refstats:pixel_features"
+
+
+def pixel_features(x01, device):
+    """Cheap stand-in for Inception: per-channel means and stds."""
+    x = x01.flatten(2)
+    return np.concatenate([x.mean(-1).numpy(), x.std(-1).numpy()], axis=1)
+
+
+def test_merge_states_matches_direct():
+    x = np.random.default_rng(0).normal(size=(1000, 6))
+    state = None
+    for part in np.array_split(x, 7):
+        state = merge_states(state, gaussian_state(part))
+    assert np.allclose(state.mean, x.mean(0))
+    assert np.allclose(state.cov, np.cov(x, rowvar=False))
+
+
+def test_cifar_source_reads_across_batches(cifar_root):
+    src = open_source(cifar_root)
+    assert len(src) == 500
+    assert src.read(98, 103).shape == (5, 32, 32, 3)
+
+
+def test_build_is_parallel_exact_and_resumable(tmp_path):
+    images = np.random.default_rng(1).integers(0, 256, size=(700, 8, 8, 3), dtype=np.uint8)
+    np.save(tmp_path / "imgs.npy", images)
+    x = images.reshape(700, 64, 3).astype(np.float64) / 255.0
+    feats = np.concatenate([x.mean(1), x.std(1, ddof=1)], axis=1)
+
+    out = build_refstats(tmp_path / "imgs.npy", tmp_path / "ref.npz", extractor=EXTRACTOR,
+                         workers=2, chunk_size=128, batch_size=50)
+
+    with np.load(out) as s:
+        assert int(s["n"]) == 700
+        assert np.allclose(s["mu"], feats.mean(0), atol=1e-6)
+        assert np.allclose(s["sigma"], np.cov(feats, rowvar=False), atol=1e-6)
+        w, v = s["eigvals"], s["eigvecs"]
+        assert np.allclose((v * w) @ v.T, s["sigma"])
+        fingerprint = str(s["fingerprint"])
+    assert not (tmp_path / "ref.npz.parts").exists()
+
+    # Interrupted build: keep the parts, drop one, and resume in-process.
+    out2 = tmp_path / "again.npz"
+    build_refstats(tmp_path / "imgs.npy", out2, extractor=EXTRACTOR, chunk_size=128, keep_parts=True)
+    (tmp_path / "again.npz.parts" / "part_00002.npz").unlink()
+    out2.unlink()
+    build_refstats(tmp_path / "imgs.npy", out2, extractor=EXTRACTOR, chunk_size=128)
+    with np.load(out2) as s:
+        assert str(s["fingerprint"]) == fingerprint
+
+    with pytest.raises(ValueError):
+        (tmp_path / "again.npz.parts").mkdir()
+        (tmp_path / "again.npz.parts" / "job.json").write_text("{}")
+        build_refstats(tmp_path / "imgs.npy", out2, extractor=EXTRACTOR, chunk_size=128)
+
+
+def test_in_process_build_restores_the_thread_count(tmp_path, monkeypatch):
+    torch = pytest.importorskip("torch")
+    np.save(tmp_path / "imgs.npy", np.zeros((20, 4, 4, 3), dtype=np.uint8))
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    threads = torch.get_num_threads()
+    build_refstats(tmp_path / "imgs.npy", tmp_path / "ref.npz", extractor=EXTRACTOR, chunk_size=8)
+    assert torch.get_num_threads() == threads
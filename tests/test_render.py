@@ -0,0 +1,34 @@
+import numpy as np
+
+from min_snr.render import downsample, lttb_indices, minmax_indices
+
+
+def test_minmax_keeps_extremes_and_endpoints():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=10_000)
+    y[1234] = 50.0
+    y[8765] = -50.0
+
+    idx = minmax_indices(y, 100)
+
+    assert idx.size <= 2 * 100 + 2
+    assert {0, 1234, 8765, y.size - 1} <= set(idx.tolist())
+    assert (np.diff(idx) > 0).all()
+
+
+def test_lttb_size_and_spike():
+    x = np.arange(20_000, dtype=float)
+    y = np.sin(x / 500.0)
+    y[7000] = 10.0
+
+    idx = lttb_indices(x, y, 300)
+
+    assert idx[0] == 0 and idx[-1] == x.size - 1
+    assert idx.size <= 300
+    assert 7000 in idx
+
+
+def test_downsample_is_noop_for_short_series():
+    x = np.arange(50)
+    xs, ys = downsample(x, x * 2, target_px=100)
+    assert xs.size == 50 and (ys == x * 2).all()
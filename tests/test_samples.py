@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import torch
+
+from min_snr.samples import ALIGN, ShardWriter, open_shard, to_uint8, write_shard
+
+
+def test_shard_roundtrip_streaming(tmp_path):
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-1.0, 1.0, size=(10, 3, 4, 5)).astype(np.float32)
+    path = tmp_path / "s.samples"
+
+    with ShardWriter(path, meta={"sampler": "ddpm", "nfe": 50, "seed_start": 100}, capacity=64) as w:
+        w.append(torch.from_numpy(x[:6]))
+        w.append(x[6:])
+
+    shard = open_shard(path)
+    assert isinstance(shard.images, np.memmap)
+    assert shard.images.shape == (10, 4, 5, 3)
+    assert path.stat().st_size == ALIGN + 10 * 4 * 5 * 3
+    assert shard.meta["seed_stop"] == 110 and shard.meta["nfe"] == 50
+    assert (shard.images[:] == to_uint8(x)).all()
+
+    batches = list(shard.iter_batches(4))
+    assert [b.shape[0] for b in batches] == [4, 4, 2]
+    assert batches[0].shape == (4, 3, 4, 5)
+    assert torch.allclose(batches[0], torch.from_numpy((x[:4] + 1) / 2), atol=1 / 255)
+
+
+def test_failed_write_leaves_no_shard(tmp_path):
+    path = tmp_path / "s.samples"
+    with pytest.raises(RuntimeError):
+        with ShardWriter(path) as w:
+            w.append(np.zeros((2, 4, 4, 3), dtype=np.uint8))
+            raise RuntimeError("sampler died")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_grid_tiles_first_samples(tmp_path):
+    imgs = np.arange(5, dtype=np.uint8)[:, None, None, None] * np.ones((5, 2, 2, 3), np.uint8)
+    shard = open_shard(write_shard(tmp_path / "g.samples", imgs))
+
+    grid = shard.grid(4, pad=1)
+
+    assert grid.shape == (1 + 2 * 3, 1 + 2 * 3, 3)
+    assert grid[1, 1, 0] == 0 and grid[1, 4, 0] == 1 and grid[4, 4, 0] == 3
+
+
+def test_shard_features_resizes_for_inception(tmp_path, monkeypatch):
+    from min_snr import features
+
+    seen = []
+
+    def inception(x01, device):
+        seen.append(tuple(x01.shape[-2:]))
+        return x01.mean((2, 3)).numpy()
+
+    monkeypatch.setattr(features, "_import_inception", lambda: inception)
+    path = tmp_path / "s.samples"
+    with ShardWriter(path, meta={}, capacity=4) as w:
+        w.append(np.zeros((4, 3, 8, 8), np.float32))
+    feats = features.shard_features(path, batch_size=2, device="cpu")
+    assert feats.shape == (4, 3) and np.allclose(feats, 0.5, atol=1 / 255)
+    assert seen == [(features.INCEPTION_SIZE,) * 2] * 2
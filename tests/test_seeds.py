@@ -0,0 +1,72 @@
+import copy
+import json
+from pathlib import Path
+
+import numpy as np
+
+from min_snr.seeds import bootstrap_mean_ci, group_runs, seed_bands
+
+
+def _write_results(run_dir, seed, lr):
+    run_dir.mkdir(parents=True)
+    cfg = {"seed": seed, "optim": {"lr": lr}, "logging": {"wandb": {"run_name": f"r{seed}"}}}
+    (run_dir / "results.jsonl").write_text(json.dumps({"cfg": cfg, "out": {}, "_i": 0}) + "\n")
+    return run_dir / "loss.jsonl"
+
+
+def test_group_runs_ignores_seed(tmp_path):
+    paths = [
+        _write_results(tmp_path / "a0", 0, 1e-4),
+        _write_results(tmp_path / "b0", 0, 3e-4),
+        _write_results(tmp_path / "a1", 1, 1e-4),
+        tmp_path / "missing" / "loss.jsonl",
+    ]
+
+    groups = [members for _, members in group_runs(paths)]
+
+    assert groups == [[0, 2], [1], [3]]
+
+
+def test_seed_bands_common_grid_and_ci():
+    steps = np.arange(0, 1000, 10)
+    runs = [(steps, np.full(steps.size, float(k))) for k in range(5)]
+    runs.append((steps[5:], np.full(steps.size - 5, 2.0)))
+
+    bands = seed_bands(runs, n_boot=500)
+
+    assert bands.n_runs == 6
+    assert bands.steps[0] == 50 and bands.steps[-1] == 990
+    assert np.allclose(bands.mean, 2.0)
+    assert (bands.lo <= bands.mean).all() and (bands.mean <= bands.hi).all()
+
+
+def test_bootstrap_ci_narrows_with_more_runs():
+    rng = np.random.default_rng(0)
+    few = rng.normal(size=(3, 50))
+    many = rng.normal(size=(30, 50))
+
+    lo3, hi3 = bootstrap_mean_ci(few)
+    lo30, hi30 = bootstrap_mean_ci(many)
+
+    assert (hi30 - lo30).mean() < (hi3 - lo3).mean()
+
+
+def test_group_runs_on_a_real_config(tmp_path):
+    """Seed replicas of e7a: the harness' cfg also carries run_id with the seed in it."""
+    real = Path(__file__).resolve().parents[1] / "docs/assets/e7/e7a_data/results.jsonl"
+    rec = json.loads(real.read_text().splitlines()[0])
+
+    paths = []
+    for name, seed, lr in (("s1077", 1077, 1e-4), ("s2024", 2024, 1e-4), ("lr3e4", 1077, 3e-4)):
+        r = copy.deepcopy(rec)
+        cfg = r["cfg"]
+        cfg["seed"] = seed
+        cfg["optim"]["lr"] = lr
+        cfg["run_id"] = f"min_snr__unet_cifar32__cifar10__adam__lr{lr:.0e}__ema1__seed={seed}"
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "results.jsonl").write_text(json.dumps(r) + "\n")
+        paths.append(tmp_path / name / "loss.jsonl")
+
+    groups = [members for _, members in group_runs(paths)]
+
+    assert groups == [[0, 1], [2]]
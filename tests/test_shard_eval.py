@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from min_snr.shard_eval import SamplerSpec, sharded_fid
+
+
+class TinyUNet(torch.nn.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        torch.manual_seed(0)
+        self.conv = torch.nn.Conv2d(3, 3, 3, padding=1)
+
+    def forward(self, x, t):
+        return torch.tanh(self.conv(x))
+
+
+def tiny_unet():
+    return TinyUNet()
+
+
+def mean_features(x01, device):
+    return x01.flatten(2).mean(2).numpy()
+
+
+SPEC = SamplerSpec(
+    factory="tests.test_shard_eval:tiny_unet",
+    ckpt=None,
+    state_key=None,
+    sampler="ddpm",
+    nfe=4,
+    shape=(3, 8, 8),
+    batch_size=4,
+)
+
+
+@pytest.fixture
+def ref_stats(tmp_path):
+    rng = np.random.default_rng(0)
+    f = rng.uniform(0.3, 0.7, size=(200, 3))
+    path = tmp_path / "ref.npz"
+    np.savez(path, mu=f.mean(0), sigma=np.cov(f, rowvar=False))
+    return path
+
+
+def _run(tmp_path, ref_stats, name, **kw):
+    return sharded_fid(SPEC, 22, ref_stats, tmp_path / name, seed=5, part_size=6,
+                       extractor="tests.test_shard_eval:mean_features", **kw)
+
+
+def test_worker_count_does_not_change_the_result(tmp_path, ref_stats):
+    one = _run(tmp_path, ref_stats, "one.json")
+    two = _run(tmp_path, ref_stats, "two.json", workers=2)
+    assert one.n == two.n == 22
+    assert one.fingerprint == two.fingerprint
+    assert one.fid == pytest.approx(two.fid, rel=1e-9, abs=1e-12)
+    assert json.loads((tmp_path / "two.json").read_text())["fingerprint"] == two.fingerprint
+    assert not (tmp_path / "two.json.parts").exists()
+
+
+def test_resumes_from_finished_parts(tmp_path, ref_stats, capsys):
+    first = _run(tmp_path, ref_stats, "r.json", keep_parts=True)
+    parts = sorted((tmp_path / "r.json.parts").glob("part_*.npz"))
+    assert len(parts) == 4
+    parts[-1].unlink()
+    capsys.readouterr()
+
+    again = _run(tmp_path, ref_stats, "r.json")
+    assert "3 already done" in capsys.readouterr().out
+    assert again.fingerprint == first.fingerprint
+    assert again.fid == first.fid
+
+
+def test_in_process_run_leaves_threads_and_affinity_alone(tmp_path, ref_stats, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    threads = torch.get_num_threads()
+    cores = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    _run(tmp_path, ref_stats, "one.json", workers=1)
+    assert torch.get_num_threads() == threads
+    assert cores is None or os.sched_getaffinity(0) == cores
@@ -0,0 +1,150 @@
+import atexit
+import shutil
+import time
+
+import pytest
+
+from min_snr import staging
+from min_snr.cli import main
+from min_snr.logs import append_record
+from min_snr.staging import MANIFEST, StagedDir, default_local_dir
+
+
+@pytest.fixture
+def slow_mount(monkeypatch):
+    """Every write to the destination takes 50 ms, like a FUSE mount."""
+    real = staging._write_chunk
+
+    def slow(f, buf):
+        time.sleep(0.05)
+        real(f, buf)
+
+    monkeypatch.setattr(staging, "_write_chunk", slow)
+
+
+def _tree(root):
+    return {
+        p.relative_to(root).as_posix(): p.read_bytes()
+        for p in sorted(root.rglob("*"))
+        if p.is_file() and p.name != MANIFEST
+    }
+
+
+def test_training_writes_do_not_wait_for_the_mount(tmp_path, slow_mount):
+    stage = StagedDir(tmp_path / "drive/e7b", tmp_path / "local", interval_s=0.01)
+    log = stage.path / "loss.jsonl"
+    (stage.path / "ckpts").mkdir()
+    (stage.path / "ckpts/last.ckpt").write_bytes(b"x" * (3 << 20))  # 3 chunks: >= 150 ms to mirror
+
+    t0 = time.perf_counter()
+    for step in range(200):
+        append_record(log, step, {"loss": 1.0 / (step + 1)})
+    assert time.perf_counter() - t0 < 0.15
+
+    assert stage.close() == {}
+    assert _tree(tmp_path / "drive/e7b") == _tree(stage.path)
+    assert (tmp_path / "drive/e7b" / MANIFEST).exists()
+
+
+def test_growing_files_get_only_their_tail(tmp_path):
+    stage = StagedDir(tmp_path / "dest", tmp_path / "local", start=False)
+    log = stage.path / "loss.jsonl"
+    for step in range(50):
+        append_record(log, step, {"loss": 0.5})
+    first = stage.sync_once()
+    assert (first.copied, first.appended) == (1, 0)
+
+    size = log.stat().st_size
+    for step in range(50, 60):
+        append_record(log, step, {"loss": 0.4})
+    second = stage.sync_once()
+    assert (second.copied, second.appended) == (0, 1)
+    assert second.nbytes == log.stat().st_size - size
+    assert stage.sync_once().nbytes == 0
+
+    log.write_text("rewritten\n")  # not a pure append any more
+    assert stage.sync_once().copied == 1
+    assert (tmp_path / "dest/loss.jsonl").read_text() == "rewritten\n"
+    assert stage.close() == {}
+
+
+def test_files_in_flux_and_deletions(tmp_path, monkeypatch):
+    stage = StagedDir(tmp_path / "dest", tmp_path / "local", start=False)
+    (stage.path / "a.bin").write_bytes(b"a" * 100)
+    (stage.path / "last.ckpt.tmp").write_bytes(b"partial")
+    real = staging._write_chunk
+    calls = []
+
+    def grow_during_copy(f, buf):
+        if not calls:
+            with open(stage.path / "a.bin", "ab") as g:
+                g.write(b"more")
+        calls.append(1)
+        real(f, buf)
+
+    monkeypatch.setattr(staging, "_write_chunk", grow_during_copy)
+    assert stage.sync_once().pending == 1
+    assert not (tmp_path / "dest/a.bin").exists()
+    monkeypatch.setattr(staging, "_write_chunk", real)
+    assert stage.sync_once().copied == 1
+    assert (tmp_path / "dest/a.bin").read_bytes() == b"a" * 100 + b"more"
+    assert not list((tmp_path / "dest").glob("*.tmp"))
+
+    (stage.path / "a.bin").unlink()
+    assert stage.sync_once().deleted == 1
+    assert not (tmp_path / "dest/a.bin").exists()
+    stage.close()
+
+
+def test_close_repairs_a_corrupted_destination(tmp_path):
+    stage = StagedDir(tmp_path / "dest", tmp_path / "local", start=False)
+    (stage.path / "w.bin").write_bytes(bytes(range(256)) * 10)
+    stage.sync_once()
+    (tmp_path / "dest/w.bin").write_bytes(b"garbage")
+    assert stage.check() == {"w.bin": "size"}
+    assert stage.close() == {}
+    assert (tmp_path / "dest/w.bin").read_bytes() == bytes(range(256)) * 10
+
+
+def test_rate_limit(tmp_path):
+    stage = StagedDir(tmp_path / "dest", tmp_path / "local", max_bytes_per_s=1 << 20, start=False)
+    (stage.path / "big.bin").write_bytes(b"z" * (3 << 19))  # 1.5 MiB at 1 MiB/s
+    t0 = time.perf_counter()
+    stage.sync_once()
+    assert time.perf_counter() - t0 > 0.3
+    stage.close()
+
+
+def test_crash_recovery_and_pull(tmp_path, monkeypatch, capsys):
+    dest, local = tmp_path / "dest", tmp_path / "local"
+    stage = StagedDir(dest, local, start=False)
+    append_record(stage.path / "loss.jsonl", 0, {"loss": 1.0})
+    stage.sync_once()
+    append_record(stage.path / "loss.jsonl", 1, {"loss": 0.9})
+    (stage.path / "last.ckpt").write_bytes(b"weights")
+    atexit.unregister(stage.close)  # the process dies here
+
+    # Same machine: the local directory and manifest survived.
+    main(["stage-sync", str(dest), "--local", str(local)])
+    assert "Recovering" in capsys.readouterr().out
+    assert _tree(dest) == _tree(local)
+
+    # Fresh machine: the local disk is gone, pull the run back from the destination.
+    shutil.rmtree(local)
+    stage = StagedDir(dest, local, start=False)
+    assert _tree(local) == _tree(dest)
+    assert stage.sync_once().nbytes == 0
+    append_record(stage.path / "loss.jsonl", 2, {"loss": 0.8})
+    assert stage.sync_once().appended == 1
+    assert stage.close() == {}
+
+    with pytest.raises(ValueError, match="is staging"):
+        StagedDir(tmp_path / "other", local, start=False)
+
+
+def test_default_local_dir_is_stable(tmp_path, monkeypatch):
+    monkeypatch.setenv(staging.STAGING_ENV, str(tmp_path / "fast"))
+    a = default_local_dir("/content/drive/MyDrive/min-snr/e7b")
+    assert a == default_local_dir("/content/drive/MyDrive/min-snr/e7b")
+    assert a != default_local_dir("/content/drive/MyDrive/other/e7b")
+    assert a.parent == tmp_path / "fast" and a.name.startswith("e7b-")
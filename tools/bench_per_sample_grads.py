@@ -0,0 +1,117 @@
+"""
+Cost of per-example gradient norms (min_snr.per_sample_grads) vs a plain step.
+
+Times, on one random batch:
+  - a plain training step (forward, backward, Adam step)
+  - PerSampleGradNorms for each --chunk-sizes value (vmap over grad)
+  - optionally (--loop) one backward pass per example, for reference
+and prints the amortized overhead at each --every cadence, i.e.
+per_sample_ms / (every * step_ms).
+
+Usage:
+    python tools/bench_per_sample_grads.py --model-factory my_models:unet_cifar32 \\
+      --batch 128 --chunk-sizes 8 16 32 --every 100 500 --device cuda --loop \\
+      --out docs/assets/e10/per_sample_grads_bench.jsonl
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import torch
+
+from min_snr.per_sample_grads import PerSampleGradNorms, loop_grad_norms, min_snr_weight, snr_table
+from min_snr.sampling import load_model
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Per-sample grad norm overhead vs a plain step")
+    p.add_argument("--model-factory", required=True, help="'module:callable' returning the model.")
+    p.add_argument("--ckpt", default=None, help="Optional weights (*.ckpt or torch.save).")
+    p.add_argument("--state-key", default=None, help="Section / sub-dict of --ckpt to load.")
+    p.add_argument("--batch", type=int, default=128)
+    p.add_argument("--image-size", type=int, default=32)
+    p.add_argument("--channels", type=int, default=3)
+    p.add_argument("--T", type=int, default=1000)
+    p.add_argument("--gamma", type=float, default=5.0, help="Min-SNR gamma for the loss weights.")
+    p.add_argument("--chunk-sizes", type=int, nargs="+", default=[8, 16, 32])
+    p.add_argument("--every", type=int, nargs="+", default=[100, 500], help="Cadences to amortize over.")
+    p.add_argument("--repeats", type=int, default=5)
+    p.add_argument("--loop", action="store_true", help="Also time one backward per example.")
+    p.add_argument("--device", default="cuda")
+    p.add_argument("--out", default="", help="JSONL to append the results to.")
+    return p.parse_args()
+
+
+def timed(fn, device, repeats):
+    """Median wall time of fn() in ms (after one warm-up call)."""
+    fn()
+    times = []
+    for _ in range(repeats):
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        t0 = time.perf_counter()
+        fn()
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        times.append((time.perf_counter() - t0) * 1e3)
+    return sorted(times)[len(times) // 2]
+
+
+def main() -> None:
+    args = parse_args()
+    device = torch.device(args.device)
+    model = load_model(args.model_factory, args.ckpt, args.state_key, device)
+    model.requires_grad_(True).train()  # load_model freezes for sampling
+    opt = torch.optim.Adam(model.parameters(), lr=1e-4)
+
+    g = torch.Generator().manual_seed(0)
+    shape = (args.batch, args.channels, args.image_size, args.image_size)
+    x = torch.randn(shape, generator=g).to(device)
+    eps = torch.randn(shape, generator=g).to(device)
+    t = torch.randint(0, args.T, (args.batch,), generator=g).to(device)
+    w = torch.as_tensor(min_snr_weight(snr_table("linear", args.T)[t.cpu().numpy()], args.gamma),
+                        dtype=torch.float32, device=device)
+
+    def plain_step():
+        opt.zero_grad(set_to_none=True)
+        (w * (model(x, t) - eps).pow(2).mean((1, 2, 3))).mean().backward()
+        opt.step()
+
+    n_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
+    rows = [{"what": "plain step", "ms": timed(plain_step, device, args.repeats)}]
+    for c in args.chunk_sizes:
+        psg = PerSampleGradNorms(model, T=args.T, chunk_size=c)
+        if device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(device)
+        ms = timed(lambda: psg.compute(x, t, eps, w), device, args.repeats)
+        row = {"what": f"vmap chunk={c}", "ms": ms}
+        if device.type == "cuda":
+            row["peak_mib"] = torch.cuda.max_memory_allocated(device) / 2**20
+        rows.append(row)
+    if args.loop:
+        rows.append({"what": "loop of backwards", "ms": timed(
+            lambda: loop_grad_norms(model, x, t, eps, w), device, max(1, args.repeats // 2)
+        )})
+
+    step_ms = rows[0]["ms"]
+    print(f"batch {args.batch}, {n_params:,} params, {device}")
+    print(f"{'':20s} {'ms':>9s} {'x step':>7s} " + " ".join(f"{'@' + str(e):>8s}" for e in args.every))
+    for r in rows:
+        r["overhead"] = {e: r["ms"] / (e * step_ms) for e in args.every}
+        cells = "" if r is rows[0] else " ".join(f"{r['overhead'][e]:8.2%}" for e in args.every)
+        print(f"{r['what']:20s} {r['ms']:9.2f} {r['ms'] / step_ms:7.2f} {cells}")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "a") as f:
+            for r in rows:
+                f.write(json.dumps({
+                    "factory": args.model_factory, "batch": args.batch, "device": str(device),
+                    "params": n_params, **r,
+                }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
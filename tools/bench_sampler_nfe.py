@@ -0,0 +1,117 @@
+"""
+FID versus NFE for each sampler, from one checkpoint.
+
+Every (sampler, nfe) cell samples the same `--n` images from the same seed,
+streams them through Inception (min_snr.pipeline) and scores them against the
+reference stats, so the curves differ only by the solver. The table printed
+at the end is what milestone settings (e.g. ``fid_milestone.sampler:
+dpm++2m, nfe: 12``) should be picked from.
+
+Usage:
+    python tools/bench_sampler_nfe.py \
+      --model-factory my_models:unet_cifar32 --ckpt runs/e8a/ckpt.pt --state-key ema \
+      --schedule linear --fid-stats stats/cifar10_inception_train.npz \
+      --samplers ddpm ddim dpm++2m --nfes 10 15 20 50 --n 5000 --device cuda \
+      --out docs/assets/e10/sampler_nfe.jsonl --plot docs/assets/e10/fid_vs_nfe.png
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from min_snr.features import get_extractor, input_size
+from min_snr.fid import fid_from_stats, gaussian_stats, load_ref_stats
+from min_snr.sampling import SAMPLERS, SamplerEngine, add_sampler_args, load_model, sample_features
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="FID vs NFE per sampler")
+    add_sampler_args(p)
+    p.add_argument("--fid-stats", required=True, help="Reference .npz with mu/sigma.")
+    p.add_argument("--samplers", nargs="+", choices=SAMPLERS, default=list(SAMPLERS))
+    p.add_argument("--nfes", type=int, nargs="+", default=[10, 15, 20, 50])
+    p.add_argument("--n", type=int, default=5000, help="Samples per cell.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument(
+        "--extractor",
+        default=None,
+        help="Feature extractor 'module:callable' (default: the harness' Inception).",
+    )
+    p.add_argument("--out", default="", help="JSONL to append one row per cell to.")
+    p.add_argument("--plot", default="", help="Optional FID-vs-NFE PNG.")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    model = load_model(args.model_factory, args.ckpt, args.state_key, args.device)
+    extractor = get_extractor(args.extractor)
+    ref = load_ref_stats(args.fid_stats)
+
+    rows = []
+    batch_size = args.sample_batch
+    for sampler in args.samplers:
+        for nfe in args.nfes:
+            engine = SamplerEngine(
+                model,
+                schedule=args.schedule,
+                sampler=sampler,
+                nfe=nfe,
+                T=args.T,
+                shape=(args.channels, args.image_size, args.image_size),
+                device=args.device,
+                batch_size=batch_size,
+                memory_budget=args.memory_budget_mb << 20,
+                eta=args.eta,
+            )
+            feats, stats = sample_features(
+                engine, args.n, extractor, args.seed, resize=input_size(args.extractor),
+            )
+            batch_size = engine.batch_size  # probe the memory budget once
+            row = {
+                "sampler": sampler,
+                "nfe": nfe,
+                "schedule": args.schedule,
+                "n": args.n,
+                "seed": args.seed,
+                "ckpt": args.ckpt,
+                "fid": fid_from_stats(*gaussian_stats(feats), ref),
+                "wall_s": stats.wall_s,
+                "samples_per_s": args.n / max(stats.wall_s, 1e-9),
+            }
+            rows.append(row)
+            print(f"[bench] {sampler:8s} nfe={nfe:4d}  FID={row['fid']:8.3f}  "
+                  f"{row['samples_per_s']:7.1f} samples/s")
+            if args.out:
+                out = Path(args.out)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                with out.open("a") as f:
+                    f.write(json.dumps(row) + "\n")
+
+    print("\nsampler   " + "".join(f"{n:>9d}" for n in args.nfes))
+    for sampler in args.samplers:
+        fids = [r["fid"] for r in rows if r["sampler"] == sampler]
+        print(f"{sampler:8s}  " + "".join(f"{v:9.2f}" for v in fids))
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        plt.figure()
+        for sampler in args.samplers:
+            sel = [r for r in rows if r["sampler"] == sampler]
+            plt.plot([r["nfe"] for r in sel], [r["fid"] for r in sel], marker="o", label=sampler)
+        plt.xscale("log")
+        plt.xlabel("NFE (model calls per sample)")
+        plt.ylabel("FID (lower is better)")
+        plt.title(f"FID vs NFE ({args.schedule}, n={args.n})")
+        plt.grid(True, alpha=0.3)
+        plt.legend()
+        plot_path = Path(args.plot)
+        plot_path.parent.mkdir(parents=True, exist_ok=True)
+        plt.tight_layout()
+        plt.savefig(plot_path)
+        print(f"Saved plot to {plot_path}")
+
+
+if __name__ == "__main__":
+    main()
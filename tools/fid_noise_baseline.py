@@ -10,16 +10,44 @@ python tools/fid_noise_baseline.py \
   --seeds 0 \
   --device cuda \
   --out /content/drive/MyDrive/min-snr-noise-vs-stats-baseline/fid_noise_baseline.jsonl 
+
+The same FID path scores a stored sample shard (see min_snr.samples) instead
+of noise, e.g. to re-check an old checkpoint without re-sampling:
+
+python tools/fid_noise_baseline.py \
+  --fid-stats stats/cifar10_inception_train.npz \
+  --samples runs/e8a/samples/step_50000.samples \
+  --device cuda
+
+On CPU boxes, --inception-mode fast|int8 swaps in min_snr's optimized
+Inception after a calibration check against fp32 (refused if the FID delta
+exceeds --fast-tol):
+
+python tools/fid_noise_baseline.py \
+  --fid-stats stats/cifar10_inception_train.npz \
+  --n-images 10000 --device cpu \
+  --inception-mode int8 --calib-source data/cifar-10-batches-py
 """
 
 import argparse
 import json
+import sys
 from pathlib import Path
 
 import numpy as np
 import torch
 
 from ablation_harness.eval.generative import _inception_activations, _fid_from_stats
+from min_snr.features import INCEPTION_SIZE
+from min_snr.fid import load_ref_stats
+from min_snr.inception_fast import (
+    FastModeRefused,
+    add_fast_args,
+    calibration_images,
+    guarded_extractor,
+)
+from min_snr.pipeline import extract_features
+from min_snr.samples import open_shard
 
 
 def parse_args() -> argparse.Namespace:
@@ -81,6 +109,13 @@ def parse_args() -> argparse.Namespace:
         choices=["uniform", "gaussian"],
         help="Distribution for noise in generator space [-1,1].",
     )
+    p.add_argument(
+        "--samples",
+        type=str,
+        default="",
+        help="Score this sample shard (*.samples) instead of noise; --n-images caps it.",
+    )
+    add_fast_args(p)
     return p.parse_args()
 
 
@@ -118,39 +153,66 @@ def noise_fid_once(
     device: torch.device,
     seed: int,
     noise_mode: str,
+    extractor=_inception_activations,
 ) -> float:
     # Set RNG for reproducibility
     torch.manual_seed(seed)
     np.random.seed(seed)
 
-    # Load reference stats
-    stats = np.load(str(fid_stats_path))
-    mu_ref = stats["mu"]
-    sigma_ref = stats["sigma"]
+    def batches():
+        # Generate noise images in [-1,1] in batches; the pipeline maps them
+        # to [0,1] exactly like your real FID path.
+        n_done = 0
+        while n_done < n_images:
+            bs = min(batch_size, n_images - n_done)
+            yield make_noise_images(bs, 3, h, w, device=device, mode=noise_mode)  # [-1,1]
+            n_done += bs
 
-    # Generate noise images in [-1,1] in batches, compute Inception features
-    feats_list = []
-    n_done = 0
+    return fid_of_batches(fid_stats_path, batches(), device, n_images, True, extractor)
 
-    while n_done < n_images:
-        bs = min(batch_size, n_images - n_done)
-        x_gen = make_noise_images(bs, 3, h, w, device=device, mode=noise_mode)  # [-1,1]
 
-        # Map to [0,1] exactly like your real FID path:
-        x_01 = (x_gen.clamp(-1.0, 1.0) + 1.0) / 2.0  # [-1,1] -> [0,1]
+def shard_fid(
+    fid_stats_path: Path,
+    shard_path: Path,
+    n_images: int,
+    batch_size: int,
+    device: torch.device,
+    extractor=_inception_activations,
+) -> float:
+    """FID of stored samples: batches are read straight from the mapped shard."""
+    shard = open_shard(shard_path)
+    batches = shard.iter_batches(batch_size, device, stop=n_images)  # already [0,1]
+    return fid_of_batches(fid_stats_path, batches, device, n_images, False, extractor)
 
-        feats = _inception_activations(x_01, device)  # np.ndarray [bs, D]
-        feats_list.append(feats)
 
-        n_done += bs
+def fid_of_batches(
+    fid_stats_path: Path,
+    batches,
+    device: torch.device,
+    n_images: int,
+    from_pm1: bool,
+    extractor=_inception_activations,
+) -> float:
+    """
+    Inception features of NCHW batches -> FID against the reference stats.
+
+    Batch production and the [0,1] mapping run on a worker thread while
+    Inception runs here (min_snr.pipeline), so the model isn't left waiting.
+    """
+    # Load reference stats
+    stats = np.load(str(fid_stats_path))
+    mu_ref = stats["mu"]
+    sigma_ref = stats["sigma"]
 
-    feats_all = np.concatenate(feats_list, axis=0)
-    assert feats_all.shape[0] == n_images
+    feats_all, stage_stats = extract_features(
+        batches, extractor, device, n_total=n_images, from_pm1=from_pm1, resize=INCEPTION_SIZE
+    )
+    print(f"[fid] {stage_stats.summary()}")
 
-    mu_noise = feats_all.mean(axis=0)
-    sigma_noise = np.cov(feats_all, rowvar=False)
+    mu = feats_all.mean(axis=0)
+    sigma = np.cov(feats_all, rowvar=False)
 
-    fid = _fid_from_stats(mu_noise, sigma_noise, mu_ref, sigma_ref)
+    fid = _fid_from_stats(mu, sigma, mu_ref, sigma_ref)
     return float(fid)
 
 
@@ -172,6 +234,35 @@ def main() -> None:
     if out_path is not None:
         out_path.parent.mkdir(parents=True, exist_ok=True)
 
+    # fp32 is the harness' Inception itself; fast/int8 are checked against it.
+    extractor = _inception_activations
+    if args.inception_mode not in (None, "fp32"):
+        try:
+            extractor, report = guarded_extractor(
+                args.inception_mode,
+                calibration_images(args.calib_source, args.calib_n),
+                load_ref_stats(fid_stats_path),
+                args.fast_tol,
+                args.inception_factory,
+                reference=_inception_activations,
+            )
+        except FastModeRefused as e:
+            print(e)
+            sys.exit(2)
+        if report is not None:
+            print(f"[inception] {report.summary()}")
+
+    if args.samples:
+        shard = open_shard(args.samples)
+        n = min(args.n_images, len(shard))
+        fid = shard_fid(fid_stats_path, Path(args.samples), n, args.batch_size, device, extractor)
+        print(f"samples={args.samples}  n={n}  FID(samples, stats)={fid:.3f}")
+        if out_path is not None:
+            rec = {"samples": args.samples, "n_images": n, "meta": shard.meta, "fid": fid}
+            with out_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(rec) + "\n")
+        return
+
     fids = []
 
     for seed in args.seeds:
@@ -184,6 +275,7 @@ def main() -> None:
             device=device,
             seed=seed,
             noise_mode=args.noise_mode,
+            extractor=extractor,
         )
         fids.append(fid)
         msg = f"seed={seed}  n={args.n_images}  FID(noise, stats)={fid:.3f}"
@@ -10,70 +10,32 @@ python tools/grids/make_sample_grid_comparison.py \
   docs/assets/e3/e3_samples/step_10000.png \
   --titles "E1 @ 10k" "E1 @ 50k" "E3 @ 5k" "E3 @ 10k" \
   --out docs/assets/e3/e3_plots/e1_e3_samples_comparison.png
-"""
-
-import argparse
-import math
-import os
-from typing import List
 
-import matplotlib.pyplot as plt
-from PIL import Image
+Sample shards written at evaluation time (*.samples) can be passed in place
+of grid PNGs; the first 36 samples of each are tiled.
+"""
 
 import argparse
-import math
-import os
-from typing import List
+from typing import List, Optional
 
-import matplotlib.pyplot as plt
-from PIL import Image
+from min_snr.compose import compose_grid
 
 
 def make_grid(
     image_paths: List[str],
     titles: List[str],
     out_path: str,
+    cols: Optional[int] = None,
+    scale: Optional[int] = None,
 ) -> None:
-    if len(titles) == 0:
-        titles = ["" for _ in image_paths]
-    elif len(titles) != len(image_paths):
+    if len(titles) != 0 and len(titles) != len(image_paths):
         raise ValueError("Number of titles must be 0 or equal to number of images.")
 
-    n = len(image_paths)
-    if n == 0:
+    if len(image_paths) == 0:
         print("[sample_grid] No images provided, skipping.")
         return
 
-    cols = math.ceil(math.sqrt(n))
-    rows = math.ceil(n / cols)
-
-    fig, axes = plt.subplots(rows, cols, figsize=(3 * cols, 3 * rows))
-    if rows == 1 and cols == 1:
-        axes = [[axes]]
-    elif rows == 1:
-        axes = [axes]
-    elif cols == 1:
-        axes = [[ax] for ax in axes]
-
-    idx = 0
-    for r in range(rows):
-        for c in range(cols):
-            ax = axes[r][c]
-            if idx < n:
-                img_path = image_paths[idx]
-                img = Image.open(img_path)
-                ax.imshow(img)
-                ax.axis("off")
-                if titles[idx]:
-                    ax.set_title(titles[idx], fontsize=10)
-            else:
-                ax.axis("off")
-            idx += 1
-
-    fig.tight_layout()
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    fig.savefig(out_path, dpi=300)
-    plt.close(fig)
+    compose_grid(image_paths, titles, out_path, cols=cols, scale=scale)
     print(f"[sample_grid] Wrote {out_path}")
 
 
@@ -85,7 +47,7 @@ def main() -> None:
         "images",
         type=str,
         nargs="+",
-        help="Paths to sample grid images (PNG, JPG, etc.).",
+        help="Paths to sample grid images (PNG, JPG, etc.) or *.samples shards.",
     )
     parser.add_argument(
         "--titles",
@@ -100,8 +62,20 @@ def main() -> None:
         required=True,
         help="Output path for the combined figure.",
     )
+    parser.add_argument(
+        "--cols",
+        type=int,
+        default=None,
+        help="Grid columns (default: ceil(sqrt(n))).",
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=None,
+        help="Integer nearest-neighbour upscale per image (default: auto, ~512px tiles).",
+    )
     args = parser.parse_args()
-    make_grid(args.images, args.titles, args.out)
+    make_grid(args.images, args.titles, args.out, cols=args.cols, scale=args.scale)
 
 
 if __name__ == "__main__":
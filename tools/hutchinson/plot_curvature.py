@@ -41,57 +41,15 @@ Current:
 
 
 import argparse
-import json
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Optional
 
 import matplotlib.pyplot as plt
 import numpy as np
 
-
-MetricSeries = Tuple[np.ndarray, np.ndarray]  # (steps, values)
-
-
-def _read_loss_jsonl(path: Path) -> Dict[str, MetricSeries]:
-    """
-    Read a loss.jsonl file and return a mapping:
-        metric_name -> (steps, values)
-
-    Steps come from top-level "_i" (or "step"/"global_step" fallback).
-    Each metric keeps its own step array, so sparsely-logged metrics
-    (like curvature) are handled correctly.
-    """
-    metric_steps: Dict[str, List[int]] = {}
-    metric_vals: Dict[str, List[float]] = {}
-
-    with path.open("r") as f:
-        for line_idx, line in enumerate(f):
-            line = line.strip()
-            if not line:
-                continue
-            rec = json.loads(line)
-
-            step = rec.get("_i")
-            if step is None:
-                step = rec.get("step") or rec.get("global_step")
-            if step is None:
-                # fall back to running index if no explicit step
-                step = line_idx
-
-            step = int(step)
-            out = rec.get("out", {})
-            for k, v in out.items():
-                if isinstance(v, (int, float)):
-                    metric_steps.setdefault(k, []).append(step)
-                    metric_vals.setdefault(k, []).append(float(v))
-
-    series: Dict[str, MetricSeries] = {}
-    for k, vals in metric_vals.items():
-        s = np.asarray(metric_steps[k], dtype=np.int64)
-        v = np.asarray(vals, dtype=np.float32)
-        series[k] = (s, v)
-
-    return series
+from min_snr.align import align_series
+from min_snr import render
+from min_snr.logs import MetricSeries, load_metric_series
 
 
 def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
@@ -114,19 +72,38 @@ def plot_curvature_vs_step(
     name: str,
     out_path: Path,
     smooth_window: int = 1,
+    target_px: Optional[int] = None,
+    method: str = "lttb",
 ):
     """Plots curvature vs steps."""
     curv_s = _rolling_mean(curv_vals, smooth_window)
 
     fig, ax1 = plt.subplots(figsize=(7, 4))
 
-    ax1.plot(curv_steps[: curv_s.size], curv_s, label=f"{name} curvature", alpha=0.9)
+    render.line(
+        ax1,
+        curv_steps[: curv_s.size],
+        curv_s,
+        target_px=target_px,
+        method=method,
+        label=f"{name} curvature",
+        alpha=0.9,
+    )
     ax1.set_xlabel("step")
     ax1.set_ylabel("Hutchinson trace (mean)")
 
     ax2 = ax1.twinx()
     if loss_steps is not None and loss_vals is not None:
-        ax2.plot(loss_steps, loss_vals, label=f"{name} loss", alpha=0.5, linestyle="--")
+        render.line(
+            ax2,
+            loss_steps,
+            loss_vals,
+            target_px=target_px,
+            method=method,
+            label=f"{name} loss",
+            alpha=0.5,
+            linestyle="--",
+        )
         ax2.set_ylabel("train loss")
 
     # Combined legend
@@ -150,11 +127,12 @@ def plot_curvature_mean_vs_std(
     curv_std: np.ndarray,
     name: str,
     out_path: Path,
+    max_points: int = render.DEFAULT_SCATTER_MAX_POINTS,
 ):
     """Plots curvature mean vs steps."""
     fig, ax = plt.subplots(figsize=(5, 5))
 
-    sc = ax.scatter(curv_mean, curv_std, c=curv_steps, s=10)
+    sc = render.scatter(ax, curv_mean, curv_std, c=curv_steps, max_points=max_points, s=10)
     ax.set_xlabel("Hutchinson trace mean")
     ax.set_ylabel("Hutchinson trace std")
 
@@ -173,30 +151,25 @@ def plot_curvature_vs_grad(
     grad_series: MetricSeries,
     name: str,
     out_path: Path,
+    max_points: int = render.DEFAULT_SCATTER_MAX_POINTS,
 ):
     """Plots curvature vs grads. (ensure these are logged on steps together)"""
-    curv_steps, curv_vals = curv_series
-    grad_steps, grad_vals = grad_series
-
     # Align on common steps
-    curv_map = {int(s): float(v) for s, v in zip(curv_steps, curv_vals)}
-    grad_map = {int(s): float(v) for s, v in zip(grad_steps, grad_vals)}
-    common_steps = sorted(set(curv_map.keys()) & set(grad_map.keys()))
+    aligned = align_series([curv_series, grad_series], how="exact")
 
-    if not common_steps:
+    if aligned.steps.size == 0:
         print(
             f"[WARN] No common steps between curvature and grad metrics in {name}; "
             "skipping curvature_vs_grad plot."
         )
         return
 
-    xs = np.asarray([grad_map[s] for s in common_steps], dtype=np.float32)
-    ys = np.asarray([curv_map[s] for s in common_steps], dtype=np.float32)
-    cs = np.asarray(common_steps, dtype=np.int64)
+    ys, xs = aligned.values
+    cs = aligned.steps
 
     fig, ax = plt.subplots(figsize=(5, 5))
 
-    sc = ax.scatter(xs, ys, c=cs, s=10)
+    sc = render.scatter(ax, xs, ys, c=cs, max_points=max_points, s=10)
     ax.set_xlabel("gradient metric")
     ax.set_ylabel("Hutchinson trace mean")
 
@@ -263,10 +236,11 @@ def main():
         help="Moving average window for curvature in vs-step plot.",
     )
 
+    render.add_render_args(parser)
     args = parser.parse_args()
 
     loss_path = Path(args.loss_jsonl)
-    series = _read_loss_jsonl(loss_path)
+    series = load_metric_series(loss_path)
 
     name = args.name or loss_path.stem
 
@@ -279,27 +253,15 @@ def main():
     curv_std_steps, curv_std_vals = series[args.curv_std_key]
 
     # Ensure curvature mean/std share the same step grid
-    if not np.array_equal(curv_steps, curv_std_steps):
-        curv_steps_orig, curv_vals_orig = curv_steps, curv_vals
-        curv_std_steps_orig, curv_std_vals_orig = curv_std_steps, curv_std_vals
-
-        step_set = set(curv_steps_orig.tolist()) & set(curv_std_steps_orig.tolist())
-        if not step_set:
-            raise RuntimeError(
-                f"No overlapping steps between {args.curv_key} and {args.curv_std_key}"
-            )
-        step_list = sorted(step_set)
-
-        def _align(steps_arr: np.ndarray, vals_arr: np.ndarray) -> np.ndarray:
-            m = {int(s): float(v) for s, v in zip(steps_arr, vals_arr)}
-            return np.asarray([m[s] for s in step_list], dtype=np.float32)
-
-        curv_steps = np.asarray(step_list, dtype=np.int64)
-        curv_vals = _align(curv_steps_orig, curv_vals_orig)
-        curv_std_vals = _align(curv_std_steps_orig, curv_std_vals_orig)
-    else:
-        # steps already aligned
-        pass
+    aligned = align_series(
+        [(curv_steps, curv_vals), (curv_std_steps, curv_std_vals)], how="exact"
+    )
+    if aligned.steps.size == 0:
+        raise RuntimeError(
+            f"No overlapping steps between {args.curv_key} and {args.curv_std_key}"
+        )
+    curv_steps = aligned.steps
+    curv_vals, curv_std_vals = aligned.values
 
     # Optional series
     loss_series: Optional[MetricSeries] = series.get(args.loss_key)
@@ -320,6 +282,8 @@ def main():
         name=name,
         out_path=out_prefix.with_name(out_prefix.name + "_vs_step.png"),
         smooth_window=args.smooth_window,
+        target_px=args.target_px,
+        method=args.downsample,
     )
 
     # 2) curvature mean vs std
@@ -329,6 +293,7 @@ def main():
         curv_std=curv_std_vals,
         name=name,
         out_path=out_prefix.with_name(out_prefix.name + "_mean_vs_std.png"),
+        max_points=args.scatter_max_points,
     )
 
     # 3) curvature vs grad metric (if available)
@@ -338,6 +303,7 @@ def main():
             grad_series=grad_series,
             name=name,
             out_path=out_prefix.with_name(out_prefix.name + "_vs_grad.png"),
+            max_points=args.scatter_max_points,
         )
     else:
         print(f"[WARN] Gradient key '{args.grad_key}' missing; skipping curvature_vs_grad plot.")
@@ -31,55 +31,14 @@ Current:
 
 
 import argparse
-import json
 from pathlib import Path
-from typing import Dict, List, Tuple
 
 import matplotlib.pyplot as plt
 import numpy as np
 
-MetricSeries = Tuple[np.ndarray, np.ndarray]  # (steps, values)
-
-
-def _read_loss_jsonl(path: Path) -> Dict[str, MetricSeries]:
-    """
-    Read a loss.jsonl file and return a mapping:
-        metric_name -> (steps, values)
-
-    Steps come from top-level "_i" (or "step"/"global_step" fallback).
-    Each metric keeps its own step array, so sparsely-logged metrics
-    are handled correctly.
-    """
-    metric_steps: Dict[str, List[int]] = {}
-    metric_vals: Dict[str, List[float]] = {}
-
-    with path.open("r") as f:
-        for line_idx, line in enumerate(f):
-            line = line.strip()
-            if not line:
-                continue
-            rec = json.loads(line)
-
-            step = rec.get("_i")
-            if step is None:
-                step = rec.get("step") or rec.get("global_step")
-            if step is None:
-                step = line_idx
-
-            step = int(step)
-            out = rec.get("out", {})
-            for k, v in out.items():
-                if isinstance(v, (int, float)):
-                    metric_steps.setdefault(k, []).append(step)
-                    metric_vals.setdefault(k, []).append(float(v))
-
-    series: Dict[str, MetricSeries] = {}
-    for k, vals in metric_vals.items():
-        s = np.asarray(metric_steps[k], dtype=np.int64)
-        v = np.asarray(vals, dtype=np.float32)
-        series[k] = (s, v)
-
-    return series
+from min_snr import render
+from min_snr.logs import load_metric_series
+from min_snr.seeds import add_seed_args, group_runs, seed_bands
 
 
 def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
@@ -128,6 +87,8 @@ def main():
         help="Moving average window for curvature in vs-step plot.",
     )
 
+    render.add_render_args(parser)
+    add_seed_args(parser)
     args = parser.parse_args()
 
     if len(args.loss_jsonl) != len(args.names):
@@ -141,9 +102,10 @@ def main():
 
     fig, ax = plt.subplots(figsize=(7, 4))
 
-    for loss_path_str, name in zip(args.loss_jsonl, args.names):
+    curves = {}
+    for i, (loss_path_str, name) in enumerate(zip(args.loss_jsonl, args.names)):
         loss_path = Path(loss_path_str)
-        series = _read_loss_jsonl(loss_path)
+        series = load_metric_series(loss_path)
 
         if args.curv_key not in series:
             print(f"[WARN] Missing key '{args.curv_key}' in {loss_path}; skipping {name}.")
@@ -151,9 +113,28 @@ def main():
 
         curv_steps, curv_vals = series[args.curv_key]
         curv_s = _rolling_mean(curv_vals, args.smooth_window)
-        curv_steps = curv_steps[: curv_s.size]
+        curves[i] = (curv_steps[: curv_s.size], curv_s)
 
-        ax.plot(curv_steps, curv_s, label=name)
+    if args.group_seeds:
+        px = args.target_px or render.axes_width_px(ax)
+        for _, members in group_runs(args.loss_jsonl):
+            members = [i for i in members if i in curves]
+            if not members:
+                continue
+            bands = seed_bands(
+                [curves[i] for i in members], args.n_boot, args.ci, max_points=px
+            )
+            render.band(ax, bands, label=f"{args.names[members[0]]}, n={bands.n_runs}")
+    else:
+        for i, (curv_steps, curv_s) in curves.items():
+            render.line(
+                ax,
+                curv_steps,
+                curv_s,
+                target_px=args.target_px,
+                method=args.downsample,
+                label=args.names[i],
+            )
 
     ax.set_xlabel("Step")
     ax.set_ylabel("Hutchinson trace (mean)")
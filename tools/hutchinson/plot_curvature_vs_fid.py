@@ -34,101 +34,57 @@ Current:
 """
 
 import argparse
-import json
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Optional, Tuple
 
 import matplotlib.pyplot as plt
 import numpy as np
 
-MetricSeries = Tuple[np.ndarray, np.ndarray]  # (steps, values)
-
-
-def _read_loss_jsonl(path: Path) -> Dict[str, MetricSeries]:
-    """
-    Read a loss.jsonl file and return a mapping:
-        metric_name -> (steps, values)
-    """
-    metric_steps: Dict[str, List[int]] = {}
-    metric_vals: Dict[str, List[float]] = {}
-
-    with path.open("r") as f:
-        for line_idx, line in enumerate(f):
-            line = line.strip()
-            if not line:
-                continue
-            rec = json.loads(line)
-
-            step = rec.get("_i")
-            if step is None:
-                step = rec.get("step") or rec.get("global_step")
-            if step is None:
-                step = line_idx
-
-            step = int(step)
-            out = rec.get("out", {})
-            for k, v in out.items():
-                if isinstance(v, (int, float)):
-                    metric_steps.setdefault(k, []).append(step)
-                    metric_vals.setdefault(k, []).append(float(v))
-
-    series: Dict[str, MetricSeries] = {}
-    for k, vals in metric_vals.items():
-        s = np.asarray(metric_steps[k], dtype=np.int64)
-        v = np.asarray(vals, dtype=np.float32)
-        series[k] = (s, v)
-
-    return series
+from min_snr.align import JOINS, align_series
+from min_snr.logs import MetricSeries, load_metric_series
 
 
 def _extract_curv_and_fid_for_run(
     series: Dict[str, MetricSeries],
     curv_key: str,
     fid_key: str,
+    join: str = "nearest",
+    tolerance: Optional[int] = None,
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Given metric series from loss.jsonl, extract:
-        steps_fid: steps where fid is logged
+        steps_fid: curvature steps matched to each fid milestone
         curv_at_fid: curvature values at those steps
         fid_vals: fid values
+
+    FID milestones are the anchor; curvature is joined onto them with `join`
+    (see min_snr.align). Milestones without a curvature value within
+    `tolerance` steps (default: one curvature logging interval) are dropped
+    and listed in a warning.
     """
     if curv_key not in series:
         raise KeyError(f"Missing curvature key '{curv_key}' in loss.jsonl")
     if fid_key not in series:
         raise KeyError(f"Missing fid key '{fid_key}' in loss.jsonl")
 
-    curv_steps, curv_vals = series[curv_key]
-    fid_steps, fid_vals = series[fid_key]
-
-    # Build a map step -> curvature; curvature is dense (every 100 steps)
-    curv_map = {int(s): float(v) for s, v in zip(curv_steps, curv_vals)}
-
-    curv_at_fid: List[float] = []
-    fid_used: List[float] = []
-    steps_used: List[int] = []
-
-    for s, fid in zip(fid_steps, fid_vals):
-        s_int = int(s)
-        if s_int not in curv_map:
-            # Fallback: nearest step in curvature
-            nearest = min(curv_map.keys(), key=lambda t: abs(t - s_int))
-            c = curv_map[nearest]
-            s_use = nearest
-        else:
-            c = curv_map[s_int]
-            s_use = s_int
+    if tolerance is None and join != "exact":
+        curv_steps = np.unique(series[curv_key][0])
+        tolerance = int(np.median(np.diff(curv_steps))) if curv_steps.size > 1 else 0
 
-        curv_at_fid.append(c)
-        fid_used.append(float(fid))
-        steps_used.append(s_use)
+    aligned = align_series(
+        [series[fid_key], series[curv_key]], how=join, tolerance=tolerance
+    )
 
-    curv_arr = np.asarray(curv_at_fid, dtype=np.float32)
-    fid_arr = np.asarray(fid_used, dtype=np.float32)
-    steps_arr = np.asarray(steps_used, dtype=np.int64)
+    fid_steps = np.unique(series[fid_key][0])
+    dropped = np.setdiff1d(fid_steps, aligned.steps)
+    if dropped.size:
+        print(
+            f"[WARN] {dropped.size} of {fid_steps.size} FID milestones have no matching "
+            f"curvature ({join}, tolerance={tolerance}); dropped steps: {dropped.tolist()}"
+        )
 
-    # Sort by step just in case
-    order = np.argsort(steps_arr)
-    return steps_arr[order], curv_arr[order], fid_arr[order]
+    fid_arr, curv_arr = aligned.values
+    return aligned.src_steps[1], curv_arr, fid_arr
 
 
 def main():
@@ -164,6 +120,20 @@ def main():
         default="val/fid",
         help="Metric key for FID (as logged in loss.jsonl).",
     )
+    parser.add_argument(
+        "--join",
+        type=str,
+        default="nearest",
+        choices=JOINS,
+        help="How curvature is matched to FID milestones (see min_snr.align).",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=None,
+        help="Max step gap between a FID milestone and its curvature value "
+        "(default: the curvature logging interval).",
+    )
     parser.add_argument(
         "--annotate_steps",
         action="store_true",
@@ -185,17 +155,18 @@ def main():
 
     for loss_path_str, name in zip(args.loss_jsonl, args.names):
         loss_path = Path(loss_path_str)
-        series = _read_loss_jsonl(loss_path)
+        series = load_metric_series(loss_path)
 
         try:
             steps, curv_vals, fid_vals = _extract_curv_and_fid_for_run(
-                series, args.curv_key, args.fid_key
+                series, args.curv_key, args.fid_key, args.join, args.tolerance
             )
         except KeyError as e:
             print(f"[WARN] {e} in {loss_path}; skipping {name}.")
             continue
 
-        # A small polyline in curvature–FID space
+        # A small polyline in curvature–FID space; x is not monotonic, so it
+        # is drawn as is rather than through min_snr.render's downsampling.
         ax.plot(
             curv_vals,
             fid_vals,
@@ -34,12 +34,15 @@ from pathlib import Path
 
 import matplotlib.pyplot as plt
 
+from min_snr import render
+from min_snr.logs import open_log
+
 MSE_PREFIX = "mse_per_t/mse_t"
 
 
 def load_jsonl(path):
     records = []
-    with open(path, "r") as f:
+    with open_log(path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -104,6 +107,7 @@ def main():
         required=True,
         help="Output PNG path.",
     )
+    render.add_render_args(parser)
     args = parser.parse_args()
 
     if len(args.loss_files) != len(args.names):
@@ -130,9 +134,15 @@ def main():
             eff.append(w_curve[idx] * mse_t)
 
         # Plot MSE(t)
-        ax_mse.plot(t_norm_mse, mse, label=name)
+        render.line(
+            ax_mse, t_norm_mse, mse,
+            target_px=args.target_px, method=args.downsample, label=name,
+        )
         # Plot effective w(t)*MSE(t)
-        ax_eff.plot(t_norm_mse, eff, label=name)
+        render.line(
+            ax_eff, t_norm_mse, eff,
+            target_px=args.target_px, method=args.downsample, label=name,
+        )
 
     ax_mse.set_ylabel("MSE(t)")
     ax_mse.set_title("Unweighted per-t MSE(t)")
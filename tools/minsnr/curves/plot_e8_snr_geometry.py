@@ -19,58 +19,49 @@ python tools/minsnr/curves/plot_e8_snr_geometry.py \
   --names e8a e8b e8c \
   --out docs/assets/e8/e8_plots/e8_snr_geometry.png
 
+Per-example grad norms (min_snr.per_sample_grads) instead of the batch
+aggregates in the grad panel, one file per loss file:
+  --per-sample runs/e8a/per_sample_grads.jsonl runs/e8b/per_sample_grads.jsonl ...
+
 """
 
 
 
 
 import argparse
-import json
 from pathlib import Path
 
 import matplotlib.pyplot as plt
+import numpy as np
 
-
-def load_jsonl(path):
-    records = []
-    with open(path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            r = json.loads(line)
-            # Handle {"_i": step, "out": {...}} style logs
-            if isinstance(r, dict) and isinstance(r.get("out"), dict):
-                out = r["out"]
-                out["_i"] = r.get("_i")  # optional: keep step around
-                r = out
-            records.append(r)
-    return records
+from min_snr import render
+from min_snr.align import align_series
+from min_snr.binned import binned_stats, log_bins
+from min_snr.logs import load_metric_series
+from min_snr.per_sample_grads import load_per_sample
 
 
-def extract_step(rec):
-    return rec.get("_i") or rec.get("step") or rec.get("global_step")
+SNR_KEY = "mins_snr/snr_mean"
+GRAD_KEY = "train/grad_global_L2"
+CURV_KEY = "curvature/hutch_trace_mean"
 
 
 def collect_snr_grad_curv(loss_path):
-    records = load_jsonl(loss_path)
-    snr = []
-    grad = []
-    curv = []
-
-    for r in records:
-        if "mins_snr/snr_mean" not in r:
-            continue
-        s = r["mins_snr/snr_mean"]
-        g = r.get("train/grad_global_L2")
-        c = r.get("curvature/hutch_trace_mean")
-        if s is None:
+    """(snr, grad) and (snr, curv) pairs, each joined on exactly matching steps."""
+    series = load_metric_series(loss_path)
+    if SNR_KEY not in series:
+        return (np.empty(0), np.empty(0)), (np.empty(0), np.empty(0))
+
+    pairs = []
+    for key in (GRAD_KEY, CURV_KEY):
+        if key not in series:
+            pairs.append((np.empty(0), np.empty(0)))
             continue
-        snr.append(s)
-        grad.append(g)
-        curv.append(c)
+        aligned = align_series([series[SNR_KEY], series[key]], how="exact")
+        pairs.append(tuple(aligned.values))
+
+    return pairs[0], pairs[1]
 
-    return snr, grad, curv
 
 def main():
     parser = argparse.ArgumentParser(
@@ -92,36 +83,82 @@ def main():
         required=True,
         help="Output PNG path.",
     )
+    parser.add_argument(
+        "--mode",
+        choices=["binned", "scatter"],
+        default="binned",
+        help="binned: per-log-SNR-bin median + IQR; scatter: one point per step.",
+    )
+    parser.add_argument("--n-bins", type=int, default=24, help="Number of log-SNR bins.")
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=1,
+        help="Hide bins with fewer points than this.",
+    )
+    parser.add_argument(
+        "--per-sample",
+        nargs="+",
+        default=None,
+        help="per_sample_grads.jsonl per loss file: grad panel uses per-example (SNR, grad norm).",
+    )
+    render.add_render_args(parser)
     args = parser.parse_args()
 
     if len(args.loss_files) != len(args.names):
         raise ValueError("Need one --names entry per loss file.")
+    if args.per_sample and len(args.per_sample) != len(args.loss_files):
+        raise ValueError("Need one --per-sample file per loss file.")
 
     fig, (ax_grad, ax_curv) = plt.subplots(2, 1, figsize=(8, 8), sharex=True)
 
-    for loss_path, name in zip(args.loss_files, args.names):
-        snr, grad, curv = collect_snr_grad_curv(loss_path)
-
-        # Filter None values
-        snr_g = [s for s, g in zip(snr, grad) if g is not None]
-        grad_g = [g for g in grad if g is not None]
-
-        snr_c = [s for s, c in zip(snr, curv) if c is not None]
-        curv_c = [c for c in curv if c is not None]
-
-        if snr_g:
-            ax_grad.scatter(snr_g, grad_g, alpha=0.4, label=name)
-        if snr_c:
-            ax_curv.scatter(snr_c, curv_c, alpha=0.4, label=name)
-
-    ax_grad.set_ylabel("grad_global_L2")
-    ax_grad.set_title("Grad norm vs SNR (per step)")
+    runs = [collect_snr_grad_curv(loss_path) for loss_path in args.loss_files]
+    if args.per_sample:
+        per_example = [load_per_sample(p) for p in args.per_sample]
+        runs = [((ps["snr"], ps["grad_norm"]), curv) for ps, (_, curv) in zip(per_example, runs)]
+
+    if args.mode == "scatter":
+        for name, ((snr_g, grad_g), (snr_c, curv_c)) in zip(args.names, runs):
+            if snr_g.size:
+                render.scatter(
+                    ax_grad, snr_g, grad_g,
+                    max_points=args.scatter_max_points, alpha=0.4, label=name,
+                )
+            if snr_c.size:
+                render.scatter(
+                    ax_curv, snr_c, curv_c,
+                    max_points=args.scatter_max_points, alpha=0.4, label=name,
+                )
+        title = "per step"
+    else:
+        all_snr = np.concatenate([p[0] for run in runs for p in run] + [np.empty(0)])
+        if not (all_snr > 0).any():
+            raise RuntimeError(f"No positive '{SNR_KEY}' values found; nothing to bin.")
+        edges = log_bins(all_snr, args.n_bins)
+        for panel, ax in enumerate((ax_grad, ax_curv)):
+            xs = [run[panel][0] for run in runs]
+            ys = [run[panel][1] for run in runs]
+            groups = np.repeat(np.arange(len(runs)), [x.size for x in xs])
+            stats = binned_stats(
+                np.concatenate(xs), np.concatenate(ys), edges,
+                groups=groups, n_groups=len(runs),
+            )
+            for g, name in enumerate(args.names):
+                if stats.count[g].any():
+                    render.binned(ax, stats, g, label=name, min_count=args.min_count)
+        title = f"median, IQR band, {args.n_bins} log-SNR bins"
+
+    ax_grad.set_xscale("log")
+    ax_curv.set_xscale("log")
+
+    ax_grad.set_ylabel("per-example grad L2 (SNR of its t)" if args.per_sample else "grad_global_L2")
+    ax_grad.set_title(f"Grad norm vs SNR ({title})")
     ax_grad.legend()
     ax_grad.grid(True)
 
     ax_curv.set_ylabel("Hutch trace")
     ax_curv.set_xlabel("mins_snr/snr_mean")
-    ax_curv.set_title("Curvature vs SNR (per step)")
+    ax_curv.set_title(f"Curvature vs SNR ({title})")
     ax_curv.legend()
     ax_curv.grid(True)
 
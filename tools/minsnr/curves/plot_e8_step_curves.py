@@ -30,9 +30,12 @@ from pathlib import Path
 
 import matplotlib.pyplot as plt
 
+from min_snr import render
+from min_snr.logs import open_log
+
 def load_jsonl(path):
     records = []
-    with open(path, "r") as f:
+    with open_log(path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -112,6 +115,7 @@ def main():
         required=True,
         help="Output PNG path.",
     )
+    render.add_render_args(parser)
     args = parser.parse_args()
 
     if len(args.files) % 2 != 0:
@@ -129,23 +133,27 @@ def main():
 
     fig, axes = plt.subplots(4, 1, figsize=(8, 12), sharex=True)
     ax_loss, ax_fid, ax_grad, ax_curv = axes
+    line_kw = {"target_px": args.target_px, "method": args.downsample}
 
     for name, s in zip(args.names, series_list):
         # Loss
-        ax_loss.plot(s["steps_loss"], s["loss"], label=name)
+        render.line(ax_loss, s["steps_loss"], s["loss"], label=name, **line_kw)
         # FID
         if s["steps_fid"]:
-            ax_fid.plot(s["steps_fid"], s["fid"], marker="o", linestyle="-", label=name)
+            render.line(
+                ax_fid, s["steps_fid"], s["fid"],
+                marker="o", linestyle="-", label=name, **line_kw,
+            )
         # Grad
         if any(g is not None for g in s["grad"]):
             grad_steps = [step for step, g in zip(s["steps_loss"], s["grad"]) if g is not None]
             grad_vals = [g for g in s["grad"] if g is not None]
-            ax_grad.plot(grad_steps, grad_vals, label=name)
+            render.line(ax_grad, grad_steps, grad_vals, label=name, **line_kw)
         # Curvature
         if any(c is not None for c in s["curv"]):
             curv_steps = [step for step, c in zip(s["steps_loss"], s["curv"]) if c is not None]
             curv_vals = [c for c in s["curv"] if c is not None]
-            ax_curv.plot(curv_steps, curv_vals, label=name)
+            render.line(ax_curv, curv_steps, curv_vals, label=name, **line_kw)
 
     ax_loss.set_ylabel("train/loss")
     ax_loss.legend()
@@ -32,10 +32,13 @@ from pathlib import Path
 
 import matplotlib.pyplot as plt
 
+from min_snr import render
+from min_snr.logs import open_log
+
 def load_jsonl(path):
     """This load jsonl correctly extracts."""
     records = []
-    with open(path, "r") as f:
+    with open_log(path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -81,6 +84,7 @@ def main():
         required=True,
         help="Output PNG path.",
     )
+    render.add_render_args(parser)
     args = parser.parse_args()
 
     if len(args.loss_files) != len(args.names):
@@ -92,7 +96,10 @@ def main():
         t, w = find_minsnr_curve(loss_path)
         # Normalize t to [0,1] for nicer comparison
         t_norm = [ti / (max(t) if max(t) > 0 else 1.0) for ti in t]
-        ax.plot(t_norm, w, label=name)
+        render.line(
+            ax, t_norm, w,
+            target_px=args.target_px, method=args.downsample, label=name,
+        )
 
     ax.set_xlabel("t / T (normalized timestep)")
     ax.set_ylabel("Min-SNR weight w_gamma(t)")
@@ -22,6 +22,9 @@ from typing import Any, Dict, List, Optional, Sequence, Tuple
 import matplotlib.pyplot as plt
 import numpy as np
 
+from min_snr import render
+from min_snr.logs import open_log
+
 
 # ---------------------------------------------------------------------------
 # I/O + flatten helpers
@@ -33,7 +36,7 @@ def load_flat_loss(path: str) -> List[Dict[str, Any]]:
     flatten to {"_i": step, **out}.
     """
     records: List[Dict[str, Any]] = []
-    with open(path, "r", encoding="utf-8") as f:
+    with open_log(path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -121,6 +124,8 @@ def make_early_loss_fid_plot(
     loss_records: Sequence[Dict[str, Any]],
     out_path: str,
     max_step: int = 10_000,
+    target_px: Optional[int] = None,
+    method: str = "lttb",
 ) -> None:
     """
     Zoomed-in early-phase loss & FID plot.
@@ -168,15 +173,25 @@ def make_early_loss_fid_plot(
 
     fig, ax1 = plt.subplots(figsize=(6, 4))
 
-    ax1.plot(loss_steps_early, loss_vals_early, label="train loss")
+    render.line(
+        ax1,
+        loss_steps_early,
+        loss_vals_early,
+        target_px=target_px,
+        method=method,
+        label="train loss",
+    )
     ax1.set_xlabel("training step")
     ax1.set_ylabel("loss")
     ax1.set_title(f"Early-phase loss & FID (steps ≤ {max_step})")
 
     ax2 = ax1.twinx()
-    ax2.plot(
+    render.line(
+        ax2,
         fid_steps,
         fid_vals,
+        target_px=target_px,
+        method=method,
         marker="o",
         linestyle="-",
         label="FID",
@@ -222,6 +237,8 @@ def make_early_loss_fid_plot(
 def make_weight_curve_plot(
     loss_records: Sequence[Dict[str, Any]],
     out_path: str,
+    target_px: Optional[int] = None,
+    method: str = "lttb",
 ) -> None:
     """
     Min-SNR weight curve vs t, plus a band showing where t_mean lives.
@@ -262,7 +279,7 @@ def make_weight_curve_plot(
 
     fig, ax = plt.subplots(figsize=(6, 4))
 
-    ax.plot(t, w, label="Min-SNR weight(t)")
+    render.line(ax, t, w, target_px=target_px, method=method, label="Min-SNR weight(t)")
     ax.set_xlabel("t")
     ax.set_ylabel("weight(t)")
     ax.set_yscale("log")
@@ -303,6 +320,7 @@ def make_tmean_plots(
     loss_records: Sequence[Dict[str, Any]],
     out_hist_path: str,
     out_scatter_path: str,
+    max_points: int = render.DEFAULT_SCATTER_MAX_POINTS,
 ) -> None:
     """
     Histogram of t_mean and scatter of t_mean vs training step.
@@ -361,7 +379,7 @@ def make_tmean_plots(
 
     # Scatter
     fig_scatter, ax_scatter = plt.subplots(figsize=(6, 4))
-    ax_scatter.scatter(steps_arr, t_means_arr, s=10, alpha=0.5)
+    render.scatter(ax_scatter, steps_arr, t_means_arr, max_points=max_points, s=10, alpha=0.5)
     ax_scatter.set_xlabel("training step")
     ax_scatter.set_ylabel("t_mean")
     ax_scatter.set_title("t_mean over training steps")
@@ -398,6 +416,7 @@ def main() -> None:
         help="Max training step for the early-phase loss/FID plot.",
     )
 
+    render.add_render_args(parser)
     args = parser.parse_args()
 
     loss_records = load_flat_loss(args.loss_jsonl)
@@ -411,12 +430,20 @@ def main() -> None:
         loss_records=loss_records,
         out_path=early_path,
         max_step=args.early_max_step,
+        target_px=args.target_px,
+        method=args.downsample,
+    )
+    make_weight_curve_plot(
+        loss_records=loss_records,
+        out_path=weights_path,
+        target_px=args.target_px,
+        method=args.downsample,
     )
-    make_weight_curve_plot(loss_records=loss_records, out_path=weights_path)
     make_tmean_plots(
         loss_records=loss_records,
         out_hist_path=tmean_hist_path,
         out_scatter_path=tmean_scatter_path,
+        max_points=args.scatter_max_points,
     )
 
 
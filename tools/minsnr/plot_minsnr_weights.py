@@ -21,10 +21,13 @@ import json
 import matplotlib.pyplot as plt
 import numpy as np
 
+from min_snr import render
+from min_snr.logs import open_log
+
 
 def load_curve(path):
     """Finds mins_snr_curve/t and mins_snr_curve/weight from jsonl."""
-    with open(path, "r") as f:
+    with open_log(path) as f:
         for line in f:
             if not line.strip():
                 continue
@@ -44,6 +47,7 @@ def main():
     ap.add_argument("e_raw_loss", type=str)          # e.g. E2/E3 (raw Min-SNR)
     ap.add_argument("e_norm_loss", type=str, nargs="?", default=None)
     ap.add_argument("--out", type=str, required=True)
+    render.add_render_args(ap)
     args = ap.parse_args()
 
     # Raw curve always comes from the first file
@@ -63,8 +67,16 @@ def main():
     t_norm_norm = t_norm / t_norm.max()
 
     plt.figure()
-    plt.plot(t_raw_norm, w_raw, label="raw Min-SNR")
-    plt.plot(t_norm_norm, w_norm, linestyle="--", label=norm_label)
+    ax = plt.gca()
+    render.line(
+        ax, t_raw_norm, w_raw,
+        target_px=args.target_px, method=args.downsample, label="raw Min-SNR",
+    )
+    render.line(
+        ax, t_norm_norm, w_norm,
+        target_px=args.target_px, method=args.downsample,
+        linestyle="--", label=norm_label,
+    )
     plt.axhline(1.0, linestyle=":", label="scale = 1")
 
     plt.xlabel("t / T")
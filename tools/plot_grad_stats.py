@@ -8,6 +8,9 @@ Useage:
     --names e3-minsnr-short e4-minsnr-norm \
     --out docs/assets/e4/e4_plots/grad_global_L2_e3e4.png    
 
+Per-layer view (runs logged with min_snr.grad_stats.GradStats group norms):
+    python tools/plot_grad_stats.py runs/e9/loss.jsonl --names e9 \
+    --out runs/e9/grad_global_L2.png --per-layer-out runs/e9/grad_layers.png --relative
 
 """
 
@@ -18,13 +21,18 @@ import json
 import matplotlib.pyplot as plt
 import numpy as np
 
+from min_snr import render
+from min_snr.grad_stats import GROUP_PREFIX, group_keys
+from min_snr.logs import load_metric_series, open_log
+from min_snr.seeds import add_seed_args, group_runs, seed_bands
+
 
 def load_grad_series(path, value_keys):
     """Get stats from jsonl."""
     steps = []
     series = {k: [] for k in value_keys}
 
-    with open(path, "r") as f:
+    with open_log(path) as f:
         for line in f:
             if not line.strip():
                 continue
@@ -58,15 +66,80 @@ def load_grad_series(path, value_keys):
     return steps, series
 
 
+def load_group_series(path):
+    """Per-layer-group L2 norms as (steps, groups, values[group, step])."""
+    series = load_metric_series(path)
+    groups = group_keys(series)
+    if not groups:
+        raise RuntimeError(f"No per-layer grad norms ({GROUP_PREFIX}*) in {path}")
+    steps = series[groups[0]][0]
+    values = np.stack([
+        np.interp(steps, *series[k]) if len(series[k][0]) != len(steps) else series[k][1]
+        for k in groups
+    ])
+    return steps, [k[len(GROUP_PREFIX):] for k in groups], values
+
+
+def plot_per_layer(loss_files, names, out, relative=False):
+    """One heatmap per run: layer groups (rows) x steps, log10 grad L2."""
+    runs = []
+    for path, name in zip(loss_files, names):
+        try:
+            runs.append((name, *load_group_series(path)))
+        except RuntimeError as e:
+            print(f"skip: {e}")
+    if not runs:
+        raise SystemExit("No run has per-layer grad norms")
+
+    n_groups = max(len(r[2]) for r in runs)
+    fig, axes = plt.subplots(
+        len(runs), 1, figsize=(9, 1.0 + 0.22 * n_groups * len(runs)), squeeze=False
+    )
+    for ax, (name, steps, groups, values) in zip(axes[:, 0], runs):
+        if relative:  # share of the global norm: sum over groups of share^2 is 1
+            values = values / np.sqrt((values ** 2).sum(0, keepdims=True))
+        im = ax.imshow(
+            np.log10(np.maximum(values, 1e-12)),
+            aspect="auto",
+            interpolation="nearest",
+            extent=(steps[0], steps[-1], len(groups) - 0.5, -0.5),
+            cmap="viridis",
+        )
+        ax.set_yticks(range(len(groups)))
+        ax.set_yticklabels(groups, fontsize=6)
+        ax.set_title(name, fontsize=9)
+        fig.colorbar(im, ax=ax, label="log10 share of L2" if relative else "log10 grad L2")
+    axes[-1, 0].set_xlabel("training step (from _i)")
+    fig.tight_layout()
+    fig.savefig(out, dpi=200)
+    print(f"Wrote {out}")
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("loss_files", nargs="+", type=str)
     ap.add_argument("--names", nargs="+", required=True)
     ap.add_argument("--out", type=str, required=True)
+    ap.add_argument(
+        "--per-layer-out",
+        type=str,
+        default=None,
+        help="Also write a per-layer-group heatmap (train/grad_group_L2/*) here.",
+    )
+    ap.add_argument(
+        "--relative",
+        action="store_true",
+        help="Per-layer view as each group's share of the global norm.",
+    )
+    render.add_render_args(ap)
+    add_seed_args(ap)
     args = ap.parse_args()
 
     assert len(args.loss_files) == len(args.names)
 
+    if args.per_layer_out:
+        plot_per_layer(args.loss_files, args.names, args.per_layer_out, args.relative)
+
     value_keys = [
         "train/grad_global_L2",
         # optionally add these if you want extra curves:
@@ -75,15 +148,38 @@ def main():
     ]
 
     plt.figure()
-    for path, name in zip(args.loss_files, args.names):
+    loaded = {}
+    for i, path in enumerate(args.loss_files):
         try:
-            steps, series = load_grad_series(path, value_keys)
+            loaded[i] = load_grad_series(path, value_keys)
         except RuntimeError:
             continue
 
-        # primary curve: global L2
-        if "train/grad_global_L2" in series:
-            plt.plot(steps, series["train/grad_global_L2"], label=name)
+    if args.group_seeds:
+        px = args.target_px or render.axes_width_px(plt.gca())
+        for _, members in group_runs(args.loss_files):
+            members = [i for i in members if i in loaded]
+            if not members:
+                continue
+            bands = seed_bands(
+                [(loaded[i][0], loaded[i][1]["train/grad_global_L2"]) for i in members],
+                args.n_boot,
+                args.ci,
+                max_points=px,
+            )
+            render.band(plt.gca(), bands, label=f"{args.names[members[0]]}, n={bands.n_runs}")
+    else:
+        for i, (steps, series) in loaded.items():
+            # primary curve: global L2
+            if "train/grad_global_L2" in series:
+                render.line(
+                    plt.gca(),
+                    steps,
+                    series["train/grad_global_L2"],
+                    target_px=args.target_px,
+                    method=args.downsample,
+                    label=args.names[i],
+                )
 
     plt.xlabel("training step (from _i)")
     plt.ylabel("train/grad_global_L2")
@@ -23,6 +23,11 @@ import json
 from pathlib import Path
 
 import matplotlib.pyplot as plt
+import numpy as np
+
+from min_snr import render
+from min_snr.logs import open_log
+from min_snr.seeds import add_seed_args, group_runs, seed_bands
 
 
 def load_loss_and_fid(loss_path):
@@ -30,7 +35,7 @@ def load_loss_and_fid(loss_path):
     steps_loss, losses = [], []
     steps_fid, fids = [], []
 
-    with open(loss_path, "r") as f:
+    with open_log(loss_path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -68,7 +73,7 @@ def load_final_fid(results_path, default_step=None):
     final_step = None
     final_fid = None
 
-    with open(results_path, "r") as f:
+    with open_log(results_path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -104,6 +109,100 @@ def infer_label_from_path(loss_path: str) -> str:
     return p.parent.name or p.stem
 
 
+def plot_single_runs(args, labels, ax_loss, ax_fid):
+    """One loss line + FID markers per run."""
+    for i in range(len(labels)):
+        loss_path = args.paths[2 * i]
+        results_path = args.paths[2 * i + 1]
+
+        label = labels[i]
+
+        (loss_steps, losses), (fid_steps, fids) = load_loss_and_fid(loss_path)
+        default_step = max(loss_steps) if loss_steps else None
+        final_step, final_fid = load_final_fid(results_path, default_step)
+
+        # ---- plot loss ----
+        if loss_steps:
+            render.line(
+                ax_loss,
+                loss_steps,
+                losses,
+                target_px=args.target_px,
+                method=args.downsample,
+                linewidth=1.3,
+                label=f"loss ({label})",
+            )
+
+        # ---- plot intermittent FIDs ----
+        if fid_steps:
+            render.line(
+                ax_fid,
+                fid_steps,
+                fids,
+                "o--",
+                target_px=args.target_px,
+                method=args.downsample,
+                markersize=3,
+                linewidth=1.0,
+                label=f"FID intermittent ({label})",
+            )
+
+        # ---- plot final FID ----
+        if final_fid is not None:
+            ax_fid.scatter(
+                [final_step],
+                [final_fid],
+                marker="*",
+                s=100,
+                label=f"FID final ({label}) = {final_fid:.2f}",
+            )
+
+
+def plot_seed_groups(args, labels, ax_loss, ax_fid):
+    """One mean + bootstrap band per config-minus-seed group."""
+    loss_paths = args.paths[0::2]
+    results_paths = args.paths[1::2]
+    px = args.target_px or render.axes_width_px(ax_loss)
+
+    for _, members in group_runs(results_paths):
+        loss_series, fid_series, finals = [], [], []
+        for i in members:
+            (loss_steps, losses), (fid_steps, fids) = load_loss_and_fid(loss_paths[i])
+            if loss_steps:
+                loss_series.append((np.asarray(loss_steps), np.asarray(losses)))
+            if fid_steps:
+                fid_series.append((np.asarray(fid_steps), np.asarray(fids)))
+            default_step = max(loss_steps) if loss_steps else None
+            _, final_fid = load_final_fid(results_paths[i], default_step)
+            if final_fid is not None:
+                finals.append((default_step, final_fid))
+
+        label = f"{labels[members[0]]}, n={len(members)}"
+        if loss_series:
+            bands = seed_bands(loss_series, args.n_boot, args.ci, max_points=px)
+            render.band(ax_loss, bands, label=f"loss ({label})", linewidth=1.3)
+        color = None
+        if fid_series:
+            bands = seed_bands(fid_series, args.n_boot, args.ci)
+            color = render.band(
+                ax_fid, bands, label=f"FID intermittent ({label})",
+                marker="o", markersize=3, linestyle="--", linewidth=1.0,
+            ).get_color()
+        if finals:
+            # final FID sits at the last logged step of the group
+            steps, fids = np.asarray(finals, dtype=float).T
+            ax_fid.errorbar(
+                [steps.max()],
+                [fids.mean()],
+                yerr=[fids.std()] if fids.size > 1 else None,
+                marker="*",
+                markersize=10,
+                capsize=3,
+                color=color,
+                label=f"FID final ({label}) = {fids.mean():.2f} ± {fids.std():.2f}",
+            )
+
+
 def main(argv=None):
     parser = argparse.ArgumentParser(
         description=(
@@ -127,6 +226,8 @@ def main(argv=None):
         required=True,
         help="Output PNG path, e.g. docs/assets/E7/e7_plots/loss_fid_overlay.png",
     )
+    render.add_render_args(parser)
+    add_seed_args(parser)
     args = parser.parse_args(argv)
 
     if len(args.paths) % 2 != 0:
@@ -142,49 +243,17 @@ def main(argv=None):
     fig, ax_loss = plt.subplots(figsize=(7, 4))
     ax_fid = ax_loss.twinx()
 
-    for i in range(num_runs):
-        loss_path = args.paths[2 * i]
-        results_path = args.paths[2 * i + 1]
-
-        label = (
-            args.names[i]
-            if args.names and i < len(args.names)
-            else infer_label_from_path(loss_path)
-        )
-
-        (loss_steps, losses), (fid_steps, fids) = load_loss_and_fid(loss_path)
-        default_step = max(loss_steps) if loss_steps else None
-        final_step, final_fid = load_final_fid(results_path, default_step)
-
-        # ---- plot loss ----
-        if loss_steps:
-            ax_loss.plot(
-                loss_steps,
-                losses,
-                linewidth=1.3,
-                label=f"loss ({label})",
-            )
-
-        # ---- plot intermittent FIDs ----
-        if fid_steps:
-            ax_fid.plot(
-                fid_steps,
-                fids,
-                "o--",
-                markersize=3,
-                linewidth=1.0,
-                label=f"FID intermittent ({label})",
-            )
-
-        # ---- plot final FID ----
-        if final_fid is not None:
-            ax_fid.scatter(
-                [final_step],
-                [final_fid],
-                marker="*",
-                s=100,
-                label=f"FID final ({label}) = {final_fid:.2f}",
-            )
+    labels = [
+        args.names[i]
+        if args.names and i < len(args.names)
+        else infer_label_from_path(args.paths[2 * i])
+        for i in range(num_runs)
+    ]
+
+    if args.group_seeds:
+        plot_seed_groups(args, labels, ax_loss, ax_fid)
+    else:
+        plot_single_runs(args, labels, ax_loss, ax_fid)
 
     ax_loss.set_xlabel("step")
     ax_loss.set_ylabel("loss")
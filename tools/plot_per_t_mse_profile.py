@@ -19,6 +19,9 @@ import re
 import matplotlib.pyplot as plt
 import numpy as np
 
+from min_snr import render
+from min_snr.logs import open_log
+
 MSE_PREFIX = "mse_per_t/mse_t"
 
 
@@ -27,7 +30,7 @@ def extract_last_profile(path):
     Returns (t, mse) from the last record that has any mse_per_t/... keys.
     """
     last = None
-    with open(path, "r") as f:
+    with open_log(path) as f:
         for line in f:
             if not line.strip():
                 continue
@@ -68,6 +71,7 @@ def main():
     ap.add_argument("loss_files", nargs="+", type=str)
     ap.add_argument("--names", nargs="+", required=True)
     ap.add_argument("--out", type=str, required=True)
+    render.add_render_args(ap)
     args = ap.parse_args()
 
     assert len(args.loss_files) == len(args.names)
@@ -75,7 +79,14 @@ def main():
     plt.figure()
     for path, name in zip(args.loss_files, args.names):
         t, mse = extract_last_profile(path)
-        plt.plot(t / t.max(), mse, label=name)  # normalize t to [0,1]
+        render.line(  # normalize t to [0,1]
+            plt.gca(),
+            t / t.max(),
+            mse,
+            target_px=args.target_px,
+            method=args.downsample,
+            label=name,
+        )
 
     plt.xlabel("t / T")
     plt.ylabel("ε-MSE(t) (approx, last batch)")
@@ -20,9 +20,12 @@ from typing import List, Tuple
 
 import matplotlib.pyplot as plt
 
+from min_snr import render
+from min_snr.logs import open_log
+
 def load_run_time(results_path: Path) -> float:
     """Read total wall time in seconds from results.jsonl."""
-    with results_path.open() as f:
+    with open_log(results_path) as f:
         line = f.readline()
     if not line:
         raise RuntimeError(f"{results_path} is empty")
@@ -49,7 +52,7 @@ def load_fid_vs_step(loss_path: Path) -> Tuple[List[int], List[float]]:
     steps = []
     fids = []
 
-    with loss_path.open() as f:
+    with open_log(loss_path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -95,6 +98,7 @@ def main() -> None:
         action="store_true",
         help="Plot time in minutes instead of seconds.",
     )
+    render.add_render_args(parser)
     args = parser.parse_args()
 
     if len(args.paths) % 2 != 0:
@@ -129,7 +133,16 @@ def main() -> None:
         else:
             x_label = "Wall time (seconds)"
 
-        plt.plot(times, fids, marker="o", linewidth=1.5, label=name)
+        render.line(
+            plt.gca(),
+            times,
+            fids,
+            target_px=args.target_px,
+            method=args.downsample,
+            marker="o",
+            linewidth=1.5,
+            label=name,
+        )
 
     plt.xlabel(x_label)
     plt.ylabel("FID (lower is better)")